@@ -0,0 +1,105 @@
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable
+
+from absl import flags
+
+from benchmarks.hotpath import REPEAT, THERMOMETERS, run
+from govee_h5072_logger.datapoint import DataPoint, build_lines
+from govee_h5072_logger.decoder import InvalidEncodedDataError
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.recordformat import RecordFormat
+from govee_h5072_logger.thermometer import Thermometer
+
+_READINGS = flags.DEFINE_integer(
+    name='readings',
+    default=100_000,
+    lower_bound=1,
+    help='Number of readings decoded by each run.',
+)
+
+# Both models send 5 byte payloads.
+RECORD_SIZE = 5
+# One in this many payloads has the invalid encoded data 0xff_ffff.
+INVALID_EVERY = 100
+
+
+def _payloads(model: Model, n_readings: int) -> bytes:
+  payloads: list[bytes] = []
+  for i in range(n_readings):
+    if i % INVALID_EVERY == 0:
+      encoded_data = 0xff_ffff
+    else:
+      temperature_c_10x, humidity_percent_10x = random.randint(-200, 400), random.randint(0, 999)
+      encoded_data = abs(temperature_c_10x) * 1000 + humidity_percent_10x | (0x80_0000 if temperature_c_10x < 0 else 0)
+    if model == Model.H5072:
+      payloads.append(b'\x01' + encoded_data.to_bytes(3, 'big') + random.randint(0, 100).to_bytes(1, 'big'))
+    else:
+      payloads.append(b'\x01\x01' + encoded_data.to_bytes(3, 'big'))
+  return b''.join(payloads)
+
+
+# The line protocol of the payloads built one reading at a time, the way the logger does.
+def _per_item(thermometer: Thermometer, payloads: bytes, rssi: list[int], time_ns: list[int],
+              record_format: RecordFormat) -> list[str]:
+  lines: list[str] = []
+  for i in range(len(rssi)):
+    try:
+      data_point = DataPoint.build(thermometer, payloads[i * RECORD_SIZE:(i + 1) * RECORD_SIZE], rssi[i])
+    except InvalidEncodedDataError:
+      continue
+    lines.extend(point.to_line_protocol() for point in data_point.to_points(record_format, time_ns[i]))
+  return lines
+
+
+def _batch(thermometer: Thermometer, payloads: bytes, rssi: list[int], time_ns: list[int],
+           record_format: RecordFormat) -> list[str]:
+  return build_lines(thermometer, payloads, RECORD_SIZE, rssi, time_ns, record_format)[0]
+
+
+def _seconds(function: Callable[[], object]) -> float:
+  seconds: list[float] = []
+  for _ in range(REPEAT.value):
+    start = time.perf_counter()
+    function()
+    seconds.append(time.perf_counter() - start)
+  return min(seconds)
+
+
+def main(args: list[str]) -> None:
+  n_readings = _READINGS.value
+  results: dict[str, dict[str, float]] = dict()
+
+  for thermometer in THERMOMETERS:
+    payloads = _payloads(thermometer.model, n_readings)
+    rssi = [random.randint(-100, -40) for _ in range(n_readings)]
+    start_ns = time.time_ns()
+    time_ns = [start_ns + i * 1_000_000 for i in range(n_readings)]
+
+    for record_format in RecordFormat:
+      per_item_lines = _per_item(thermometer, payloads, rssi, time_ns, record_format)
+      if _batch(thermometer, payloads, rssi, time_ns, record_format) != per_item_lines:
+        raise AssertionError(f'Batch output differs from per item output for {thermometer.model.name}.')
+
+      for name, build in (('per_item', _per_item), ('batch', _batch)):
+        seconds = _seconds(lambda: build(thermometer, payloads, rssi, time_ns, record_format))
+        results[f'{name}/{thermometer.model.name.lower()}_{record_format.name.lower()}'] = {
+            'ns_per_reading': round(seconds / n_readings * 1e9, 1),
+            'readings_per_second': round(n_readings / seconds),
+        }
+
+  json.dump({
+      'python': sys.version,
+      'machine': platform.machine(),
+      'readings': n_readings,
+      'results': results,
+  }, sys.stdout, indent=2)
+  print()
+
+
+# run() registers THERMOMETERS, as the flags require, even though the benchmark passes them directly.
+if __name__ == '__main__':
+  run(main)
@@ -0,0 +1,138 @@
+import json
+import platform
+import sys
+import timeit
+from typing import Any, Callable
+from unittest.mock import patch
+
+from absl import app, flags, logging
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+from influxdb_client import Point
+from line_protocol_cache.lineprotocolcache import LineProtocolCache
+
+from govee_h5072_logger import main as logger_main
+from govee_h5072_logger.datapoint import DataPoint
+from govee_h5072_logger.main import detection_callback
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.recordformat import RecordFormat
+from govee_h5072_logger.thermometer import Thermometer, find_thermometer, get_thermometer, register_flags_validator
+
+REPEAT = flags.DEFINE_integer(
+    name='repeat',
+    default=5,
+    lower_bound=1,
+    help='Number of timing runs of each benchmark. The fastest run is reported.',
+)
+
+THERMOMETERS = [
+    Thermometer('GVH5072_7705', 'A4:C1:38:00:77:05', 'Garden', Model.H5072),
+    Thermometer('GVH5105_1A2B', 'D0:35:18:00:1A:2B', 'Bedroom', Model.H5105),
+]
+H5072_BYTE_DATA = bytes.fromhex('0103aecd39')
+H5105_BYTE_DATA = bytes.fromhex('010103aecd')
+INVALID_BYTE_DATA = bytes.fromhex('01ffffff39')
+UNKNOWN_MAC = 'F0:0D:F0:0D:F0:0D'
+RSSI = -75
+
+
+def _advertisement(device_mac: str, byte_data: bytes) -> tuple[BLEDevice, AdvertisementData]:
+  return (BLEDevice(device_mac, None, None, RSSI), AdvertisementData(None, {0xec88: byte_data}, dict(), [], None, RSSI,
+                                                                   ()))
+
+
+def _raises(function: Callable[[], Any]) -> Callable[[], None]:
+
+  def wrapper() -> None:
+    try:
+      function()
+    except ValueError:
+      pass
+
+  return wrapper
+
+
+# The line protocol of a DataPoint as built with one influxdb_client.Point per field.
+def _points_baseline(data_point: DataPoint) -> list[str]:
+  lines: list[str] = []
+  for name, scale_factor, unit, value in data_point.fields():
+    point = Point('thermometer').tag('device_name', data_point.device_name).tag('nick_name', data_point.nick_name)
+    point.tag('model', data_point.model.name).tag('scale_factor', scale_factor).tag('unit', unit)
+    lines.append(point.field(name, value).time(0).to_line_protocol())  # type: ignore
+  return lines
+
+
+def _benchmarks() -> dict[str, Callable[[], Any]]:
+  h5072, h5105 = THERMOMETERS
+  h5072_data_point = DataPoint.build(h5072, H5072_BYTE_DATA, RSSI)
+  h5105_data_point = DataPoint.build(h5105, H5105_BYTE_DATA, RSSI)
+  h5072_points = h5072_data_point.to_points()
+  h5072_advertisement = _advertisement(h5072.device_mac, H5072_BYTE_DATA)
+  h5105_advertisement = _advertisement(h5105.device_mac, H5105_BYTE_DATA)
+  invalid_advertisement = _advertisement(h5072.device_mac, INVALID_BYTE_DATA)
+  unknown_advertisement = _advertisement(UNKNOWN_MAC, H5072_BYTE_DATA)
+
+  return {
+      'get_thermometer/known': lambda: get_thermometer(h5072.device_mac),
+      'get_thermometer/unknown': _raises(lambda: get_thermometer(UNKNOWN_MAC)),
+      'find_thermometer/unknown': lambda: find_thermometer(UNKNOWN_MAC),
+      'build/h5072': lambda: DataPoint.build(h5072, H5072_BYTE_DATA, RSSI),
+      'build/h5105': lambda: DataPoint.build(h5105, H5105_BYTE_DATA, RSSI),
+      'build/invalid': _raises(lambda: DataPoint.build(h5072, INVALID_BYTE_DATA, RSSI)),
+      'to_points/h5072': lambda: h5072_data_point.to_points(),
+      'to_points/h5105': lambda: h5105_data_point.to_points(),
+      'to_points/h5072_multi_field': lambda: h5072_data_point.to_points(RecordFormat.MULTI_FIELD),
+      'to_line_protocol/h5072': lambda: [p.to_line_protocol() for p in h5072_points],
+      'to_line_protocol/h5072_point_baseline': lambda: _points_baseline(h5072_data_point),
+      'put/h5072': lambda: LineProtocolCache.put(h5072_points),
+      'detection_callback/h5072': lambda: detection_callback(*h5072_advertisement),
+      'detection_callback/h5105': lambda: detection_callback(*h5105_advertisement),
+      'detection_callback/invalid': lambda: detection_callback(*invalid_advertisement),
+      'detection_callback/unknown_mac': lambda: detection_callback(*unknown_advertisement),
+      'detection_callback/h5072_stage_timing': lambda: detection_callback(*h5072_advertisement),
+  }
+
+
+def _time_ns(function: Callable[[], Any]) -> float:
+  timer = timeit.Timer(function)
+  number, _ = timer.autorange()
+  return min(timer.repeat(repeat=REPEAT.value, number=number)) / number * 1e9
+
+
+def main(args: list[str]) -> None:
+  # Errors logged by the invalid cases would otherwise flood the output.
+  logging.set_verbosity(logging.FATAL)
+
+  results: dict[str, float] = dict()
+  # Points are put into a no-op cache so that only the cost of the logger itself is measured.
+  with patch.object(LineProtocolCache, 'put', lambda points: None):
+    for name, function in _benchmarks().items():
+      # As the logger runs with --stage_timing.
+      stage_timing = name.endswith('_stage_timing')
+      if stage_timing:
+        logger_main.enable_stage_timing()
+      try:
+        results[name] = round(_time_ns(function), 1)
+      finally:
+        if stage_timing:
+          logger_main.disable_stage_timing()
+
+  json.dump({
+      'python': sys.version,
+      'machine': platform.machine(),
+      'ns_per_call': results,
+  }, sys.stdout, indent=2)
+  print()
+
+
+def run(main: Callable[[list[str]], None]) -> None:
+  thermometer_flags: list[str] = []
+  for t in THERMOMETERS:
+    thermometer_flags += [f'--device_names={t.device_name}', f'--device_macs={t.device_mac}',
+                          f'--nick_names={t.nick_name}', f'--models={t.model.name}']
+  register_flags_validator()
+  app.run(main, argv=sys.argv[:1] + thermometer_flags + sys.argv[1:])
+
+
+if __name__ == '__main__':
+  run(main)
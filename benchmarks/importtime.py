@@ -0,0 +1,81 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from absl import app, flags
+
+_REPEAT = flags.DEFINE_integer(
+    name='repeat',
+    default=5,
+    lower_bound=1,
+    help='Number of fresh interpreters importing the module. The fastest run is reported.',
+)
+
+_MODULE = flags.DEFINE_string(
+    name='module',
+    default='govee_h5072_logger.main',
+    help='Module to import, by default the one of the logger entry point.',
+)
+
+_TOP = flags.DEFINE_integer(
+    name='top',
+    default=15,
+    lower_bound=0,
+    help='Number of the slowest packages to report.',
+)
+
+_BASELINE_FILE = flags.DEFINE_string(
+    name='baseline_file',
+    default=os.path.join(os.path.dirname(__file__), 'importtime_baseline.json'),
+    help='Baseline listing the modules that must stay out of the import. Only --module as in the baseline is checked.',
+)
+
+
+# Runs `python -X importtime -c 'import module'` and returns the cumulative microseconds of each imported module.
+def _import_times_us(module: str) -> dict[str, int]:
+  stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True,
+                          check=True,
+                          text=True).stderr
+
+  times_us: dict[str, int] = dict()
+  # Lines look like "import time:       278 |        278 |   absl", after a header line.
+  for line in stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    _, cumulative_us, name = line.removeprefix('import time:').split('|')
+    times_us[name.strip()] = int(cumulative_us)
+  return times_us
+
+
+def main(args: list[str]) -> None:
+  runs = [_import_times_us(_MODULE.value) for _ in range(_REPEAT.value)]
+  fastest = min(runs, key=lambda times_us: times_us[_MODULE.value])
+
+  # Only top level packages, as their cumulative times include their submodules.
+  packages = {name: us for name, us in fastest.items() if '.' not in name and name != _MODULE.value.split('.')[0]}
+  slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:_TOP.value]
+
+  json.dump({
+      'python': sys.version,
+      'machine': platform.machine(),
+      'module': _MODULE.value,
+      'import_us': fastest[_MODULE.value],
+      'n_modules': len(fastest),
+      'slowest_packages_us': dict(slowest),
+  }, sys.stdout, indent=2)
+  print()
+
+  with open(_BASELINE_FILE.value) as file:
+    baseline = json.load(file)
+  if baseline['module'] != _MODULE.value:
+    return
+  # Times and the number of modules vary between machines and installs, unlike which of our modules are imported.
+  if imported := sorted(set(baseline['deferred_modules']) & fastest.keys()):
+    sys.exit(f'Modules that should only be imported when their flags are set were imported: {imported}.')
+
+
+if __name__ == '__main__':
+  app.run(main)
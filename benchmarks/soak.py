@@ -0,0 +1,315 @@
+import asyncio
+import json
+import os
+import random
+import resource
+import signal
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable
+from unittest.mock import patch
+
+from absl import app, flags, logging
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+from influxdb_client import Point
+from line_protocol_cache.lineprotocolcache import LineProtocolCache
+
+from govee_h5072_logger import main as logger_main
+from govee_h5072_logger.decoder import DECODERS
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.thermometer import register_flags_validator, reload_thermometers
+
+_SOAK_DEVICES = flags.DEFINE_integer(
+    name='soak_devices',
+    default=100,
+    lower_bound=1,
+    help='Number of simulated thermometers, alternating between H5072 and H5105.',
+)
+
+_SOAK_RATE = flags.DEFINE_float(
+    name='soak_rate',
+    default=1000,
+    lower_bound=1,
+    help='Advertisements per second generated in total, including the unknown and malformed ones.',
+)
+
+_SOAK_SECONDS = flags.DEFINE_float(
+    name='soak_seconds',
+    default=60,
+    lower_bound=1,
+    help='Duration of the run.',
+)
+
+_SOAK_UNKNOWN_FRACTION = flags.DEFINE_float(
+    name='soak_unknown_fraction',
+    default=0.3,
+    lower_bound=0,
+    upper_bound=1,
+    help='Fraction of advertisements from devices that are not registered thermometers.',
+)
+
+_SOAK_MALFORMED_FRACTION = flags.DEFINE_float(
+    name='soak_malformed_fraction',
+    default=0.01,
+    lower_bound=0,
+    upper_bound=1,
+    help='Fraction of advertisements from registered thermometers with an invalid or missing payload.',
+)
+
+_SOAK_REPORT_SECONDS = flags.DEFINE_float(
+    name='soak_report_seconds',
+    default=10,
+    lower_bound=0.1,
+    help='Interval between reports.',
+)
+
+_SOAK_TRACEMALLOC = flags.DEFINE_bool(
+    name='soak_tracemalloc',
+    default=False,
+    help='Trace Python allocations to report their growth. Slows down the logger considerably.',
+)
+
+# Advertisements are generated in ticks of this many seconds.
+_TICK_SECONDS = 0.005
+# Number of payload variants of each thermometer, so that consecutive readings differ.
+_N_VARIANTS = 16
+
+
+def _mac(prefix: int, i: int) -> str:
+  return ':'.join(f'{b:02X}' for b in (prefix.to_bytes(3, 'big') + i.to_bytes(3, 'big')))
+
+
+def _payload(model: Model, temperature_c_10x: int, humidity_percent_10x: int) -> bytes:
+  encoded_data = abs(temperature_c_10x) * 1000 + humidity_percent_10x
+  if temperature_c_10x < 0:
+    encoded_data |= 0x80_0000
+  if model == Model.H5072:
+    return b'\x01' + encoded_data.to_bytes(3, 'big') + b'\x64'
+  return b'\x01\x01' + encoded_data.to_bytes(3, 'big')
+
+
+def _advertisement(device_mac: str, manufacturer_data: dict[int, bytes]) -> tuple[BLEDevice, AdvertisementData]:
+  rssi = random.randint(-100, -40)
+  return (BLEDevice(device_mac, None, None, rssi), AdvertisementData(None, manufacturer_data, dict(), [], None, rssi,
+                                                                    ()))
+
+
+def _thermometers(n_devices: int) -> list[dict[str, str]]:
+  return [{
+      'device_name': f'soak_{i}',
+      'device_mac': _mac(0xa4c138, i),
+      'nick_name': f'Soak {i}',
+      'model': (Model.H5072 if i % 2 == 0 else Model.H5105).name,
+  } for i in range(n_devices)]
+
+
+# Prebuilt advertisements by kind, so that generating them costs little next to processing them.
+def _advertisements() -> dict[str, list[tuple[BLEDevice, AdvertisementData]]]:
+  advertisements: dict[str, list[tuple[BLEDevice, AdvertisementData]]] = {
+      'valid': [],
+      'malformed': [],
+      'unknown': [],
+  }
+
+  for thermometer in _thermometers(_SOAK_DEVICES.value):
+    model = Model[thermometer['model']]
+    company_id = 0xec88 if model == Model.H5072 else 0x0001
+    for _ in range(_N_VARIANTS):
+      payload = _payload(model, random.randint(-200, 400), random.randint(0, 999))
+      advertisements['valid'].append(_advertisement(thermometer['device_mac'], {company_id: payload}))
+    # All ones where the model's decoder reads the encoded data.
+    invalid_payload = bytes(DECODERS[model].offset) + b'\xff\xff\xff\x64'
+    advertisements['malformed'].append(_advertisement(thermometer['device_mac'], {company_id: invalid_payload}))
+    advertisements['malformed'].append(_advertisement(thermometer['device_mac'], dict()))
+
+  for i in range(_SOAK_DEVICES.value):
+    advertisements['unknown'].append(_advertisement(_mac(0xf00df0, i), {0x004c: b'\x02\x15'}))
+  return advertisements
+
+
+# Stands in for BleakScanner, calling the detection callback with generated advertisements at --soak_rate.
+class _SimulatedScanner:
+  generated: Counter[str] = Counter()
+  # Advertisements that were due but not generated, because the logger could not keep up.
+  skipped = 0
+
+  def __init__(self, detection_callback: Callable[[BLEDevice, AdvertisementData], None], **kwargs: Any) -> None:
+    self._detection_callback = detection_callback
+    self._advertisements = _advertisements()
+    self._task: asyncio.Task | None = None
+
+  async def __aenter__(self) -> '_SimulatedScanner':
+    await self.start()
+    return self
+
+  async def __aexit__(self, *args: Any) -> None:
+    await self.stop()
+
+  # Started and stopped directly by --scan_interval_seconds.
+  async def start(self) -> None:
+    self._task = asyncio.create_task(self._generate())
+
+  async def stop(self) -> None:
+    assert self._task is not None
+    self._task.cancel()
+
+  async def _generate(self) -> None:
+    kinds = ['valid', 'malformed', 'unknown']
+    valid_fraction = (1 - _SOAK_UNKNOWN_FRACTION.value) * (1 - _SOAK_MALFORMED_FRACTION.value)
+    malformed_fraction = (1 - _SOAK_UNKNOWN_FRACTION.value) * _SOAK_MALFORMED_FRACTION.value
+    weights = [valid_fraction, malformed_fraction, _SOAK_UNKNOWN_FRACTION.value]
+    # Advertisements generated in a tick are capped, so that a logger that cannot keep up is not hit by bursts.
+    max_per_tick = int(_SOAK_RATE.value * _TICK_SECONDS * 4) + 1
+    start = time.perf_counter()
+    n_due = 0
+
+    while True:
+      await asyncio.sleep(_TICK_SECONDS)
+      n_due_now = int((time.perf_counter() - start) * _SOAK_RATE.value) - n_due
+      n_due += n_due_now
+      n_generated = min(n_due_now, max_per_tick)
+      _SimulatedScanner.skipped += n_due_now - n_generated
+
+      for kind in random.choices(kinds, weights, k=n_generated):
+        self.generated[kind] += 1
+        self._detection_callback(*random.choice(self._advertisements[kind]))
+
+
+class _PutRecorder:
+  def __init__(self, put: Callable[[list[Point]], None]) -> None:
+    self._put = put
+    self.n_points = 0
+    # Seconds from each reading to the end of the put() with it, of the oldest reading in each put().
+    # Latency and aggregate points are timestamped before their readings, so only 'thermometer' points are measured.
+    self.latencies: list[float] = []
+
+  def __call__(self, points: list[Point]) -> None:
+    self._put(points)
+    now_ns = time.time_ns()
+    for point in points:
+      if (line := point.to_line_protocol()).startswith('thermometer,'):
+        self.latencies.append((now_ns - int(line.rsplit(' ', 1)[1])) / 1e9)
+        break
+    self.n_points += len(points)
+
+
+def _rss_bytes() -> int:
+  try:
+    with open('/proc/self/status') as file:
+      for line in file:
+        if line.startswith('VmRSS:'):
+          return int(line.split()[1]) * 1024
+  except OSError:
+    pass
+  # Peak rather than current RSS, in kilobytes on Linux and bytes on macOS.
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float | None:
+  if not sorted_values:
+    return None
+  return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+class _Reporter:
+  def __init__(self, recorder: _PutRecorder) -> None:
+    self._recorder = recorder
+    self._start = time.perf_counter()
+    self._last = (self._start, Counter(), 0)
+    self._first_rss_bytes = _rss_bytes()
+    self._first_traced_bytes = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+  # Rates are over the interval since the last report, or over the whole run.
+  def report(self, whole_run: bool = False) -> dict[str, Any]:
+    now = time.perf_counter()
+    last_time, last_generated, last_readings = (self._start, Counter(), 0) if whole_run else self._last
+    generated = Counter(_SimulatedScanner.generated)
+    readings = sum(logger_main.READING_COUNTERS.values())
+    seconds = now - last_time
+    latencies = sorted(self._recorder.latencies)
+    self._recorder.latencies.clear()
+    self._last = (now, generated, readings)
+
+    report: dict[str, Any] = {
+        'elapsed_seconds': round(now - self._start, 3),
+        'generated_per_second': round(sum((generated - last_generated).values()) / seconds, 1),
+        'accepted_per_second': round((readings - last_readings) / seconds, 1),
+        'generated': dict(generated),
+        'skipped': _SimulatedScanner.skipped,
+        'advertisements': dict(logger_main.ADVERTISEMENT_COUNTERS),
+        'parse_errors': dict(logger_main.PARSE_ERROR_COUNTERS),
+        'readings': readings,
+        'points_put': self._recorder.n_points,
+        'rss_bytes': _rss_bytes(),
+        'rss_growth_bytes': _rss_bytes() - self._first_rss_bytes,
+    }
+    # Latencies are only kept for the interval, to keep the memory of long runs bounded.
+    if not whole_run:
+      report['latency_seconds'] = {
+          'p50': _percentile(latencies, 0.5),
+          'p90': _percentile(latencies, 0.9),
+          'p99': _percentile(latencies, 0.99),
+          'max': latencies[-1] if latencies else None,
+      }
+    if logger_main._INGEST_QUEUE is not None:
+      report['ingest_queue'] = {'depth': logger_main._INGEST_QUEUE.depth, 'dropped': logger_main._INGEST_QUEUE.dropped}
+    if tracemalloc.is_tracing():
+      traced_bytes, peak_traced_bytes = tracemalloc.get_traced_memory()
+      report['traced_bytes'] = traced_bytes
+      report['traced_growth_bytes'] = traced_bytes - self._first_traced_bytes
+      report['peak_traced_bytes'] = peak_traced_bytes
+    return report
+
+
+async def _soak(args: list[str]) -> None:
+  recorder = _PutRecorder(LineProtocolCache.put)
+  with patch.object(logger_main, 'BleakScanner', _SimulatedScanner), patch.object(LineProtocolCache, 'put', recorder):
+    logger = asyncio.create_task(logger_main.main(args))
+    # Let the logger start its pipeline and scanner before measuring.
+    await asyncio.sleep(_TICK_SECONDS * 10)
+    reporter = _Reporter(recorder)
+
+    deadline = time.perf_counter() + _SOAK_SECONDS.value
+    while (remaining := deadline - time.perf_counter()) > 0:
+      await asyncio.sleep(min(_SOAK_REPORT_SECONDS.value, remaining))
+      print(json.dumps(reporter.report()), flush=True)
+
+    # main() stops on SIGTERM, and drains the pipeline on the way out.
+    signal.raise_signal(signal.SIGTERM)
+    await logger
+    print(json.dumps({'whole_run': reporter.report(whole_run=True)}), flush=True)
+
+
+def main(args: list[str]) -> None:
+  # The placeholder thermometers written by run() are replaced now that the number of devices is parsed.
+  _write_thermometers(_SOAK_DEVICES.value)
+  if not reload_thermometers():
+    raise RuntimeError('Unable to register the simulated thermometers.')
+  # Errors logged for the malformed advertisements would otherwise flood the output.
+  logging.set_verbosity(logging.FATAL)
+  if _SOAK_TRACEMALLOC.value:
+    tracemalloc.start()
+  asyncio.run(_soak(args))
+
+
+def _write_thermometers(n_devices: int) -> None:
+  with open('thermometers.json', 'w') as file:
+    json.dump(_thermometers(n_devices), file)
+
+
+# Runs in a temporary directory, where LineProtocolCache keeps its data, with the simulated thermometers registered.
+def run() -> None:
+  with tempfile.TemporaryDirectory() as temp_dir:
+    os.chdir(temp_dir)
+    # The thermometers are validated while parsing flags, before --soak_devices can be read.
+    _write_thermometers(1)
+    register_flags_validator()
+    app.run(main, argv=sys.argv[:1] + ['--thermometers_file=thermometers.json'] + sys.argv[1:])
+
+
+if __name__ == '__main__':
+  run()
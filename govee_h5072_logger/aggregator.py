@@ -0,0 +1,98 @@
+import time
+from dataclasses import dataclass, field
+
+from influxdb_client import Point
+
+from govee_h5072_logger.datapoint import DataPoint
+
+
+@dataclass
+class _Accumulator:
+  count: int
+  min: int
+  max: int
+  sum: int
+  last: int
+
+  def add(self, value: int) -> None:
+    self.count += 1
+    self.min = min(self.min, value)
+    self.max = max(self.max, value)
+    self.sum += value
+    self.last = value
+
+
+@dataclass
+class _Window:
+  start_ns: int
+  data_point: DataPoint
+  count: int = 0
+  # Mapping from field name to its accumulator. Values keep the scale factors of DataPoint.fields().
+  accumulators: dict[str, _Accumulator] = field(default_factory=dict)
+
+  def add(self, data_point: DataPoint) -> None:
+    self.data_point = data_point
+    self.count += 1
+    for name, _, _, value in data_point.fields():
+      if (accumulator := self.accumulators.get(name)) is None:
+        self.accumulators[name] = _Accumulator(1, value, value, value, value)
+      else:
+        accumulator.add(value)
+
+
+# Accumulates data points of each thermometer into windows aligned to multiples of the window length since epoch.
+# Each window becomes a single 'thermometer_aggregate' point, timestamped at the start of the window.
+class Aggregator:
+  def __init__(self, window_seconds: int) -> None:
+    self._window_ns = window_seconds * 1_000_000_000
+
+    # Mapping from device_name to its open window.
+    self._windows: dict[str, _Window] = dict()
+
+  def add(self, data_point: DataPoint, time_ns: int | None = None) -> list[Point]:
+    if time_ns is None:
+      time_ns = time.time_ns()
+    start_ns = time_ns // self._window_ns * self._window_ns
+    points: list[Point] = []
+
+    window = self._windows.get(data_point.device_name)
+    if window is not None and window.start_ns != start_ns:
+      points.append(self._to_point(window))
+      window = None
+    if window is None:
+      window = self._windows[data_point.device_name] = _Window(start_ns, data_point)
+
+    window.add(data_point)
+    return points
+
+  # Flushes windows that have ended, or all windows if flush_all is set.
+  def flush(self, flush_all: bool = False) -> list[Point]:
+    start_ns = time.time_ns() // self._window_ns * self._window_ns
+    points: list[Point] = []
+
+    for device_name, window in list(self._windows.items()):
+      if flush_all or window.start_ns < start_ns:
+        points.append(self._to_point(window))
+        del self._windows[device_name]
+
+    return points
+
+  def seconds_until_next_window(self) -> float:
+    return (self._window_ns - time.time_ns() % self._window_ns) / 1_000_000_000
+
+  def _to_point(self, window: _Window) -> Point:
+    point = Point('thermometer_aggregate')
+    point.tag('device_name', window.data_point.device_name)
+    point.tag('nick_name', window.data_point.nick_name)
+    point.tag('model', window.data_point.model.name)
+    point.tag('window_seconds', self._window_ns // 1_000_000_000)
+
+    point.field('count', window.count)
+    for name, accumulator in window.accumulators.items():
+      point.field(f'{name}_min', accumulator.min)
+      point.field(f'{name}_max', accumulator.max)
+      point.field(f'{name}_mean', accumulator.sum / accumulator.count)
+      point.field(f'{name}_last', accumulator.last)
+
+    point.time(window.start_ns)  # type: ignore
+    return point
@@ -0,0 +1,234 @@
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import urllib.parse
+import zlib
+from dataclasses import dataclass
+from typing import Iterator
+
+from absl import logging
+
+from govee_h5072_logger.datapoint import DataPoint
+from govee_h5072_logger.ingestqueue import IngestQueue
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.overflowpolicy import OverflowPolicy
+
+# An archive file holds the readings of one thermometer during one UTC day, as a sequence of blocks.
+# Each block has a header, the thermometer as JSON, and then one column per field:
+#   temperature_c_10x 'h', humidity_percent_10x 'H', battery_percent 'h' (-1 if not reported) and rssi 'b'.
+#   time deltas: nanoseconds since the previous reading, 0 for the first reading of the block, as LEB128 varints.
+#   Readings a few seconds apart take 5 bytes rather than 8, so a reading takes about 12 bytes.
+# The JSON is padded so that the columns start 8 byte aligned, and each fixed width column is copied out of the memory
+# map at once. Columns are little endian like the header. Timestamps are kept to the nanosecond, so that exported points
+# overwrite the ones originally written rather than landing next to them. The adapter is not archived though, so points
+# written with an adapter tag, when scanning with several adapters, are exported as separate points without it.
+# The header holds the length and CRC32 of the rest of the block, so that a block torn by the logger being killed is
+# detected, and reading resumes at the next block appended after a restart.
+_MAGIC = b'GVA3'
+# Magic, length and CRC32 of the block after the header, number of readings, time of the first reading in ns, JSON
+# length.
+_BLOCK_HEADER = struct.Struct('<4sIIIqH')
+_COLUMNS = ('h', 'H', 'h', 'b')
+_NO_BATTERY = -1
+_DAY_NS = 86_400_000_000_000
+# Full blocks waiting for the writer thread. The oldest are dropped while the disk is stuck.
+_MAX_QUEUED_BLOCKS = 64
+
+
+def _padded(size: int) -> int:
+  return (size + 7) // 8 * 8
+
+
+def _append_varint(buffer: bytearray, value: int) -> None:
+  while value >= 0x80:
+    buffer.append(value & 0x7f | 0x80)
+    value >>= 7
+  buffer.append(value)
+
+
+# Returns the value and the offset after it.
+def _read_varint(buffer: mmap.mmap, offset: int) -> tuple[int, int]:
+  value = shift = 0
+  while (byte := buffer[offset]) & 0x80:
+    value |= (byte & 0x7f) << shift
+    shift += 7
+    offset += 1
+  return value | byte << shift, offset + 1
+
+
+@dataclass(frozen=True)
+class ArchivedBlock:
+  device_name: str
+  nick_name: str
+  model: Model
+  time_ns: int
+  time_deltas_ns: array.array
+  temperature_c_10x: array.array
+  humidity_percent_10x: array.array
+  battery_percent: array.array
+  rssi: array.array
+
+  def __len__(self) -> int:
+    return len(self.time_deltas_ns)
+
+  # The readings with their timestamps in nanoseconds.
+  def data_points(self) -> Iterator[tuple[DataPoint, int]]:
+    time_ns = self.time_ns
+    for i in range(len(self)):
+      time_ns += self.time_deltas_ns[i]
+      battery_percent = self.battery_percent[i]
+      yield DataPoint(self.device_name, self.nick_name, self.model, self.temperature_c_10x[i],
+                      self.humidity_percent_10x[i], None if battery_percent == _NO_BATTERY else battery_percent,
+                      self.rssi[i]), time_ns
+
+
+class _PendingBlock:
+  def __init__(self, data_point: DataPoint, time_ns: int) -> None:
+    self.device_name = data_point.device_name
+    self.nick_name = data_point.nick_name
+    self.model = data_point.model
+    self.time_ns = time_ns
+    self.last_time_ns = time_ns
+    self.columns = [array.array(typecode) for typecode in _COLUMNS]
+    self.time_deltas_ns = bytearray()
+
+  def accepts(self, data_point: DataPoint, time_ns: int) -> bool:
+    return (data_point.nick_name == self.nick_name and data_point.model == self.model and
+            time_ns // _DAY_NS == self.time_ns // _DAY_NS and time_ns >= self.last_time_ns)
+
+  def __len__(self) -> int:
+    return len(self.columns[0])
+
+  def add(self, data_point: DataPoint, time_ns: int) -> None:
+    temperature_c_10x, humidity_percent_10x, battery_percent, rssi = self.columns
+    _append_varint(self.time_deltas_ns, time_ns - self.last_time_ns)
+    temperature_c_10x.append(data_point.temperature_c_10x)
+    humidity_percent_10x.append(data_point.humidity_percent_10x)
+    battery_percent.append(_NO_BATTERY if data_point.battery_percent is None else data_point.battery_percent)
+    rssi.append(data_point.rssi)
+    self.last_time_ns = time_ns
+
+  def to_bytes(self) -> bytes:
+    thermometer = json.dumps({'device_name': self.device_name, 'nick_name': self.nick_name, 'model': self.model.name})
+    thermometer_bytes = thermometer.encode()
+    body = thermometer_bytes.ljust(_padded(_BLOCK_HEADER.size + len(thermometer_bytes)) - _BLOCK_HEADER.size, b'\0')
+    for column in self.columns:
+      if sys.byteorder == 'big':
+        column = array.array(column.typecode, column)
+        column.byteswap()
+      body += column.tobytes()
+    body += self.time_deltas_ns
+    body = body.ljust(_padded(_BLOCK_HEADER.size + len(body)) - _BLOCK_HEADER.size, b'\0')
+
+    header = _BLOCK_HEADER.pack(_MAGIC, len(body), zlib.crc32(body), len(self), self.time_ns, len(thermometer_bytes))
+    return header + body
+
+
+# Archives readings into one file per thermometer per UTC day under a directory.
+# Readings are held in memory until block_size of them are collected, the day changes, or the writer is closed.
+# Blocks are then appended to their files by a writer thread, so that the event loop never waits on the disk.
+class ArchiveWriter:
+  def __init__(self, directory: str, block_size: int) -> None:
+    self._directory = directory
+    self._block_size = block_size
+    # Mapping from device_name to the block being collected.
+    self._pending: dict[str, _PendingBlock] = dict()
+    self._queue: IngestQueue[_PendingBlock] = IngestQueue(_MAX_QUEUED_BLOCKS, OverflowPolicy.DROP_OLDEST,
+                                                          _MAX_QUEUED_BLOCKS, 0, self._write_blocks, 'ArchiveWriter')
+
+  # Number of full blocks dropped because the writer thread fell behind.
+  @property
+  def dropped(self) -> int:
+    return self._queue.dropped
+
+  def start(self) -> None:
+    self._queue.start()
+
+  def add(self, data_point: DataPoint, time_ns: int) -> None:
+    block = self._pending.get(data_point.device_name)
+    if block is not None and not block.accepts(data_point, time_ns):
+      self._queue.put([self._pending.pop(data_point.device_name)])
+      block = None
+    if block is None:
+      block = self._pending[data_point.device_name] = _PendingBlock(data_point, time_ns)
+
+    block.add(data_point, time_ns)
+    if len(block) >= self._block_size:
+      self._queue.put([self._pending.pop(data_point.device_name)])
+
+  # Writes out the blocks being collected, and waits for the writer thread to write every block.
+  def close(self) -> None:
+    self._queue.put(list(self._pending.values()))
+    self._pending.clear()
+    self._queue.close()
+
+  def path(self, device_name: str, time_ns: int) -> str:
+    day = time.strftime('%Y-%m-%d', time.gmtime(time_ns // 1_000_000_000))
+    return os.path.join(self._directory, urllib.parse.quote(device_name, safe=''), f'{day}.gva')
+
+  def _write_blocks(self, blocks: list[_PendingBlock]) -> None:
+    for block in blocks:
+      path = self.path(block.device_name, block.time_ns)
+      try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as file:
+          file.write(block.to_bytes())
+      except OSError:
+        logging.exception('Unable to archive %d readings to %s.', len(block), path)
+
+
+def _read_block(buffer: mmap.mmap, offset: int) -> ArchivedBlock | None:
+  try:
+    magic, body_length, crc32, n_readings, time_ns, thermometer_length = _BLOCK_HEADER.unpack_from(buffer, offset)
+  except struct.error:
+    return None
+  body_offset = offset + _BLOCK_HEADER.size
+  if magic != _MAGIC or body_offset + body_length > len(buffer):
+    return None
+  if zlib.crc32(buffer[body_offset:body_offset + body_length]) != crc32:
+    return None
+
+  thermometer = json.loads(bytes(buffer[body_offset:body_offset + thermometer_length]))
+  column_offset = _padded(body_offset + thermometer_length)
+  columns: list[array.array] = []
+  for typecode in _COLUMNS:
+    size = n_readings * struct.calcsize(typecode)
+    column = array.array(typecode)
+    column.frombytes(buffer[column_offset:column_offset + size])
+    if sys.byteorder == 'big':
+      column.byteswap()
+    columns.append(column)
+    column_offset += size
+
+  time_deltas_ns = array.array('q')
+  for _ in range(n_readings):
+    time_delta_ns, column_offset = _read_varint(buffer, column_offset)
+    time_deltas_ns.append(time_delta_ns)
+
+  return ArchivedBlock(thermometer['device_name'], thermometer['nick_name'], Model[thermometer['model']], time_ns,
+                       time_deltas_ns, *columns)
+
+
+def read_archive(path: str) -> Iterator[ArchivedBlock]:
+  with open(path, 'rb') as file:
+    if file.seek(0, 2) == 0:
+      return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+      offset = 0
+      while offset < len(buffer):
+        if (block := _read_block(buffer, offset)) is not None:
+          yield block
+          offset += _BLOCK_HEADER.size + _BLOCK_HEADER.unpack_from(buffer, offset)[1]
+          continue
+
+        # The logger might have been killed in the middle of writing a block, and appended more after restarting.
+        next_offset = buffer.find(_MAGIC, offset + 1)
+        logging.warning('Skipping %d bytes of a torn block at offset %d of %s.',
+                        (len(buffer) if next_offset == -1 else next_offset) - offset, offset, path)
+        if next_offset == -1:
+          return
+        offset = next_offset
@@ -0,0 +1,60 @@
+import sys
+from typing import TextIO
+
+from absl import app, flags, logging
+
+from govee_h5072_logger.archive import read_archive
+from govee_h5072_logger.flag import RECORD_FORMAT
+
+_ARCHIVE_FILES = flags.DEFINE_multi_string(
+    name='archive_files',
+    default=None,
+    required=True,
+    help='Archive files written with --archive_dir to export, in order.',
+)
+
+_EXPORT_FILE = flags.DEFINE_string(
+    name='export_file',
+    default='-',
+    help='File to write the line protocol to, or - for stdout. E.g. pipe stdout into `influx write`.',
+)
+
+_EXPORT_BATCH_SIZE = flags.DEFINE_integer(
+    name='export_batch_size',
+    default=5000,
+    lower_bound=1,
+    help='Number of lines written at once.',
+)
+
+
+# Writes the readings of the archive files as the line protocol DataPoint.to_points() would have written.
+# Returns the number of readings.
+def export(paths: list[str], output: TextIO, batch_size: int) -> int:
+  n_readings = 0
+  lines: list[str] = []
+
+  for path in paths:
+    for block in read_archive(path):
+      for data_point, time_ns in block.data_points():
+        lines.extend(point.to_line_protocol() for point in data_point.to_points(RECORD_FORMAT.value, time_ns))
+        if len(lines) >= batch_size:
+          output.write('\n'.join(lines) + '\n')
+          lines.clear()
+      n_readings += len(block)
+
+  if lines:
+    output.write('\n'.join(lines) + '\n')
+  return n_readings
+
+
+def main(args: list[str]) -> None:
+  if _EXPORT_FILE.value == '-':
+    n_readings = export(_ARCHIVE_FILES.value, sys.stdout, _EXPORT_BATCH_SIZE.value)
+  else:
+    with open(_EXPORT_FILE.value, 'w') as file:
+      n_readings = export(_ARCHIVE_FILES.value, file, _EXPORT_BATCH_SIZE.value)
+  logging.info('Exported %d readings.', n_readings)
+
+
+def app_run_main() -> None:
+  app.run(main)
@@ -0,0 +1,111 @@
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+from absl import logging
+
+# A capture file is a sequence of records, each starting with a 1 byte record type.
+# Session: written whenever the file is opened, to map the monotonic clock of the process to wall clock time.
+_SESSION = 0
+_SESSION_LAYOUT = struct.Struct('<BQQ')  # Record type, time.time_ns(), time.monotonic_ns().
+# Advertisement: followed by the given number of manufacturer data entries.
+_ADVERTISEMENT = 1
+_ADVERTISEMENT_LAYOUT = struct.Struct('<BQ6sbB')  # Record type, time.monotonic_ns(), MAC, RSSI, number of entries.
+_MANUFACTURER_DATA_LAYOUT = struct.Struct('<HB')  # Company ID, data length, followed by data.
+
+
+@dataclass(frozen=True)
+class CapturedAdvertisement:
+  time_ns: int
+  monotonic_ns: int
+  device_mac: str
+  rssi: int
+  manufacturer_data: dict[int, bytes]
+
+
+class CaptureWriter:
+  def __init__(self, path: str) -> None:
+    _truncate_torn_record(path)
+    self._file: BinaryIO = open(path, 'ab')
+    self._file.write(_SESSION_LAYOUT.pack(_SESSION, time.time_ns(), time.monotonic_ns()))
+
+  def close(self) -> None:
+    self._file.close()
+
+  # Advertisements from addresses that are not MACs, e.g. the UUIDs given on macOS, are not captured.
+  def write(self, device_mac: str, rssi: int, manufacturer_data: dict[int, bytes]) -> None:
+    try:
+      mac_bytes = bytes.fromhex(device_mac.replace(':', ''))
+    except ValueError:
+      return
+    if len(mac_bytes) != 6:
+      return
+
+    record = [_ADVERTISEMENT_LAYOUT.pack(_ADVERTISEMENT, time.monotonic_ns(), mac_bytes, rssi, len(manufacturer_data))]
+    for company_id, byte_data in manufacturer_data.items():
+      record.append(_MANUFACTURER_DATA_LAYOUT.pack(company_id, len(byte_data)))
+      record.append(byte_data)
+    self._file.write(b''.join(record))
+
+
+def read_capture(path: str) -> Iterator[CapturedAdvertisement]:
+  for advertisement, _ in _read_records(path):
+    if advertisement is not None:
+      yield advertisement
+
+
+# The logger might have been killed in the middle of writing a record. Appending after it would make the records after
+# it unreadable, so the file is cut back to its last complete record first.
+def _truncate_torn_record(path: str) -> None:
+  if not os.path.exists(path):
+    return
+  length = 0
+  for _, length in _read_records(path):
+    pass
+  if length < (size := os.path.getsize(path)):
+    logging.warning('Truncating %d bytes of a torn record at the end of %s.', size - length, path)
+    os.truncate(path, length)
+
+
+# Yields each record, None for sessions, with the offset after it.
+def _read_records(path: str) -> Iterator[tuple[CapturedAdvertisement | None, int]]:
+  with open(path, 'rb') as file:
+    if file.seek(0, 2) == 0:
+      return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+      offset = 0
+      # Wall clock time minus monotonic time of the current session.
+      clock_offset_ns = 0
+
+      while offset < len(buffer):
+        try:
+          if buffer[offset] == _SESSION:
+            _, time_ns, monotonic_ns = _SESSION_LAYOUT.unpack_from(buffer, offset)
+            offset += _SESSION_LAYOUT.size
+            clock_offset_ns = time_ns - monotonic_ns
+            yield None, offset
+            continue
+
+          if buffer[offset] != _ADVERTISEMENT:
+            raise ValueError(f'Unexpected record type {buffer[offset]} at offset {offset} of {path}.')
+          _, monotonic_ns, mac_bytes, rssi, n_entries = _ADVERTISEMENT_LAYOUT.unpack_from(buffer, offset)
+          end = offset + _ADVERTISEMENT_LAYOUT.size
+
+          manufacturer_data: dict[int, bytes] = dict()
+          for _ in range(n_entries):
+            company_id, length = _MANUFACTURER_DATA_LAYOUT.unpack_from(buffer, end)
+            end += _MANUFACTURER_DATA_LAYOUT.size + length
+            if end > len(buffer):
+              raise struct.error('Manufacturer data is truncated.')
+            manufacturer_data[company_id] = buffer[end - length:end]
+        except struct.error:
+          # The logger might have been killed in the middle of writing the last record.
+          logging.warning('Ignoring truncated record at offset %d of %s.', offset, path)
+          return
+
+        offset = end
+        yield CapturedAdvertisement(monotonic_ns + clock_offset_ns, monotonic_ns, mac_bytes.hex(':').upper(), rssi,
+                                    manufacturer_data), offset
@@ -1,101 +1,165 @@
 import time
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Self
+from typing import Self, Sequence
 
 from influxdb_client import Point
 
+from govee_h5072_logger.decoder import DECODERS
 from govee_h5072_logger.model import Model
+from govee_h5072_logger.recordformat import RecordFormat
+from govee_h5072_logger.serializedpoint import SerializedPoint
 from govee_h5072_logger.thermometer import Thermometer
 
+# Mapping from (device_name, nick_name, model, adapter) to the line protocol of each field up to the '=' of the field
+# value. The escaped and sorted measurement and tags are computed once per thermometer instead of once per
+# advertisement.
+_LINE_PREFIXES: dict[tuple[str, str, Model, str | None], dict[str, str]] = dict()
 
-@dataclass(frozen=True)
+# Mapping from (device_name, nick_name, model, adapter) to the line protocol of a multi-field record up to its first
+# field.
+_RECORD_PREFIXES: dict[tuple[str, str, Model, str | None], str] = dict()
+
+
+@dataclass(frozen=True, slots=True)
 class DataPoint:
   device_name: str
   nick_name: str
   model: Model
 
-  temperature_c: Decimal
-  humidity_percent: Decimal
+  temperature_c_10x: int
+  humidity_percent_10x: int
   battery_percent: int | None
   rssi: int
+  # The Bluetooth adapter that heard the advertisement, when scanning with several adapters.
+  adapter: str | None = None
 
   @classmethod
-  def build(cls, thermometer: Thermometer, byte_data: bytes, rssi: int) -> Self:
-    if thermometer.model == Model.H5072:
-      temperature_c, humidity_percent, battery_percent = DataPoint._parse_h5072(byte_data)
-    elif thermometer.model == Model.H5105:
-      temperature_c, humidity_percent = DataPoint._parse_h5105(byte_data)
-      battery_percent = None
-    else:
+  def build(cls, thermometer: Thermometer, byte_data: bytes, rssi: int, adapter: str | None = None) -> Self:
+    if (decoder := DECODERS.get(thermometer.model)) is None:
       raise NotImplementedError(f'Data parsing is not available for model {thermometer.model}.')
 
-    return cls(thermometer.device_name, thermometer.nick_name, thermometer.model, temperature_c, humidity_percent,
-               battery_percent, rssi)
+    return cls(thermometer.device_name, thermometer.nick_name, thermometer.model, *decoder.decode(byte_data), rssi,
+               adapter)
+
+  @property
+  def temperature_c(self) -> Decimal:
+    return Decimal(self.temperature_c_10x) / 10
+
+  @property
+  def humidity_percent(self) -> Decimal:
+    return Decimal(self.humidity_percent_10x) / 10
 
   def _point_with_common_tags(self) -> Point:
     point = Point('thermometer')
     point.tag('device_name', self.device_name)
     point.tag('nick_name', self.nick_name)
     point.tag('model', self.model.name)
+    if self.adapter is not None:
+      point.tag('adapter', self.adapter)
     return point
 
-  def to_points(self) -> list[Point]:
-    time_ns = time.time_ns()
-    points: list[Point] = []
-
-    temperature = self._point_with_common_tags()
-    temperature.tag('scale_factor', 10).tag('unit', '°C')
-    temperature.field('temperature', int(self.temperature_c * 10))
-    temperature.time(time_ns)  # type: ignore
-    points.append(temperature)
-
-    humidity = self._point_with_common_tags()
-    humidity.tag('scale_factor', 10).tag('unit', '%RH')
-    humidity.field('humidity', int(self.humidity_percent * 10))
-    humidity.time(time_ns)  # type: ignore
-    points.append(humidity)
-
+  # Fields as (name, scale_factor, unit, scaled integer value).
+  def fields(self) -> list[tuple[str, int, str, int]]:
+    fields = [
+        ('temperature', 10, '°C', self.temperature_c_10x),
+        ('humidity', 10, '%RH', self.humidity_percent_10x),
+    ]
     if self.battery_percent is not None:
-      battery = self._point_with_common_tags()
-      battery.tag('scale_factor', 1).tag('unit', '%')
-      battery.field('battery', self.battery_percent)
-      battery.time(time_ns)  # type: ignore
-      points.append(battery)
-
-    rssi = self._point_with_common_tags()
-    rssi.tag('scale_factor', 1).tag('unit', 'dBm')
-    rssi.field('rssi', self.rssi)
-    rssi.time(time_ns)  # type: ignore
-    points.append(rssi)
-
-    return points
-
-  @staticmethod
-  def _parse_h5072(byte_data: bytes) -> tuple[Decimal, Decimal, int]:
-    encoded_data = int.from_bytes(byte_data[1:4], byteorder='big')
-    if encoded_data == 0xff_ffff:
-      raise ValueError('Invalid encoded data 0xff_ffff. This might happen when humidity is at 100%.')
-
-    is_negative = (encoded_data & 0x80_0000 != 0)
-    encoded_data &= 0x7f_ffff
-
-    temperature_c = Decimal((encoded_data // 1000) * (-1 if is_negative else 1)) / 10
-    humidity_percent = Decimal(encoded_data % 1000) / 10
-    battery_percent = int.from_bytes(byte_data[4:5], byteorder='big')
-
-    return (temperature_c, humidity_percent, battery_percent)
-
-  @staticmethod
-  def _parse_h5105(byte_data: bytes) -> tuple[Decimal, Decimal]:
-    encoded_data = int.from_bytes(byte_data[2:5], byteorder='big')
-    if encoded_data == 0xff_ffff:
-      raise ValueError('Invalid encoded data 0xff_ffff. This might happen when humidity is at 100%.')
-
-    is_negative = (encoded_data & 0x80_0000 != 0)
-    encoded_data &= 0x7f_ffff
-
-    temperature_c = Decimal((encoded_data // 1000) * (-1 if is_negative else 1)) / 10
-    humidity_percent = Decimal(encoded_data % 1000) / 10
-
-    return (temperature_c, humidity_percent)
+      fields.append(('battery', 1, '%', self.battery_percent))
+    fields.append(('rssi', 1, 'dBm', self.rssi))
+    return fields
+
+  def to_points(self, record_format: RecordFormat = RecordFormat.PER_FIELD, time_ns: int | None = None) -> list[Point]:
+    if time_ns is None:
+      time_ns = time.time_ns()
+
+    if record_format == RecordFormat.MULTI_FIELD:
+      # Point sorts fields by name, so do the same.
+      fields = ','.join(f'{name}={value}i' for name, _, _, value in sorted(self.fields()))
+      return [SerializedPoint(f'{self._cached_record_prefix()}{fields} {time_ns}')]
+
+    fields = self.fields()
+    line_prefixes = self._cached_line_prefixes(fields)
+    return [SerializedPoint(f'{line_prefixes[name]}={value}i {time_ns}') for name, _, _, value in fields]
+
+  # The prefixes of this thermometer from _LINE_PREFIXES, with the ones of the given fields filled in.
+  def _cached_line_prefixes(self, fields: list[tuple[str, int, str, int]]) -> dict[str, str]:
+    key = (self.device_name, self.nick_name, self.model, self.adapter)
+    if (line_prefixes := _LINE_PREFIXES.get(key)) is None:
+      line_prefixes = _LINE_PREFIXES[key] = dict()
+    for name, scale_factor, unit, _ in fields:
+      if name not in line_prefixes:
+        line_prefixes[name] = self._line_prefix(name, scale_factor, unit)
+    return line_prefixes
+
+  def _cached_record_prefix(self) -> str:
+    key = (self.device_name, self.nick_name, self.model, self.adapter)
+    if (record_prefix := _RECORD_PREFIXES.get(key)) is None:
+      record_prefix = _RECORD_PREFIXES[key] = self._record_prefix()
+    return record_prefix
+
+  # Serializes a template Point so that the prefix is byte-identical to what Point itself would produce.
+  def _line_prefix(self, name: str, scale_factor: int, unit: str) -> str:
+    point = self._point_with_common_tags()
+    point.tag('scale_factor', scale_factor).tag('unit', unit)
+    point.field(name, 0)
+    return point.to_line_protocol().removesuffix('=0i')
+
+  def _record_prefix(self) -> str:
+    point = self._point_with_common_tags()
+    point.field('f', 0)
+    return point.to_line_protocol().removesuffix('f=0i')
+
+
+# Builds the line protocol of a batch of readings of one thermometer, the same as DataPoint.build() and
+# DataPoint.to_points() would one reading at a time, for reprocessing stored payloads in bulk.
+# payloads holds one payload per reading, each padded to record_size bytes, with the rssi and time of each reading.
+# Readings with invalid encoded data are skipped. Returns the lines and the number of readings skipped.
+def build_lines(thermometer: Thermometer,
+                payloads: bytes | memoryview,
+                record_size: int,
+                rssi: Sequence[int],
+                time_ns: Sequence[int],
+                record_format: RecordFormat = RecordFormat.PER_FIELD,
+                adapter: str | None = None) -> tuple[list[str], int]:
+  if (decoder := DECODERS.get(thermometer.model)) is None:
+    raise NotImplementedError(f'Data parsing is not available for model {thermometer.model}.')
+  decoded = decoder.decode_batch(payloads, record_size)
+  if not len(decoded) == len(rssi) == len(time_ns):
+    raise ValueError(f'Expected as many rssi and times as payloads, got {len(rssi)} and {len(time_ns)} for '
+                     f'{len(decoded)} payloads.')
+
+  # A reading with every field, to get the same prefixes as to_points().
+  template = DataPoint(thermometer.device_name, thermometer.nick_name, thermometer.model, 0, 0, 0, 0, adapter)
+
+  lines: list[str] = []
+  append = lines.append
+  n_invalid = 0
+
+  if record_format == RecordFormat.MULTI_FIELD:
+    record_prefix = template._cached_record_prefix()
+    for values, r, t in zip(decoded, rssi, time_ns):
+      if values is None:
+        n_invalid += 1
+        continue
+      temperature_c_10x, humidity_percent_10x, battery_percent = values
+      # Fields are sorted by name, like to_points() does.
+      battery = '' if battery_percent is None else f'battery={battery_percent}i,'
+      append(f'{record_prefix}{battery}humidity={humidity_percent_10x}i,rssi={r}i,temperature={temperature_c_10x}i {t}')
+    return lines, n_invalid
+
+  line_prefixes = template._cached_line_prefixes(template.fields())
+  temperature_prefix, humidity_prefix, battery_prefix, rssi_prefix = (
+      line_prefixes[name] for name in ('temperature', 'humidity', 'battery', 'rssi'))
+  for values, r, t in zip(decoded, rssi, time_ns):
+    if values is None:
+      n_invalid += 1
+      continue
+    temperature_c_10x, humidity_percent_10x, battery_percent = values
+    append(f'{temperature_prefix}={temperature_c_10x}i {t}')
+    append(f'{humidity_prefix}={humidity_percent_10x}i {t}')
+    if battery_percent is not None:
+      append(f'{battery_prefix}={battery_percent}i {t}')
+    append(f'{rssi_prefix}={r}i {t}')
+  return lines, n_invalid
@@ -0,0 +1,76 @@
+import struct
+from dataclasses import dataclass
+
+from govee_h5072_logger.model import Model
+
+
+# The encoded temperature and humidity are all ones, which thermometers send when they cannot take a reading.
+class InvalidEncodedDataError(ValueError):
+  pass
+
+
+# Decodes the manufacturer payload of a model into temperature and humidity in tenths, and battery in percent.
+# The temperature and humidity are encoded together as 3 bytes: bit 23 is the sign of the temperature, and the rest is
+# abs(temperature_c_10x) * 1000 + humidity_percent_10x.
+@dataclass(frozen=True)
+class Decoder:
+  # Unpacks the high byte and the low 2 bytes of the encoded data, followed by the battery if the model reports it.
+  layout: struct.Struct
+  offset: int
+
+  @property
+  def value_slice(self) -> slice:
+    return slice(self.offset, self.offset + self.layout.size)
+
+  def decode(self, byte_data: bytes) -> tuple[int, int, int | None]:
+    try:
+      values = self.layout.unpack_from(byte_data, self.offset)
+    except struct.error as e:
+      raise ValueError(
+          f'Expected at least {self.offset + self.layout.size} bytes of data, got {len(byte_data)}.') from e
+
+    encoded_data = values[0] << 16 | values[1]
+    if encoded_data == 0xff_ffff:
+      raise InvalidEncodedDataError('Invalid encoded data 0xff_ffff. This might happen when humidity is at 100%.')
+
+    temperature_c_10x, humidity_percent_10x = divmod(encoded_data & 0x7f_ffff, 1000)
+    if encoded_data & 0x80_0000 != 0:
+      temperature_c_10x = -temperature_c_10x
+    battery_percent = values[2] if len(values) > 2 else None
+
+    return (temperature_c_10x, humidity_percent_10x, battery_percent)
+
+  # Unpacks records of record_size bytes, each starting with a payload and padded after it.
+  def batch_layout(self, record_size: int) -> struct.Struct:
+    if record_size < self.offset + self.layout.size:
+      raise ValueError(f'Expected records of at least {self.offset + self.layout.size} bytes, got {record_size}.')
+    byte_order, fields = self.layout.format[0], self.layout.format[1:]
+    return struct.Struct(f'{byte_order}{self.offset}x{fields}{record_size - self.offset - self.layout.size}x')
+
+  # Decodes a buffer of payloads of record_size bytes each, the same as decode() does one at a time.
+  # Invalid encoded data decodes as None instead of raising, so that one bad reading does not fail the batch.
+  def decode_batch(self, payloads: bytes | memoryview, record_size: int) -> list[tuple[int, int, int | None] | None]:
+    layout = self.batch_layout(record_size)
+    if len(payloads) % record_size != 0:
+      raise ValueError(f'Expected a multiple of {record_size} bytes of payloads, got {len(payloads)}.')
+
+    decoded: list[tuple[int, int, int | None] | None] = []
+    append = decoded.append
+    # The same steps as decode(), inlined to skip a call per payload.
+    for values in layout.iter_unpack(payloads):
+      encoded_data = values[0] << 16 | values[1]
+      if encoded_data == 0xff_ffff:
+        append(None)
+        continue
+      temperature_c_10x, humidity_percent_10x = divmod(encoded_data & 0x7f_ffff, 1000)
+      if encoded_data & 0x80_0000 != 0:
+        temperature_c_10x = -temperature_c_10x
+      append((temperature_c_10x, humidity_percent_10x, values[2] if len(values) > 2 else None))
+    return decoded
+
+
+# Adding a model only needs an entry here.
+DECODERS: dict[Model, Decoder] = {
+    Model.H5072: Decoder(struct.Struct('>BHB'), offset=1),
+    Model.H5105: Decoder(struct.Struct('>BH'), offset=2),
+}
@@ -0,0 +1,55 @@
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from govee_h5072_logger.decoder import DECODERS
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.thermometer import Thermometer
+
+# Bytes of the manufacturer payload that carry the decoded values for each model.
+_VALUE_SLICES: dict[Model, slice] = {model: decoder.value_slice for model, decoder in DECODERS.items()}
+
+
+@dataclass(frozen=True)
+class _Accepted:
+  byte_data: bytes
+  value_bytes: bytes
+  time_ns: int
+
+
+# Suppresses advertisements that carry nothing new since the last accepted advertisement of the same thermometer.
+# 'repeated': the whole payload is identical and arrived within the window.
+# 'unchanged': the value bytes are identical and the heartbeat has not run out yet.
+class Deduplicator:
+  def __init__(self, window_ms: int = 0, heartbeat_seconds: int = 0) -> None:
+    self._window_ns = window_ms * 1_000_000
+    self._heartbeat_ns = heartbeat_seconds * 1_000_000_000
+    self._enabled = self._window_ns > 0 or self._heartbeat_ns > 0
+
+    # Mapping from device_mac to the last accepted advertisement.
+    self._last_accepted: dict[str, _Accepted] = dict()
+
+    # Number of advertisements that were 'accepted', or suppressed as 'repeated' or 'unchanged'.
+    self.counters: Counter[str] = Counter()
+
+  # Uses the monotonic clock unless time_ns is given, e.g. when replaying captured advertisements.
+  def is_duplicate(self, thermometer: Thermometer, byte_data: bytes, time_ns: int | None = None) -> bool:
+    if not self._enabled:
+      return False
+
+    if time_ns is None:
+      time_ns = time.monotonic_ns()
+    value_bytes = byte_data[_VALUE_SLICES.get(thermometer.model, slice(None))]
+
+    if (last := self._last_accepted.get(thermometer.device_mac)) is not None:
+      elapsed_ns = time_ns - last.time_ns
+      if elapsed_ns < self._window_ns and byte_data == last.byte_data:
+        self.counters['repeated'] += 1
+        return True
+      if elapsed_ns < self._heartbeat_ns and value_bytes == last.value_bytes:
+        self.counters['unchanged'] += 1
+        return True
+
+    self._last_accepted[thermometer.device_mac] = _Accepted(byte_data, value_bytes, time_ns)
+    self.counters['accepted'] += 1
+    return False
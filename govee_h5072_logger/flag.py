@@ -1,32 +1,288 @@
 from absl import flags
 
 from govee_h5072_logger.model import Model
+from govee_h5072_logger.overflowpolicy import OverflowPolicy
+from govee_h5072_logger.recordformat import RecordFormat
 
 DEVICE_NAMES = flags.DEFINE_multi_string(
     name='device_names',
     default=None,
-    required=True,
     help='Bluetooth device names for each thermometer. E.g. "GVH5072_7705".',
 )
 
 DEVICE_MACS = flags.DEFINE_multi_string(
     name='device_macs',
     default=None,
-    required=True,
     help='Bluetooth device MAC address for each thermometer. E.g. "01:23:45:67:89:AB".',
 )
 
 NICK_NAMES = flags.DEFINE_multi_string(
     name='nick_names',
     default=None,
-    required=True,
     help='Nick names for each thermometer. E.g. "Garden".',
 )
 
 MODELS = flags.DEFINE_multi_enum_class(
     name='models',
     default=None,
-    required=True,
     enum_class=Model,
     help='Model for each thermometer. E.g. H5076.',
 )
+
+THERMOMETERS_FILE = flags.DEFINE_string(
+    name='thermometers_file',
+    default=None,
+    help=('JSON file with a list of thermometers, used instead of --device_names, --device_macs, --nick_names and '
+          '--models. E.g. [{"device_name": "GVH5072_7705", "device_mac": "01:23:45:67:89:AB", "nick_name": "Garden", '
+          '"model": "H5072"}]. The file is reloaded on SIGHUP.'),
+)
+
+DEDUP_WINDOW_MS = flags.DEFINE_integer(
+    name='dedup_window_ms',
+    default=0,
+    lower_bound=0,
+    help=('Drop copies of the exact same manufacturer payload from a thermometer that arrive within this many '
+          'milliseconds after the last accepted one. 0 disables the check.'),
+)
+
+DEDUP_HEARTBEAT_SECONDS = flags.DEFINE_integer(
+    name='dedup_heartbeat_seconds',
+    default=0,
+    lower_bound=0,
+    help=('Drop advertisements whose temperature, humidity and battery bytes did not change since the last accepted '
+          'one, until this many seconds have passed without an accepted advertisement. 0 disables the check.'),
+)
+
+AGGREGATION_WINDOW_SECONDS = flags.DEFINE_integer(
+    name='aggregation_window_seconds',
+    default=0,
+    lower_bound=0,
+    help=('Aggregate readings of each thermometer over windows of this many seconds and write one '
+          '"thermometer_aggregate" point per window instead of points for every advertisement. '
+          '0 disables aggregation.'),
+)
+
+RECORD_FORMAT = flags.DEFINE_enum_class(
+    name='record_format',
+    default=RecordFormat.PER_FIELD,
+    enum_class=RecordFormat,
+    help=('PER_FIELD writes one line per field of a reading. '
+          'MULTI_FIELD writes one line per reading with temperature, humidity, battery and rssi as fields.'),
+)
+
+INGEST_QUEUE_SIZE = flags.DEFINE_integer(
+    name='ingest_queue_size',
+    default=0,
+    lower_bound=0,
+    help=('Queue up to this many points and write them to LineProtocolCache from a background thread. '
+          '0 writes points inline from the Bluetooth detection callback.'),
+)
+
+INGEST_OVERFLOW_POLICY = flags.DEFINE_enum_class(
+    name='ingest_overflow_policy',
+    default=OverflowPolicy.DROP_OLDEST,
+    enum_class=OverflowPolicy,
+    help=('What to do when the ingest queue is full. BLOCK stalls the event loop, and with it scanning, until the '
+          'background thread has made room.'),
+)
+
+INGEST_BATCH_SIZE = flags.DEFINE_integer(
+    name='ingest_batch_size',
+    default=500,
+    lower_bound=1,
+    help='Write queued points to LineProtocolCache once this many have been queued.',
+)
+
+INGEST_BATCH_SECONDS = flags.DEFINE_float(
+    name='ingest_batch_seconds',
+    default=1.0,
+    lower_bound=0.0,
+    help='Write queued points to LineProtocolCache at least this often after the first of them was queued.',
+)
+
+flags.register_multi_flags_validator(
+    (INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE),
+    lambda flag: flag['ingest_queue_size'] == 0 or flag['ingest_queue_size'] >= flag['ingest_batch_size'],
+    message='--ingest_queue_size must be at least --ingest_batch_size.',
+)
+
+CAPTURE_FILE = flags.DEFINE_string(
+    name='capture_file',
+    default=None,
+    help='Append every received advertisement to this file before decoding. See govee-h5072-replay.',
+)
+
+ADAPTERS = flags.DEFINE_multi_string(
+    name='adapters',
+    default=None,
+    help=('Bluetooth adapters to scan with concurrently, e.g. "hci0". Points are tagged with the adapter that heard '
+          'the advertisement with the best RSSI. Uses the default adapter if not set.'),
+)
+
+ADAPTER_MERGE_WINDOW_MS = flags.DEFINE_integer(
+    name='adapter_merge_window_ms',
+    default=200,
+    lower_bound=1,
+    help=('With more than one adapter, copies of the same advertisement heard within this many milliseconds are '
+          'collapsed into one.'),
+)
+
+PASSIVE_SCAN = flags.DEFINE_bool(
+    name='passive_scan',
+    default=False,
+    help=('Scan passively with a BlueZ advertisement monitor that only reports advertisements carrying manufacturer '
+          'data of --govee_company_ids, so other devices are filtered out before reaching Python. Requires bluetoothd '
+          'to run with --experimental.'),
+)
+
+GOVEE_COMPANY_IDS = flags.DEFINE_multi_integer(
+    name='govee_company_ids',
+    default=[0xec88, 0x0001],
+    help='Bluetooth company IDs in the manufacturer data of the thermometers, for --passive_scan.',
+)
+
+LATENCY = flags.DEFINE_bool(
+    name='latency',
+    default=False,
+    help=('Write a "latency" point with the nanoseconds between consecutive accepted readings of each thermometer, '
+          'timestamped at the earlier reading. The points go to the bucket of the readings rather than to '
+          'ThermometerRecordsDerived, where the Calculate Latency task writes them, so move dashboards over and '
+          'disable that task when turning this on.'),
+)
+
+HTTP_HOST = flags.DEFINE_string(
+    name='http_host',
+    default='127.0.0.1',
+    help='Address to serve --http_port on.',
+)
+
+HTTP_PORT = flags.DEFINE_integer(
+    name='http_port',
+    default=0,
+    lower_bound=0,
+    help=('Serve metrics in the Prometheus text format at /metrics, and the queries of --recent_readings, on this '
+          'port. 0 disables the server.'),
+)
+
+STAGE_TIMING = flags.DEFINE_bool(
+    name='stage_timing',
+    default=False,
+    help=('Also time the hot path stages of every advertisement, and serve their durations at /metrics on --http_port. '
+          'Adds about a tenth to the cost of each advertisement.'),
+)
+
+flags.register_multi_flags_validator(
+    (STAGE_TIMING, HTTP_PORT),
+    lambda flag: not flag['stage_timing'] or flag['http_port'] > 0,
+    message='--stage_timing requires --http_port.',
+)
+
+RECENT_READINGS = flags.DEFINE_integer(
+    name='recent_readings',
+    default=1000,
+    lower_bound=0,
+    help=('Number of recent readings of each thermometer kept in memory, and served at /readings/latest and '
+          '/readings?device_name=...&minutes=... on --http_port. 0 disables the queries.'),
+)
+
+ARCHIVE_DIR = flags.DEFINE_string(
+    name='archive_dir',
+    default=None,
+    help=('Also archive readings into compact files, one per thermometer per UTC day, under this directory. '
+          'Export them as line protocol with govee-h5072-export-archive.'),
+)
+
+ARCHIVE_BLOCK_SIZE = flags.DEFINE_integer(
+    name='archive_block_size',
+    default=256,
+    lower_bound=1,
+    help='Number of readings of a thermometer collected in memory before they are appended to its archive file.',
+)
+
+INFLUX_URL = flags.DEFINE_string(
+    name='influx_url',
+    default=None,
+    help=('Write points straight to the InfluxDB v2 write API at this URL, e.g. "http://localhost:8086", in gzipped '
+          'batches. Points are written to LineProtocolCache only when a write fails or the backlog grows past '
+          '--influx_max_backlog. Not set writes every point to LineProtocolCache.'),
+)
+
+INFLUX_ORG = flags.DEFINE_string(
+    name='influx_org',
+    default=None,
+    help='InfluxDB organization to write to with --influx_url.',
+)
+
+INFLUX_BUCKET = flags.DEFINE_string(
+    name='influx_bucket',
+    default=None,
+    help='InfluxDB bucket to write to with --influx_url.',
+)
+
+INFLUX_TOKEN = flags.DEFINE_string(
+    name='influx_token',
+    default=None,
+    help='InfluxDB API token with write access to --influx_bucket.',
+)
+
+INFLUX_BATCH_SIZE = flags.DEFINE_integer(
+    name='influx_batch_size',
+    default=5000,
+    lower_bound=1,
+    help='Write points to InfluxDB once this many are waiting.',
+)
+
+INFLUX_BATCH_SECONDS = flags.DEFINE_float(
+    name='influx_batch_seconds',
+    default=10.0,
+    lower_bound=0.1,
+    help='Write waiting points to InfluxDB at least this often.',
+)
+
+INFLUX_MAX_BACKLOG = flags.DEFINE_integer(
+    name='influx_max_backlog',
+    default=50000,
+    lower_bound=1,
+    help='Write points to LineProtocolCache instead while this many are waiting to be written to InfluxDB.',
+)
+
+INFLUX_RETRY_SECONDS = flags.DEFINE_float(
+    name='influx_retry_seconds',
+    default=60.0,
+    lower_bound=0.0,
+    help='After a failed write to InfluxDB, write points to LineProtocolCache instead for this many seconds.',
+)
+
+flags.register_multi_flags_validator(
+    (INFLUX_URL, INFLUX_ORG, INFLUX_BUCKET),
+    lambda flag: flag['influx_url'] is None or (flag['influx_org'] is not None and flag['influx_bucket'] is not None),
+    message='--influx_url requires --influx_org and --influx_bucket.',
+)
+
+flags.register_multi_flags_validator(
+    (INFLUX_URL, INGEST_QUEUE_SIZE),
+    lambda flag: flag['influx_url'] is None or flag['ingest_queue_size'] == 0,
+    message='--influx_url already writes from a background thread, and cannot be used with --ingest_queue_size.',
+)
+
+SCAN_INTERVAL_SECONDS = flags.DEFINE_float(
+    name='scan_interval_seconds',
+    default=0,
+    lower_bound=0,
+    help=('Scan in windows, aiming for one reading of each thermometer every this many seconds, and keep the scanners '
+          'stopped in between to save CPU and power. A window ends once every thermometer has been heard, and widens '
+          'while some are overdue. 0 scans continuously.'),
+)
+
+SCAN_WINDOW_SECONDS = flags.DEFINE_float(
+    name='scan_window_seconds',
+    default=5,
+    lower_bound=0.1,
+    help='Shortest scan window of --scan_interval_seconds.',
+)
+
+flags.register_multi_flags_validator(
+    (SCAN_INTERVAL_SECONDS, SCAN_WINDOW_SECONDS),
+    lambda flag: flag['scan_interval_seconds'] == 0 or flag['scan_interval_seconds'] >= flag['scan_window_seconds'],
+    message='--scan_interval_seconds must be at least --scan_window_seconds.',
+)
@@ -0,0 +1,79 @@
+import asyncio
+import urllib.parse
+from http import HTTPStatus
+from typing import Callable
+
+from absl import logging
+
+# Takes the query parameters, and returns the content type and body of the response.
+Handler = Callable[[dict[str, list[str]]], tuple[str, bytes]]
+
+
+# Minimal HTTP/1.0 server on the asyncio loop for local GET endpoints, so no thread or web framework is needed.
+# Every response closes the connection.
+class HttpServer:
+  def __init__(self, host: str, port: int, routes: dict[str, Handler]) -> None:
+    self._host = host
+    self._port = port
+    self._routes = routes
+    self._server: asyncio.Server | None = None
+
+  @property
+  def port(self) -> int:
+    assert self._server is not None
+    return self._server.sockets[0].getsockname()[1]
+
+  async def start(self) -> None:
+    self._server = await asyncio.start_server(self._handle, self._host, self._port)
+    logging.info('Serving %s on %s:%d.', sorted(self._routes), self._host, self.port)
+
+  async def close(self) -> None:
+    if self._server is not None:
+      self._server.close()
+      await self._server.wait_closed()
+      self._server = None
+
+  async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+      async with asyncio.timeout(10):
+        request_line = await reader.readline()
+        while await reader.readline() not in (b'\r\n', b'\n', b''):
+          pass
+      status, content_type, body = self._respond(request_line)
+    except ValueError:
+      # Raised by readline() for lines longer than the limit of the reader.
+      status, content_type, body = HTTPStatus.BAD_REQUEST, 'text/plain', b'Request too large.\n'
+    except (TimeoutError, ConnectionError):
+      writer.close()
+      return
+
+    writer.write(f'HTTP/1.0 {status.value} {status.phrase}\r\n'
+                 f'Content-Type: {content_type}\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 'Connection: close\r\n\r\n'.encode() + body)
+    try:
+      await writer.drain()
+    except ConnectionError:
+      pass
+    writer.close()
+
+  def _respond(self, request_line: bytes) -> tuple[HTTPStatus, str, bytes]:
+    try:
+      method, target, _ = request_line.decode('ascii').split(' ', 2)
+    except (UnicodeDecodeError, ValueError):
+      return HTTPStatus.BAD_REQUEST, 'text/plain', b'Bad request.\n'
+    if method != 'GET':
+      return HTTPStatus.METHOD_NOT_ALLOWED, 'text/plain', b'Only GET is supported.\n'
+
+    url = urllib.parse.urlsplit(target)
+    if (handler := self._routes.get(url.path)) is None:
+      return HTTPStatus.NOT_FOUND, 'text/plain', b'Not found.\n'
+
+    try:
+      content_type, body = handler(urllib.parse.parse_qs(url.query))
+    except ValueError as e:
+      return HTTPStatus.BAD_REQUEST, 'text/plain', f'{e}\n'.encode()
+    except Exception:
+      logging.exception('Error when handling %s.', target)
+      return HTTPStatus.INTERNAL_SERVER_ERROR, 'text/plain', b'Internal server error.\n'
+    return HTTPStatus.OK, content_type, body
@@ -0,0 +1,107 @@
+import gzip
+import time
+import urllib.parse
+
+import urllib3
+from absl import logging
+from influxdb_client import Point
+from line_protocol_cache.lineprotocolcache import LineProtocolCache
+
+from govee_h5072_logger.ingestqueue import IngestQueue
+from govee_h5072_logger.overflowpolicy import OverflowPolicy
+
+# Line protocol compresses well even at the fastest level, which keeps the CPU cost low on small boards.
+_COMPRESS_LEVEL = 1
+_TIMEOUT_SECONDS = 10
+# Statuses saying the batch itself is bad, so that it would be rejected again.
+_REJECTED_STATUSES = (400, 413, 422)
+
+
+# Raised for responses after which the batch can be written later, once InfluxDB is available again or its
+# configuration, such as the token, org or bucket, is fixed.
+class _UnavailableError(Exception):
+  pass
+
+
+# Writes points straight to the InfluxDB v2 write API, instead of to LineProtocolCache for the uploader to read back.
+# Points are batched by an IngestQueue, and each batch is posted gzipped over a pooled keep-alive connection.
+# Points fall back to LineProtocolCache when a write fails, e.g. because InfluxDB is unreachable or the token is
+# rejected, when more than max_backlog points are waiting, and for retry_seconds after such a failure, so the uploader
+# catches up on them later.
+# Batches InfluxDB rejects as malformed or too large, or for a schema conflict, would be rejected again by the uploader,
+# so they are logged and dropped instead.
+class InfluxSink:
+  def __init__(self, url: str, org: str, bucket: str, token: str | None, batch_size: int, batch_seconds: float,
+               max_backlog: int, retry_seconds: float) -> None:
+    self._retry_seconds = retry_seconds
+
+    query = urllib.parse.urlencode({'org': org, 'bucket': bucket, 'precision': 'ns'})
+    self._write_url = f'{url.rstrip("/")}/api/v2/write?{query}'
+    self._headers = {'Content-Type': 'text/plain; charset=utf-8', 'Content-Encoding': 'gzip'}
+    if token is not None:
+      self._headers['Authorization'] = f'Token {token}'
+    # Only the writer thread posts, so one connection is kept alive.
+    self._http = urllib3.PoolManager(num_pools=1, maxsize=1, timeout=_TIMEOUT_SECONDS, retries=False)
+
+    self._queue = IngestQueue(max_backlog, OverflowPolicy.DROP_OLDEST, batch_size, batch_seconds, self._write,
+                              'InfluxSinkWriter')
+    self._retry_after = 0.0
+
+    # Gauges.
+    self.written = 0
+    self.spilled = 0
+    self.rejected = 0
+    self.failed_writes = 0
+    self.last_write_seconds = 0.0
+
+  @property
+  def backlog(self) -> int:
+    return self._queue.depth
+
+  def start(self) -> None:
+    self._queue.start()
+
+  # Stops accepting points, and waits for the writer to drain the backlog.
+  def close(self) -> None:
+    self._queue.close()
+    self._http.clear()
+
+  def put(self, points: list[Point]) -> None:
+    if not self._queue.try_put(points):
+      self._spill(points)
+
+  def _write(self, batch: list[Point]) -> None:
+    if time.monotonic() < self._retry_after:
+      self._spill(batch)
+      return
+
+    start = time.perf_counter()
+    body = gzip.compress('\n'.join(point.to_line_protocol() for point in batch).encode(), _COMPRESS_LEVEL)
+    try:
+      response = self._http.request('POST', self._write_url, body=body, headers=self._headers)
+      if response.status >= 300 and response.status not in _REJECTED_STATUSES:
+        raise _UnavailableError(f'InfluxDB responded {response.status}: {response.data[:200]!r}')
+    except (_UnavailableError, urllib3.exceptions.HTTPError, OSError):
+      logging.exception('Error when writing %d points to InfluxDB, writing them to LineProtocolCache instead.',
+                        len(batch))
+      self.failed_writes += 1
+      self._retry_after = time.monotonic() + self._retry_seconds
+      self._spill(batch)
+      return
+
+    if response.status in _REJECTED_STATUSES:
+      logging.error('InfluxDB rejected %d points with %d, dropping them: %r', len(batch), response.status,
+                    response.data[:500])
+      self.rejected += len(batch)
+      return
+
+    self.written += len(batch)
+    self.last_write_seconds = time.perf_counter() - start
+
+  def _spill(self, points: list[Point]) -> None:
+    try:
+      LineProtocolCache.put(points)
+    except Exception:
+      logging.exception('Error when writing %d points to LineProtocolCache.', len(points))
+      return
+    self.spilled += len(points)
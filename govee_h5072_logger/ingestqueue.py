@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Generic, TypeVar, cast
+
+from absl import logging
+from influxdb_client import Point
+from line_protocol_cache.lineprotocolcache import LineProtocolCache
+
+from govee_h5072_logger.overflowpolicy import OverflowPolicy
+
+T = TypeVar('T')
+
+
+# Bounded queue of points in front of LineProtocolCache, or of another flush target such as InfluxSink.
+# A writer thread takes batches of up to batch_size points, or whatever is queued after batch_seconds, and writes each
+# batch with a single call of flush, LineProtocolCache.put() by default, so slow writes never stall the event loop.
+# Queues with a flush of their own can hold other items than points, such as the blocks of ArchiveWriter.
+class IngestQueue(Generic[T]):
+  def __init__(self,
+               max_size: int,
+               overflow_policy: OverflowPolicy,
+               batch_size: int,
+               batch_seconds: float,
+               flush: Callable[[list[T]], None] | None = None,
+               name: str = 'IngestQueueWriter') -> None:
+    self._max_size = max_size
+    self._overflow_policy = overflow_policy
+    self._batch_size = batch_size
+    self._batch_seconds = batch_seconds
+    self._flush = flush
+
+    self._points: deque[T] = deque()
+    self._condition = threading.Condition()
+    self._closed = False
+    self._writer = threading.Thread(target=self._write, name=name)
+
+    # Gauges.
+    self.dropped = 0
+    self.flushes = 0
+    self.last_flush_seconds = 0.0
+    self.max_flush_seconds = 0.0
+
+  @property
+  def depth(self) -> int:
+    return len(self._points)
+
+  def start(self) -> None:
+    self._writer.start()
+
+  # Stops accepting points, and waits for the writer to drain the queue.
+  def close(self) -> None:
+    with self._condition:
+      self._closed = True
+      self._condition.notify_all()
+    self._writer.join()
+
+  def put(self, points: list[T]) -> None:
+    with self._condition:
+      if self._overflow_policy == OverflowPolicy.BLOCK:
+        while len(self._points) + len(points) > self._max_size and len(self._points) > 0 and not self._closed:
+          self._condition.wait()
+
+      was_empty = len(self._points) == 0
+      self._points.extend(points)
+      while len(self._points) > self._max_size:
+        self._points.popleft()
+        self.dropped += 1
+
+      if was_empty or len(self._points) >= self._batch_size:
+        self._condition.notify_all()
+
+  # Queues the points only if they all fit, regardless of the overflow policy, for callers with a fallback of their own.
+  # Returns whether they were queued.
+  def try_put(self, points: list[T]) -> bool:
+    with self._condition:
+      if len(self._points) + len(points) > self._max_size:
+        return False
+      was_empty = len(self._points) == 0
+      self._points.extend(points)
+      if was_empty or len(self._points) >= self._batch_size:
+        self._condition.notify_all()
+      return True
+
+  # Waits for a first point before starting the batch_seconds deadline, so an empty queue never busy-waits.
+  def _take_batch(self) -> list[T]:
+    with self._condition:
+      while len(self._points) == 0 and not self._closed:
+        self._condition.wait()
+      deadline = time.monotonic() + self._batch_seconds
+      while len(self._points) < self._batch_size and not self._closed:
+        if (timeout := deadline - time.monotonic()) <= 0:
+          break
+        self._condition.wait(timeout)
+
+      batch = [self._points.popleft() for _ in range(min(self._batch_size, len(self._points)))]
+      self._condition.notify_all()
+      return batch
+
+  def _write(self) -> None:
+    while len(batch := self._take_batch()) > 0 or not self._closed:
+      if len(batch) == 0:
+        continue
+
+      start = time.perf_counter()
+      try:
+        if self._flush is None:
+          LineProtocolCache.put(cast(list[Point], batch))
+        else:
+          self._flush(batch)
+      except Exception:
+        logging.exception('Error when flushing %d queued points.', len(batch))
+
+      self.flushes += 1
+      self.last_flush_seconds = time.perf_counter() - start
+      self.max_flush_seconds = max(self.max_flush_seconds, self.last_flush_seconds)
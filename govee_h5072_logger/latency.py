@@ -0,0 +1,31 @@
+from influxdb_client import Point
+
+from govee_h5072_logger.serializedpoint import SerializedPoint
+from govee_h5072_logger.thermometer import Thermometer
+
+
+# Tracks the time of the last accepted reading of each thermometer, and derives the time since it for every new one.
+# The points match what the 'Calculate Latency' InfluxDB task used to write: measurement 'latency', field 'latency_ns'
+# and tags device_name and nick_name, timestamped at the earlier reading.
+class LatencyTracker:
+  def __init__(self) -> None:
+    # Mapping from device_name to the time of its last reading.
+    self._last_time_ns: dict[str, int] = dict()
+    # Mapping from (device_name, nick_name) to the line protocol up to the '=' of the field value.
+    self._line_prefixes: dict[tuple[str, str], str] = dict()
+
+  # Returns no point for the first reading of a thermometer, or for a reading that is not later than the last one.
+  def add(self, thermometer: Thermometer, time_ns: int) -> list[Point]:
+    last_time_ns = self._last_time_ns.get(thermometer.device_name)
+    if last_time_ns is not None and time_ns <= last_time_ns:
+      return []
+    self._last_time_ns[thermometer.device_name] = time_ns
+    if last_time_ns is None:
+      return []
+
+    key = (thermometer.device_name, thermometer.nick_name)
+    if (line_prefix := self._line_prefixes.get(key)) is None:
+      point = Point('latency').tag('device_name', thermometer.device_name).tag('nick_name', thermometer.nick_name)
+      line_prefix = self._line_prefixes[key] = point.field('latency_ns', 0).to_line_protocol().removesuffix('=0i')
+
+    return [SerializedPoint(f'{line_prefix}={time_ns - last_time_ns}i {last_time_ns}')]
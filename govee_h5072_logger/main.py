@@ -1,14 +1,45 @@
 import asyncio
+import contextlib
+import json
 import signal
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
 from absl import app, flags, logging
 from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
+from influxdb_client import Point
 from line_protocol_cache.lineprotocolcache import LineProtocolCache
 
 from govee_h5072_logger.datapoint import DataPoint
-from govee_h5072_logger.thermometer import get_thermometer
+from govee_h5072_logger.decoder import InvalidEncodedDataError
+from govee_h5072_logger.deduplicator import Deduplicator
+from govee_h5072_logger.flag import (ADAPTER_MERGE_WINDOW_MS, ADAPTERS, AGGREGATION_WINDOW_SECONDS, ARCHIVE_BLOCK_SIZE,
+                                     ARCHIVE_DIR, CAPTURE_FILE, DEDUP_HEARTBEAT_SECONDS, DEDUP_WINDOW_MS,
+                                     GOVEE_COMPANY_IDS, HTTP_HOST, HTTP_PORT, INFLUX_BATCH_SECONDS, INFLUX_BATCH_SIZE,
+                                     INFLUX_BUCKET, INFLUX_MAX_BACKLOG, INFLUX_ORG, INFLUX_RETRY_SECONDS, INFLUX_TOKEN,
+                                     INFLUX_URL, INGEST_BATCH_SECONDS, INGEST_BATCH_SIZE, INGEST_OVERFLOW_POLICY,
+                                     INGEST_QUEUE_SIZE, LATENCY, PASSIVE_SCAN, RECENT_READINGS, RECORD_FORMAT,
+                                     SCAN_INTERVAL_SECONDS, SCAN_WINDOW_SECONDS, STAGE_TIMING)
+from govee_h5072_logger.latency import LatencyTracker
+from govee_h5072_logger.metrics import DurationHistogram
+from govee_h5072_logger.recordformat import RecordFormat
+from govee_h5072_logger.startup import seconds_since_process_start
+from govee_h5072_logger.thermometer import Thermometer, find_thermometer, register_flags_validator, reload_thermometers
+
+# Optional stages are imported when their flags enable them, to keep them out of the startup time.
+if TYPE_CHECKING:
+  from govee_h5072_logger.aggregator import Aggregator
+  from govee_h5072_logger.archive import ArchiveWriter
+  from govee_h5072_logger.capture import CaptureWriter
+  from govee_h5072_logger.influxsink import InfluxSink
+  from govee_h5072_logger.ingestqueue import IngestQueue
+  from govee_h5072_logger.merger import AdvertisementMerger
+  from govee_h5072_logger.profiler import Profiler
+  from govee_h5072_logger.recentreadings import RecentReadings
+  from govee_h5072_logger.scanscheduler import ScanScheduler
 
 _RUN_BLUEZ = flags.DEFINE_bool(
     name='run_bluez',
@@ -16,36 +47,438 @@ _RUN_BLUEZ = flags.DEFINE_bool(
     help='Run dbus and bluetoothd inside of the container.',
 )
 
+_ASYNCIO_DEBUG = flags.DEFINE_bool(
+    name='asyncio_debug',
+    default=False,
+    help='Run the event loop in debug mode, which logs slow callbacks and never-awaited coroutines.',
+)
+
+_PROFILE_DIR = flags.DEFINE_string(
+    name='profile_dir',
+    default='data/profiles',
+    help='Directory to write profiles to. A profile is taken on SIGUSR1.',
+)
+
+_PROFILE_SECONDS = flags.DEFINE_float(
+    name='profile_seconds',
+    default=30,
+    lower_bound=0,
+    help='Duration of each profile taken on SIGUSR1.',
+)
+
+# Replaced by pipeline() with ones configured from flags.
+_CAPTURE_WRITER: 'CaptureWriter | None' = None
+_MERGER: 'AdvertisementMerger | None' = None
+_DEDUPLICATOR = Deduplicator()
+_AGGREGATOR: 'Aggregator | None' = None
+_RECORD_FORMAT = RecordFormat.PER_FIELD
+_INGEST_QUEUE: 'IngestQueue | None' = None
+_INFLUX_SINK: 'InfluxSink | None' = None
+_LATENCY_TRACKER: LatencyTracker | None = None
+_RECENT_READINGS: 'RecentReadings | None' = None
+_ARCHIVE_WRITER: 'ArchiveWriter | None' = None
+
+# Number of advertisements 'accepted' from registered thermometers, or 'rejected' from other devices.
+ADVERTISEMENT_COUNTERS: Counter[str] = Counter()
+# Number of advertisements of registered thermometers that could not be parsed, by kind of error.
+PARSE_ERROR_COUNTERS: Counter[str] = Counter()
+# Number of readings of each thermometer, and the wall clock time of its last reading.
+READING_COUNTERS: Counter[Thermometer] = Counter()
+_LAST_READING_NS: dict[Thermometer, int] = dict()
+# Durations of the hot path stages, only measured with --stage_timing or while profiling.
+_STAGES = ('find_thermometer', 'build', 'to_points', 'put')
+_STAGE_HISTOGRAMS: dict[str, DurationHistogram] | None = None
+_PROFILER: 'Profiler | None' = None
+# Set by main() while the scanners run in windows.
+_SCAN_SCHEDULER: 'ScanScheduler | None' = None
+# Seconds from the start of the process to the first reading being put, to keep an eye on the startup time.
+FIRST_READING_SECONDS: float | None = None
+
+
+# Starts measuring the durations of the hot path stages, and returns the histograms they are observed in.
+def enable_stage_timing() -> dict[str, DurationHistogram]:
+  global _STAGE_HISTOGRAMS
+  _STAGE_HISTOGRAMS = {stage: DurationHistogram() for stage in _STAGES}
+  return _STAGE_HISTOGRAMS
 
+
+def disable_stage_timing() -> None:
+  global _STAGE_HISTOGRAMS
+  _STAGE_HISTOGRAMS = None
+
+
+def _put(points: list[Point]) -> None:
+  histograms = _STAGE_HISTOGRAMS
+  start_ns = time.perf_counter_ns() if histograms is not None else 0
+
+  if _INFLUX_SINK is not None:
+    _INFLUX_SINK.put(points)
+  elif _INGEST_QUEUE is not None:
+    _INGEST_QUEUE.put(points)
+  else:
+    LineProtocolCache.put(points)
+
+  if histograms is not None:
+    histograms['put'].observe(time.perf_counter_ns() - start_ns)
+
+
+# BleakScanner requires its callback to take exactly these 2 parameters.
 def detection_callback(device: BLEDevice, advertisement_data: AdvertisementData) -> None:
+  handle_advertisement(device, advertisement_data)
+
+
+# time_ns is the wall clock time of the advertisement, given when replaying captured advertisements.
+# adapter is the Bluetooth adapter that heard the advertisement, given when scanning with several adapters.
+def handle_advertisement(device: BLEDevice,
+                         advertisement_data: AdvertisementData,
+                         time_ns: int | None = None,
+                         adapter: str | None = None) -> None:
   if (device_mac := device.address) is None:
     return
-  try:
-    thermometer = get_thermometer(device_mac)
-  except ValueError:
+  if _CAPTURE_WRITER is not None:
+    _CAPTURE_WRITER.write(device_mac, advertisement_data.rssi, advertisement_data.manufacturer_data)
+
+  histograms = _STAGE_HISTOGRAMS
+  start_ns = time.perf_counter_ns() if histograms is not None else 0
+  thermometer = find_thermometer(device_mac)
+  if histograms is not None:
+    histograms['find_thermometer'].observe(time.perf_counter_ns() - start_ns)
+
+  if thermometer is None:
+    ADVERTISEMENT_COUNTERS['rejected'] += 1
     return
+  ADVERTISEMENT_COUNTERS['accepted'] += 1
+  if _SCAN_SCHEDULER is not None:
+    _SCAN_SCHEDULER.seen(thermometer)
 
   manufacturer_data = advertisement_data.manufacturer_data
 
   try:
     byte_data = list(manufacturer_data.values())[0]
   except IndexError as e:
+    PARSE_ERROR_COUNTERS['no_manufacturer_data'] += 1
     e.add_note(f'{list(manufacturer_data.values())=}')
     logging.exception('Error when extracting byte_data.')
     return
 
-  rssi = advertisement_data.rssi
+  if _MERGER is None:
+    _process(thermometer, byte_data, advertisement_data.rssi, adapter, time_ns)
+  else:
+    _MERGER.add(thermometer, byte_data, advertisement_data.rssi, adapter, time_ns)
+
+
+def _process(thermometer: Thermometer, byte_data: bytes, rssi: int, adapter: str | None, time_ns: int | None) -> None:
+  if _DEDUPLICATOR.is_duplicate(thermometer, byte_data, time_ns):
+    return
+
+  histograms = _STAGE_HISTOGRAMS
+  start_ns = time.perf_counter_ns() if histograms is not None else 0
 
   try:
-    points = DataPoint.build(thermometer, byte_data, rssi).to_points()
+    data_point = DataPoint.build(thermometer, byte_data, rssi, adapter)
   except ValueError as e:
+    PARSE_ERROR_COUNTERS['invalid_encoded_data' if isinstance(e, InvalidEncodedDataError) else 'malformed_data'] += 1
     e.add_note(f'{thermometer=}')
     e.add_note(f'{byte_data=}')
     e.add_note(f'{rssi=}')
     logging.exception('Error when building data point.')
     return
 
-  LineProtocolCache.put(points)
+  if histograms is not None:
+    histograms['build'].observe(time.perf_counter_ns() - start_ns)
+
+  # The readings and their latency share one timestamp.
+  if time_ns is None:
+    time_ns = time.time_ns()
+  READING_COUNTERS[thermometer] += 1
+  _LAST_READING_NS[thermometer] = time_ns
+  if _LATENCY_TRACKER is not None and (points := _LATENCY_TRACKER.add(thermometer, time_ns)):
+    _put(points)
+
+  if _AGGREGATOR is None:
+    start_ns = time.perf_counter_ns() if histograms is not None else 0
+    points = data_point.to_points(_RECORD_FORMAT, time_ns)
+    if histograms is not None:
+      histograms['to_points'].observe(time.perf_counter_ns() - start_ns)
+    _put(points)
+  elif points := _AGGREGATOR.add(data_point, time_ns):
+    _put(points)
+
+  # Side stores come after the reading is put, so that they can never cost the reading itself.
+  if _RECENT_READINGS is not None:
+    _RECENT_READINGS.add(data_point, time_ns)
+  if _ARCHIVE_WRITER is not None:
+    _ARCHIVE_WRITER.add(data_point, time_ns)
+
+  if FIRST_READING_SECONDS is None:
+    _record_first_reading()
+
+
+def _record_first_reading() -> None:
+  global FIRST_READING_SECONDS
+  FIRST_READING_SECONDS = seconds_since_process_start()
+  logging.info('First reading was put %.3fs after the process started.', FIRST_READING_SECONDS)
+
+
+async def _flush_aggregator(aggregator: 'Aggregator') -> None:
+  while True:
+    await asyncio.sleep(aggregator.seconds_until_next_window())
+    if points := aggregator.flush():
+      _put(points)
+
+
+def _thermometer_labels(thermometer: Thermometer) -> tuple[tuple[str, str], ...]:
+  return (('device_name', thermometer.device_name), ('nick_name', thermometer.nick_name))
+
+
+def _metrics(query: dict[str, list[str]]) -> tuple[str, bytes]:
+  from govee_h5072_logger.metrics import Exposition
+
+  now_ns = time.time_ns()
+  exposition = Exposition('govee_h5072_logger_')
+
+  exposition.counter('advertisements', 'Advertisements received, by whether they came from a registered thermometer.',
+                     [((('result', result),), ADVERTISEMENT_COUNTERS[result]) for result in ('accepted', 'rejected')])
+  exposition.counter('parse_errors', 'Advertisements of registered thermometers that could not be parsed, by kind.',
+                     [((('kind', kind),), count) for kind, count in sorted(PARSE_ERROR_COUNTERS.items())])
+  exposition.counter('deduplicator', 'Advertisements checked by the deduplicator, by result.',
+                     [((('result', result),), count) for result, count in sorted(_DEDUPLICATOR.counters.items())])
+  exposition.counter('readings', 'Readings decoded from each thermometer.',
+                     [(_thermometer_labels(t), count) for t, count in READING_COUNTERS.items()])
+  exposition.gauge('last_reading_age_seconds', 'Seconds since the last reading of each thermometer.',
+                   [(_thermometer_labels(t), (now_ns - time_ns) / 1e9) for t, time_ns in _LAST_READING_NS.items()])
+  if FIRST_READING_SECONDS is not None:
+    exposition.gauge('first_reading_seconds', 'Seconds from the start of the process to the first reading.',
+                     [((), FIRST_READING_SECONDS)])
+  if _INGEST_QUEUE is not None:
+    exposition.gauge('ingest_queue_depth', 'Points waiting in the ingest queue.', [((), _INGEST_QUEUE.depth)])
+    exposition.counter('ingest_queue_dropped', 'Points dropped by the full ingest queue.',
+                       [((), _INGEST_QUEUE.dropped)])
+  if _INFLUX_SINK is not None:
+    exposition.gauge('influx_backlog', 'Points waiting to be written to InfluxDB.', [((), _INFLUX_SINK.backlog)])
+    exposition.counter('influx_points', 'Points written to InfluxDB, to LineProtocolCache instead, or rejected.',
+                       [((('result', 'written'),), _INFLUX_SINK.written),
+                        ((('result', 'spilled'),), _INFLUX_SINK.spilled),
+                        ((('result', 'rejected'),), _INFLUX_SINK.rejected)])
+    exposition.counter('influx_failed_writes', 'Writes to InfluxDB that failed.', [((), _INFLUX_SINK.failed_writes)])
+  if _SCAN_SCHEDULER is not None:
+    exposition.gauge('scan_duty_cycle', 'Fraction of the time the scanners have been running.',
+                     [((), _SCAN_SCHEDULER.duty_cycle)])
+    exposition.gauge('scan_window_seconds', 'Longest duration of the next scan window.',
+                     [((), _SCAN_SCHEDULER.window_seconds)])
+    exposition.counter('scan_windows', 'Scan windows opened.', [((), _SCAN_SCHEDULER.windows)])
+    exposition.counter('scan_missed', 'Thermometers not heard by the end of a scan window.',
+                       [((), _SCAN_SCHEDULER.missed)])
+  if _STAGE_HISTOGRAMS is not None:
+    exposition.histogram('stage_duration_seconds', 'Duration of the hot path stages of each advertisement.',
+                         [((('stage', stage),), histogram) for stage, histogram in _STAGE_HISTOGRAMS.items()])
+
+  return 'text/plain; version=0.0.4; charset=utf-8', exposition.render()
+
+
+def _query_value(query: dict[str, list[str]], name: str) -> str | None:
+  return query[name][-1] if name in query else None
+
+
+# /readings/latest, optionally with ?device_name=...
+def _latest_readings(query: dict[str, list[str]]) -> tuple[str, bytes]:
+  assert _RECENT_READINGS is not None
+  return 'application/json', json.dumps(_RECENT_READINGS.latest(_query_value(query, 'device_name'))).encode()
+
+
+# /readings?device_name=...&minutes=...
+def _readings(query: dict[str, list[str]]) -> tuple[str, bytes]:
+  assert _RECENT_READINGS is not None
+  if (device_name := _query_value(query, 'device_name')) is None:
+    raise ValueError('Missing device_name.')
+  minutes = float(_query_value(query, 'minutes') or 10)
+  since_ns = time.time_ns() - int(minutes * 60_000_000_000)
+  return 'application/json', json.dumps(_RECENT_READINGS.since(device_name, since_ns)).encode()
+
+
+# Configures the stages behind detection_callback from flags, and opens LineProtocolCache for them.
+# On exit, writes out partial aggregation windows and drains the ingest queue and the InfluxDB sink before
+# LineProtocolCache closes.
+@contextlib.asynccontextmanager
+async def pipeline() -> AsyncIterator[None]:
+  global _CAPTURE_WRITER, _MERGER, _DEDUPLICATOR, _AGGREGATOR, _RECORD_FORMAT, _INGEST_QUEUE, _LATENCY_TRACKER
+  global _RECENT_READINGS, _ARCHIVE_WRITER, _INFLUX_SINK
+  _DEDUPLICATOR = Deduplicator(DEDUP_WINDOW_MS.value, DEDUP_HEARTBEAT_SECONDS.value)
+  _RECORD_FORMAT = RECORD_FORMAT.value
+  _AGGREGATOR = None
+  if AGGREGATION_WINDOW_SECONDS.value > 0:
+    from govee_h5072_logger.aggregator import Aggregator
+    _AGGREGATOR = Aggregator(AGGREGATION_WINDOW_SECONDS.value)
+  _INGEST_QUEUE = None
+  if INGEST_QUEUE_SIZE.value > 0:
+    from govee_h5072_logger.ingestqueue import IngestQueue
+    _INGEST_QUEUE = IngestQueue(INGEST_QUEUE_SIZE.value, INGEST_OVERFLOW_POLICY.value, INGEST_BATCH_SIZE.value,
+                                INGEST_BATCH_SECONDS.value)
+  _INFLUX_SINK = None
+  if INFLUX_URL.value is not None:
+    # Set along with --influx_url, as checked by its flag validator.
+    assert INFLUX_ORG.value is not None and INFLUX_BUCKET.value is not None
+    from govee_h5072_logger.influxsink import InfluxSink
+    _INFLUX_SINK = InfluxSink(INFLUX_URL.value, INFLUX_ORG.value, INFLUX_BUCKET.value, INFLUX_TOKEN.value,
+                              INFLUX_BATCH_SIZE.value, INFLUX_BATCH_SECONDS.value, INFLUX_MAX_BACKLOG.value,
+                              INFLUX_RETRY_SECONDS.value)
+  _LATENCY_TRACKER = LatencyTracker() if LATENCY.value else None
+
+  async with LineProtocolCache():
+    if CAPTURE_FILE.value is not None:
+      from govee_h5072_logger.capture import CaptureWriter
+      _CAPTURE_WRITER = CaptureWriter(CAPTURE_FILE.value)
+    if ARCHIVE_DIR.value is not None:
+      from govee_h5072_logger.archive import ArchiveWriter
+      _ARCHIVE_WRITER = ArchiveWriter(ARCHIVE_DIR.value, ARCHIVE_BLOCK_SIZE.value)
+      _ARCHIVE_WRITER.start()
+    if len(ADAPTERS.value or []) > 1:
+      from govee_h5072_logger.merger import AdvertisementMerger
+      _MERGER = AdvertisementMerger(ADAPTER_MERGE_WINDOW_MS.value / 1000, _process)
+    if _INGEST_QUEUE is not None:
+      _INGEST_QUEUE.start()
+    if _INFLUX_SINK is not None:
+      _INFLUX_SINK.start()
+    if _AGGREGATOR is not None:
+      flush_aggregator = asyncio.create_task(_flush_aggregator(_AGGREGATOR))
+    http_server = None
+    if HTTP_PORT.value > 0:
+      from govee_h5072_logger.httpserver import HttpServer
+      if STAGE_TIMING.value:
+        enable_stage_timing()
+      routes = {'/metrics': _metrics}
+      if RECENT_READINGS.value > 0:
+        from govee_h5072_logger.recentreadings import RecentReadings
+        _RECENT_READINGS = RecentReadings(RECENT_READINGS.value)
+        routes |= {'/readings/latest': _latest_readings, '/readings': _readings}
+      http_server = HttpServer(HTTP_HOST.value, HTTP_PORT.value, routes)
+      await http_server.start()
+
+    try:
+      yield
+    finally:
+      if http_server is not None:
+        await http_server.close()
+        disable_stage_timing()
+        _RECENT_READINGS = None
+
+      if _CAPTURE_WRITER is not None:
+        _CAPTURE_WRITER.close()
+        _CAPTURE_WRITER = None
+
+      if _MERGER is not None:
+        _MERGER.flush()
+        logging.info('Merged %d copies of advertisements heard on several adapters.', _MERGER.merged)
+        _MERGER = None
+
+      if _ARCHIVE_WRITER is not None:
+        _ARCHIVE_WRITER.close()
+        if _ARCHIVE_WRITER.dropped > 0:
+          logging.warning('Archive: %d blocks dropped as the disk fell behind.', _ARCHIVE_WRITER.dropped)
+        _ARCHIVE_WRITER = None
+
+      # Write out the partial windows so that the readings since the last window boundary are not lost.
+      if _AGGREGATOR is not None:
+        flush_aggregator.cancel()
+        if points := _AGGREGATOR.flush(flush_all=True):
+          _put(points)
+        _AGGREGATOR = None
+
+      if _INGEST_QUEUE is not None:
+        _INGEST_QUEUE.close()
+        logging.info('Ingest queue: %d flushes, %d points dropped, %.3fs max flush latency.', _INGEST_QUEUE.flushes,
+                     _INGEST_QUEUE.dropped, _INGEST_QUEUE.max_flush_seconds)
+        _INGEST_QUEUE = None
+
+      if _INFLUX_SINK is not None:
+        _INFLUX_SINK.close()
+        logging.info('InfluxDB sink: %d points written, %d points written to LineProtocolCache instead, %d rejected.',
+                     _INFLUX_SINK.written, _INFLUX_SINK.spilled, _INFLUX_SINK.rejected)
+        _INFLUX_SINK = None
+
+      logging.info('Advertisement counters: %s', dict(ADVERTISEMENT_COUNTERS))
+      logging.info('Deduplicator counters: %s', dict(_DEDUPLICATOR.counters))
+
+
+def _scanner(adapter: str | None) -> BleakScanner:
+  kwargs: dict[str, Any] = dict()
+  if adapter is not None:
+    kwargs['adapter'] = adapter
+  if PASSIVE_SCAN.value:
+    from bleak.assigned_numbers import AdvertisementDataType
+    from bleak.backends.bluezdbus.advertisement_monitor import OrPattern
+    from bleak.backends.bluezdbus.scanner import BlueZScannerArgs
+
+    kwargs['scanning_mode'] = 'passive'
+    # Manufacturer specific data starts with the company ID in little endian.
+    kwargs['bluez'] = BlueZScannerArgs(or_patterns=[
+        OrPattern(0, AdvertisementDataType.MANUFACTURER_SPECIFIC_DATA, company_id.to_bytes(2, 'little'))
+        for company_id in GOVEE_COMPANY_IDS.value
+    ])
+
+  if adapter is None:
+    return BleakScanner(detection_callback, **kwargs)
+
+  def callback(device: BLEDevice, advertisement_data: AdvertisementData) -> None:
+    handle_advertisement(device, advertisement_data, None, adapter)
+
+  return BleakScanner(callback, **kwargs)
+
+
+# Scans continuously, like entering the scanner, whose __aexit__ is typed too narrowly to be entered by an exit stack.
+@contextlib.asynccontextmanager
+async def _scanning(scanner: BleakScanner) -> AsyncIterator[None]:
+  await scanner.start()
+  try:
+    yield
+  finally:
+    await scanner.stop()
+
+
+# Runs the scanners in windows rather than entering them, which would scan continuously.
+# If the scanners fail to start or stop, stop_running is set and the error is raised on exit, like a scanner failing
+# to start in continuous mode fails at startup.
+@contextlib.asynccontextmanager
+async def _scan_scheduler(scanners: list[BleakScanner], stop_running: asyncio.Event) -> AsyncIterator[None]:
+  global _SCAN_SCHEDULER
+  from govee_h5072_logger.scanscheduler import ScanScheduler
+  _SCAN_SCHEDULER = ScanScheduler(scanners, SCAN_INTERVAL_SECONDS.value, SCAN_WINDOW_SECONDS.value)
+  run = asyncio.create_task(_SCAN_SCHEDULER.run())
+
+  def on_done(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+      logging.error('Scanning in windows failed, stopping.')
+      stop_running.set()
+
+  run.add_done_callback(on_done)
+
+  try:
+    yield
+  finally:
+    run.cancel()
+    logging.info('Scanned %.1f%% of the time in %d windows, missing %d thermometers.', _SCAN_SCHEDULER.duty_cycle * 100,
+                 _SCAN_SCHEDULER.windows, _SCAN_SCHEDULER.missed)
+    _SCAN_SCHEDULER = None
+    with contextlib.suppress(asyncio.CancelledError):
+      await run
+
+
+# Stage timing is only enabled for the duration of the profile, unless --stage_timing enabled it anyway.
+def _start_profiling() -> None:
+  global _PROFILER
+  if _PROFILER is None:
+    from govee_h5072_logger.profiler import Profiler
+    _PROFILER = Profiler(_PROFILE_DIR.value, _PROFILE_SECONDS.value)
+
+  timing_for_profile = _STAGE_HISTOGRAMS is None
+  histograms = enable_stage_timing() if timing_for_profile else _STAGE_HISTOGRAMS
+  assert histograms is not None
+
+  def on_stop() -> None:
+    if timing_for_profile:
+      disable_stage_timing()
+
+  _PROFILER.start(histograms, on_stop)
 
 
 async def main(args: list[str]) -> None:
@@ -53,17 +486,30 @@ async def main(args: list[str]) -> None:
     async with asyncio.timeout(5):
       dbus = await asyncio.create_subprocess_shell('service dbus start')
       await dbus.communicate()
-      bluez = await asyncio.create_subprocess_shell('/usr/sbin/bluetoothd &')
+      bluez = await asyncio.create_subprocess_shell(
+          '/usr/sbin/bluetoothd --experimental &' if PASSIVE_SCAN.value else '/usr/sbin/bluetoothd &')
       await bluez.communicate()
 
-  async with LineProtocolCache(), BleakScanner(detection_callback):
+  stop_running = asyncio.Event()
+
+  async with pipeline(), contextlib.AsyncExitStack() as scanners:
+    adapters = ADAPTERS.value or [None]
+    if SCAN_INTERVAL_SECONDS.value > 0:
+      await scanners.enter_async_context(_scan_scheduler([_scanner(adapter) for adapter in adapters], stop_running))
+    else:
+      for adapter in adapters:
+        await scanners.enter_async_context(_scanning(_scanner(adapter)))
+
     # Signal handlers must be set in the main thread of the main interprer.
     # Asyncio should be running this in the main thread.
-    stop_running = asyncio.Event()
     signal.signal(signal.SIGTERM, lambda signal_number, stack_frame: stop_running.set())
+    # Reloading reads a file and logs, which is only safe from the event loop rather than from a raw signal handler.
+    asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_thermometers)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, _start_profiling)
 
     await stop_running.wait()
 
 
 def app_run_main() -> None:
-  app.run(lambda args: asyncio.run(main(args), debug=True))
+  register_flags_validator()
+  app.run(lambda args: asyncio.run(main(args), debug=_ASYNCIO_DEBUG.value))
@@ -0,0 +1,57 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Callable
+
+from govee_h5072_logger.thermometer import Thermometer
+
+
+@dataclass
+class _Pending:
+  thermometer: Thermometer
+  byte_data: bytes
+  rssi: int
+  adapter: str | None
+  time_ns: int | None
+  timer: asyncio.TimerHandle | None = None
+
+
+# Collapses copies of the same advertisement heard on several adapters into one, keeping the copy with the best RSSI.
+# The first copy is held for the merge window, then passed on to emit. All scanners deliver advertisements on the
+# event loop thread, so no locking is needed.
+class AdvertisementMerger:
+  def __init__(self, window_seconds: float, emit: Callable[[Thermometer, bytes, int, str | None, int | None],
+                                                           None]) -> None:
+    self._window_seconds = window_seconds
+    self._emit = emit
+    self._loop = asyncio.get_running_loop()
+
+    # Mapping from device_mac to the advertisement being held.
+    self._pending: dict[str, _Pending] = dict()
+
+    # Number of copies collapsed into an advertisement being held.
+    self.merged = 0
+
+  def add(self, thermometer: Thermometer, byte_data: bytes, rssi: int, adapter: str | None,
+          time_ns: int | None) -> None:
+    if (pending := self._pending.get(thermometer.device_mac)) is not None:
+      if pending.byte_data == byte_data:
+        self.merged += 1
+        if rssi > pending.rssi:
+          pending.rssi = rssi
+          pending.adapter = adapter
+        return
+      # The thermometer has moved on to new data, so no more copies of the held one are expected.
+      self._release(thermometer.device_mac)
+
+    pending = self._pending[thermometer.device_mac] = _Pending(thermometer, byte_data, rssi, adapter, time_ns)
+    pending.timer = self._loop.call_later(self._window_seconds, self._release, thermometer.device_mac)
+
+  def flush(self) -> None:
+    for device_mac in list(self._pending.keys()):
+      self._release(device_mac)
+
+  def _release(self, device_mac: str) -> None:
+    pending = self._pending.pop(device_mac)
+    if pending.timer is not None:
+      pending.timer.cancel()
+    self._emit(pending.thermometer, pending.byte_data, pending.rssi, pending.adapter, pending.time_ns)
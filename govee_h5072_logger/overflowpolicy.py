@@ -0,0 +1,9 @@
+from enum import Enum, auto
+
+
+class OverflowPolicy(Enum):
+  # Discard the oldest queued points to make room for the new ones.
+  DROP_OLDEST = auto()
+  # Block the caller until the writer has made room. The caller is the Bluetooth detection callback on the event loop,
+  # so scanning, timers and the HTTP server all stall until then. Only for when no point may ever be dropped.
+  BLOCK = auto()
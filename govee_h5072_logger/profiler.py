@@ -0,0 +1,67 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import time
+from typing import Callable
+
+from absl import logging
+
+from govee_h5072_logger.metrics import DurationHistogram
+
+
+# Profiles the event loop thread for a limited time, then writes the cProfile stats and a text report to a directory.
+# The report also has the time spent in each hot path stage while profiling, from the stage histograms.
+class Profiler:
+  def __init__(self, directory: str, seconds: float) -> None:
+    self._directory = directory
+    self._seconds = seconds
+    self._profile: cProfile.Profile | None = None
+
+  @property
+  def running(self) -> bool:
+    return self._profile is not None
+
+  # on_stop is called after the results are written.
+  def start(self, stage_histograms: dict[str, DurationHistogram], on_stop: Callable[[], None]) -> None:
+    if self._profile is not None:
+      logging.warning('Already profiling, ignoring the request.')
+      return
+
+    # (count, sum_ns) of each stage when profiling started.
+    stages_at_start = {stage: (h.count, h.sum_ns) for stage, h in stage_histograms.items()}
+    self._profile = cProfile.Profile()
+    self._profile.enable()
+    logging.info('Profiling for %.1f seconds.', self._seconds)
+
+    def stop() -> None:
+      try:
+        self._stop(stage_histograms, stages_at_start)
+      finally:
+        on_stop()
+
+    asyncio.get_running_loop().call_later(self._seconds, stop)
+
+  def _stop(self, stage_histograms: dict[str, DurationHistogram], stages_at_start: dict[str, tuple[int, int]]) -> None:
+    assert self._profile is not None
+    self._profile.disable()
+    profile, self._profile = self._profile, None
+
+    os.makedirs(self._directory, exist_ok=True)
+    path = os.path.join(self._directory, time.strftime('profile-%Y%m%d-%H%M%S'))
+    profile.dump_stats(path + '.prof')
+
+    report = io.StringIO()
+    report.write(f'Stage timings over {self._seconds:.1f} seconds:\n')
+    for stage, histogram in stage_histograms.items():
+      count_at_start, sum_ns_at_start = stages_at_start.get(stage, (0, 0))
+      count, sum_ns = histogram.count - count_at_start, histogram.sum_ns - sum_ns_at_start
+      report.write(f'  {stage}: {count} calls, {sum_ns / 1e9:.6f}s total, '
+                   f'{sum_ns / count / 1e3 if count > 0 else 0:.2f}us per call\n')
+    report.write('\n')
+    pstats.Stats(profile, stream=report).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+    with open(path + '.txt', 'w') as file:
+      file.write(report.getvalue())
+
+    logging.info('Wrote profile to %s.prof and %s.txt.', path, path)
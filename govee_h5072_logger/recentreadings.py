@@ -0,0 +1,92 @@
+import array
+from typing import Any
+
+from govee_h5072_logger.datapoint import DataPoint
+
+# Stands for a missing battery level, which H5105 does not report.
+_NO_BATTERY = -1
+
+
+# Fixed-size ring buffer of the readings of one thermometer, in one typed array per field.
+# A reading takes 15 bytes, instead of the hundreds of bytes of a DataPoint and its list entry.
+class _RingBuffer:
+  def __init__(self, data_point: DataPoint, capacity: int) -> None:
+    self.device_name = data_point.device_name
+    self.nick_name = data_point.nick_name
+    self.model = data_point.model
+
+    self._capacity = capacity
+    self._time_ns = array.array('q', [0]) * capacity
+    self._temperature_c_10x = array.array('h', [0]) * capacity
+    self._humidity_percent_10x = array.array('H', [0]) * capacity
+    # Battery is a byte from 0 to 255 as decoded, so it needs more than a signed byte to also hold _NO_BATTERY.
+    self._battery_percent = array.array('h', [0]) * capacity
+    self._rssi = array.array('b', [0]) * capacity
+    # Index of the next reading to write, and number of readings held.
+    self._next = 0
+    self._size = 0
+
+  def add(self, data_point: DataPoint, time_ns: int) -> None:
+    i = self._next
+    self._time_ns[i] = time_ns
+    self._temperature_c_10x[i] = data_point.temperature_c_10x
+    self._humidity_percent_10x[i] = data_point.humidity_percent_10x
+    self._battery_percent[i] = _NO_BATTERY if data_point.battery_percent is None else data_point.battery_percent
+    self._rssi[i] = data_point.rssi
+    self._next = (i + 1) % self._capacity
+    self._size = min(self._size + 1, self._capacity)
+
+  def _reading(self, i: int) -> dict[str, Any]:
+    battery_percent = self._battery_percent[i]
+    return {
+        'time_ns': self._time_ns[i],
+        'temperature_c': self._temperature_c_10x[i] / 10,
+        'humidity_percent': self._humidity_percent_10x[i] / 10,
+        'battery_percent': None if battery_percent == _NO_BATTERY else battery_percent,
+        'rssi': self._rssi[i],
+    }
+
+  def latest(self) -> dict[str, Any]:
+    return self._reading((self._next - 1) % self._capacity)
+
+  # Readings at or after since_ns, oldest first. Only the readings returned are visited.
+  def since(self, since_ns: int) -> list[dict[str, Any]]:
+    readings: list[dict[str, Any]] = []
+    for n in range(1, self._size + 1):
+      i = (self._next - n) % self._capacity
+      if self._time_ns[i] < since_ns:
+        break
+      readings.append(self._reading(i))
+    readings.reverse()
+    return readings
+
+
+# The last readings of each thermometer, for queries that do not need to go to the database.
+class RecentReadings:
+  def __init__(self, capacity: int) -> None:
+    self._capacity = capacity
+    # Mapping from device_name to its readings.
+    self._buffers: dict[str, _RingBuffer] = dict()
+
+  def add(self, data_point: DataPoint, time_ns: int) -> None:
+    if (buffer := self._buffers.get(data_point.device_name)) is None:
+      buffer = self._buffers[data_point.device_name] = _RingBuffer(data_point, self._capacity)
+    buffer.add(data_point, time_ns)
+
+  def _buffer(self, device_name: str) -> _RingBuffer:
+    if (buffer := self._buffers.get(device_name)) is None:
+      raise ValueError(f'No readings of device_name {device_name!r}.')
+    return buffer
+
+  @staticmethod
+  def _describe(buffer: _RingBuffer) -> dict[str, Any]:
+    return {'device_name': buffer.device_name, 'nick_name': buffer.nick_name, 'model': buffer.model.name}
+
+  # The latest reading of the given thermometer, or of every thermometer if device_name is None.
+  def latest(self, device_name: str | None = None) -> list[dict[str, Any]]:
+    buffers = self._buffers.values() if device_name is None else [self._buffer(device_name)]
+    return [self._describe(buffer) | buffer.latest() for buffer in buffers]
+
+  def since(self, device_name: str, since_ns: int) -> dict[str, Any]:
+    buffer = self._buffer(device_name)
+    return self._describe(buffer) | {'readings': buffer.since(since_ns)}
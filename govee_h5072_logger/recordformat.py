@@ -0,0 +1,8 @@
+from enum import Enum, auto
+
+
+class RecordFormat(Enum):
+  # One line per field, tagged with the scale_factor and unit of the field.
+  PER_FIELD = auto()
+  # One line per reading with all fields on it. Temperature and humidity are scaled by 10.
+  MULTI_FIELD = auto()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from absl import app, flags, logging
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+
+from govee_h5072_logger.capture import read_capture
+from govee_h5072_logger.main import handle_advertisement, pipeline
+from govee_h5072_logger.thermometer import register_flags_validator
+
+_REPLAY_FILES = flags.DEFINE_multi_string(
+    name='replay_files',
+    default=None,
+    required=True,
+    help='Capture files written with --capture_file to feed through the logger, in order.',
+)
+
+_REPLAY_REALTIME = flags.DEFINE_bool(
+    name='replay_realtime',
+    default=False,
+    help='Replay advertisements at the rate they were captured instead of as fast as possible.',
+)
+
+
+async def main(args: list[str]) -> None:
+  n_advertisements = 0
+  start = time.perf_counter()
+
+  async with pipeline():
+    for path in _REPLAY_FILES.value:
+      # Wall clock time of the first advertisement, and when it was replayed.
+      first_time_ns: int | None = None
+      replay_start_ns = time.monotonic_ns()
+
+      for advertisement in read_capture(path):
+        if _REPLAY_REALTIME.value:
+          if first_time_ns is None:
+            first_time_ns = advertisement.time_ns
+          delay_ns = (advertisement.time_ns - first_time_ns) - (time.monotonic_ns() - replay_start_ns)
+          if delay_ns > 0:
+            await asyncio.sleep(delay_ns / 1_000_000_000)
+
+        device = BLEDevice(advertisement.device_mac, None, None, advertisement.rssi)
+        advertisement_data = AdvertisementData(None, advertisement.manufacturer_data, dict(), [], None,
+                                               advertisement.rssi, ())
+        handle_advertisement(device, advertisement_data, advertisement.time_ns)
+        n_advertisements += 1
+
+  seconds = time.perf_counter() - start
+  logging.info('Replayed %d advertisements in %.3fs, %.0f/s.', n_advertisements, seconds, n_advertisements / seconds)
+
+
+def app_run_main() -> None:
+  register_flags_validator()
+  app.run(lambda args: asyncio.run(main(args)))
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from absl import logging
+from bleak import BleakScanner
+
+from govee_h5072_logger.thermometer import Thermometer, registered_thermometers
+
+# Thermometers not heard for this many intervals stop holding windows open, so a dead battery does not keep the
+# scanners running for good. They are still picked up by the windows scanned for the others.
+_GIVE_UP_INTERVALS = 10
+
+
+# Runs the scanners in windows instead of continuously, aiming for one reading of each thermometer per interval.
+# A window ends as soon as every thermometer has been heard in it. When some are not, the next window is twice as long,
+# up to the interval, and it shrinks back once every thermometer is heard again.
+# The next window opens one interval after the least recently heard thermometer was heard, so overdue thermometers are
+# scanned for right away.
+class ScanScheduler:
+  def __init__(self, scanners: list[BleakScanner], interval_seconds: float, window_seconds: float) -> None:
+    self._scanners = scanners
+    self._interval_seconds = interval_seconds
+    self._min_window_seconds = window_seconds
+
+    self._start = time.monotonic()
+    # Monotonic time each thermometer was last heard.
+    self._last_seen: dict[Thermometer, float] = dict()
+    # Thermometers not heard yet in the current window.
+    self._waiting_for: set[Thermometer] = set()
+    self._all_seen = asyncio.Event()
+    self._scanning_since: float | None = None
+
+    # Gauges.
+    self.window_seconds = window_seconds
+    self.windows = 0
+    self.missed = 0
+    self._scanning_seconds = 0.0
+
+  # Fraction of the time the scanners have been running.
+  @property
+  def duty_cycle(self) -> float:
+    now = time.monotonic()
+    scanning_seconds = self._scanning_seconds
+    if self._scanning_since is not None:
+      scanning_seconds += now - self._scanning_since
+    return scanning_seconds / (now - self._start) if now > self._start else 1.0
+
+  def seen(self, thermometer: Thermometer) -> None:
+    self._last_seen[thermometer] = time.monotonic()
+    if thermometer in self._waiting_for:
+      self._waiting_for.discard(thermometer)
+      if len(self._waiting_for) == 0:
+        self._all_seen.set()
+
+  async def run(self) -> None:
+    try:
+      while True:
+        await self._scan_window()
+        await asyncio.sleep(self._seconds_until_due())
+    finally:
+      if self._scanning_since is not None:
+        await self._stop_scanners()
+
+  def _alive(self, now: float) -> list[Thermometer]:
+    return [
+        t for t in registered_thermometers()
+        if now - self._last_seen.get(t, self._start) < self._interval_seconds * _GIVE_UP_INTERVALS
+    ]
+
+  async def _scan_window(self) -> None:
+    self._waiting_for = set(self._alive(time.monotonic()))
+    self._all_seen.clear()
+    self.windows += 1
+
+    await self._start_scanners()
+    try:
+      async with asyncio.timeout(self.window_seconds):
+        await self._all_seen.wait()
+    except TimeoutError:
+      if self._waiting_for:
+        self.missed += len(self._waiting_for)
+        self.window_seconds = min(self.window_seconds * 2, self._interval_seconds)
+        logging.info('%d thermometers were not heard, widening the scan window to %.1fs: %s', len(self._waiting_for),
+                     self.window_seconds, sorted(t.device_name for t in self._waiting_for))
+    else:
+      self.window_seconds = max(self.window_seconds / 2, self._min_window_seconds)
+    await self._stop_scanners()
+
+  def _seconds_until_due(self) -> float:
+    now = time.monotonic()
+    last_seen = [self._last_seen.get(t, self._start) for t in self._alive(now)]
+    return max(min(last_seen, default=now) + self._interval_seconds - now, 0)
+
+  # Stops the scanners already started if one of them fails to start, so that none is left running unaccounted for.
+  async def _start_scanners(self) -> None:
+    started: list[BleakScanner] = []
+    try:
+      for scanner in self._scanners:
+        await scanner.start()
+        started.append(scanner)
+    except BaseException:
+      for scanner in started:
+        try:
+          await scanner.stop()
+        except Exception:
+          logging.exception('Error when stopping a scanner after another one failed to start.')
+      raise
+    self._scanning_since = time.monotonic()
+
+  async def _stop_scanners(self) -> None:
+    for scanner in self._scanners:
+      await scanner.stop()
+    assert self._scanning_since is not None
+    self._scanning_seconds += time.monotonic() - self._scanning_since
+    self._scanning_since = None
@@ -0,0 +1,12 @@
+from influxdb_client import Point
+
+
+# A Point that has already been serialized to line protocol, so it can be passed anywhere a Point is expected.
+# Only to_line_protocol() is meaningful on it.
+class SerializedPoint(Point):
+  def __init__(self, line: str) -> None:
+    super().__init__('')
+    self._line = line
+
+  def to_line_protocol(self, precision=None) -> str:
+    return self._line
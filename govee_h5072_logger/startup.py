@@ -0,0 +1,20 @@
+import os
+import time
+
+# Fallback for platforms without /proc, which misses the time spent before this module was imported.
+_IMPORT_MONOTONIC = time.monotonic()
+
+
+# Seconds since the process started, including the interpreter startup and the imports.
+def seconds_since_process_start() -> float:
+  try:
+    with open('/proc/self/stat') as file:
+      # The command name in parentheses might contain spaces. The start time is the 22nd field, in clock ticks since
+      # boot.
+      start_ticks = int(file.read().rsplit(')', 1)[1].split()[19])
+    with open('/proc/uptime') as file:
+      uptime_seconds = float(file.read().split()[0])
+  except (OSError, ValueError, IndexError):
+    return time.monotonic() - _IMPORT_MONOTONIC
+
+  return uptime_seconds - start_ticks / os.sysconf('SC_CLK_TCK')
@@ -1,9 +1,11 @@
+import json
+import string
 from dataclasses import dataclass
 from typing import Any
 
-from absl import flags
+from absl import flags, logging
 
-from govee_h5072_logger.flag import DEVICE_MACS, DEVICE_NAMES, MODELS, NICK_NAMES
+from govee_h5072_logger.flag import DEVICE_MACS, DEVICE_NAMES, MODELS, NICK_NAMES, THERMOMETERS_FILE
 from govee_h5072_logger.model import Model
 
 
@@ -15,33 +17,144 @@ class Thermometer:
   model: Model
 
 
-# Mapping from device_name to Thermometer for easier indexing.
+# Mapping from device_mac to Thermometer for easier indexing.
+# Each thermometer is indexed under its MAC in upper and lower case, separated by ':' and by '-', so lookups of the
+# formats reported by scanners need neither normalization nor a second lookup. Other formats are normalized on a miss.
+# Replaced as a whole when the thermometers are reloaded, so readers never see a partially built registry.
 _THERMOMETERS: dict[str, Thermometer] = dict()
 
 
+# Formats a MAC as upper case hex bytes separated by ':', e.g. "a4-c1-38-00-77-05" becomes "A4:C1:38:00:77:05".
+def normalize_mac(device_mac: str) -> str:
+  digits = device_mac.translate(str.maketrans('', '', ':-.')).upper()
+  if len(digits) != 12 or any(c not in string.hexdigits for c in digits):
+    raise ValueError(f'Invalid MAC {device_mac!r}.')
+  return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def _in_indexed_format(device_mac: str) -> bool:
+  return (len(device_mac) == 17 and device_mac[2::3] in (':::::', '-----') and
+          (device_mac.isupper() or device_mac.islower()))
+
+
+def _build_registry(thermometers: list[Thermometer]) -> dict[str, Thermometer]:
+  if len(thermometers) == 0:
+    raise ValueError('No thermometers.')
+
+  thermometers = [Thermometer(t.device_name, normalize_mac(t.device_mac), t.nick_name, t.model) for t in thermometers]
+  if len(thermometers) != len(set(t.device_name for t in thermometers)):
+    raise ValueError('Device names contain duplications.')
+  if len(thermometers) != len(set(t.device_mac for t in thermometers)):
+    raise ValueError('Device MACs contain duplications.')
+
+  registry: dict[str, Thermometer] = dict()
+  for t in thermometers:
+    for device_mac in (t.device_mac, t.device_mac.replace(':', '-')):
+      registry[device_mac] = t
+      registry[device_mac.lower()] = t
+  return registry
+
+
+def _load_thermometers_file(path: str) -> dict[str, Thermometer]:
+  with open(path) as file:
+    entries = json.load(file)
+
+  try:
+    thermometers = [
+        Thermometer(str(e['device_name']), str(e['device_mac']), str(e['nick_name']), Model[e['model']])
+        for e in entries
+    ]
+  except (KeyError, TypeError) as e:
+    raise ValueError(f'Malformed thermometer entry in {path}.') from e
+
+  return _build_registry(thermometers)
+
+
 def _parse_thermometers(flag: dict[str, Any]) -> bool:
-  if len(DEVICE_NAMES.value) == 0:
-    raise flags.ValidationError('')
+  global _THERMOMETERS
+
+  if flag[THERMOMETERS_FILE.name] is not None:
+    if any(flag[f.name] is not None for f in (DEVICE_NAMES, DEVICE_MACS, NICK_NAMES, MODELS)):
+      raise flags.ValidationError('Thermometers must be set either from a file or from flags, not both.')
+    try:
+      _THERMOMETERS = _load_thermometers_file(flag[THERMOMETERS_FILE.name])
+    except (OSError, ValueError) as e:
+      raise flags.ValidationError(f'Unable to load thermometers: {e}') from e
+    return True
 
-  if len(DEVICE_NAMES.value) != len(set(DEVICE_NAMES.value)):
-    raise flags.ValidationError('Device names contain duplications.')
-  if len(DEVICE_MACS.value) != len(set(DEVICE_MACS.value)):
-    raise flags.ValidationError('Device MACs contain duplications.')
+  if not flag[DEVICE_NAMES.name]:
+    raise flags.ValidationError('Thermometers must be set either from a file or from flags.')
 
   try:
-    for item in zip(DEVICE_NAMES.value, DEVICE_MACS.value, NICK_NAMES.value, MODELS.value, strict=True):
-      _THERMOMETERS[item[1]] = Thermometer(*item)
+    thermometers = [
+        Thermometer(*item) for item in zip(flag[DEVICE_NAMES.name],
+                                           flag[DEVICE_MACS.name] or [],
+                                           flag[NICK_NAMES.name] or [],
+                                           flag[MODELS.name] or [],
+                                           strict=True)
+    ]
   except ValueError as e:
     raise flags.ValidationError('Flags must have the same length.') from e
 
+  try:
+    _THERMOMETERS = _build_registry(thermometers)
+  except ValueError as e:
+    raise flags.ValidationError(str(e)) from e
+
   return True
 
 
-flags.register_multi_flags_validator((DEVICE_NAMES, DEVICE_MACS, NICK_NAMES, MODELS), _parse_thermometers)
+_FLAGS_VALIDATOR_REGISTERED = False
 
 
-def get_thermometer(device_mac: str) -> Thermometer:
+# Loads the thermometers from their flags when the flags are parsed, failing the parsing if they are not set.
+# Registered by the entry points that need thermometers rather than on import, so that tools reading files which
+# describe their thermometers themselves, like govee-h5072-export-archive, do not require them.
+def register_flags_validator() -> None:
+  global _FLAGS_VALIDATOR_REGISTERED
+  if not _FLAGS_VALIDATOR_REGISTERED:
+    flags.register_multi_flags_validator((DEVICE_NAMES, DEVICE_MACS, NICK_NAMES, MODELS, THERMOMETERS_FILE),
+                                         _parse_thermometers)
+    _FLAGS_VALIDATOR_REGISTERED = True
+
+
+# Reloads the thermometers from --thermometers_file. The current thermometers are kept if the file is invalid.
+def reload_thermometers() -> bool:
+  global _THERMOMETERS
+
+  if THERMOMETERS_FILE.value is None:
+    logging.warning('Thermometers are not loaded from a file, nothing to reload.')
+    return False
+
+  try:
+    thermometers = _load_thermometers_file(THERMOMETERS_FILE.value)
+  except (OSError, ValueError):
+    logging.exception('Unable to reload thermometers, keeping the current ones.')
+    return False
+
+  _THERMOMETERS = thermometers
+  logging.info('Reloaded %d thermometers.', len(set(thermometers.values())))
+  return True
+
+
+# Returns None for unexpected MACs, which is cheaper than raising for the many advertisements from other devices.
+def find_thermometer(device_mac: str) -> Thermometer | None:
+  if (thermometer := _THERMOMETERS.get(device_mac)) is not None:
+    return thermometer
+  # A miss of a MAC in one of the indexed formats, as scanners report them, needs no normalization.
+  if _in_indexed_format(device_mac):
+    return None
   try:
-    return _THERMOMETERS[device_mac]
-  except KeyError as e:
-    raise ValueError('Unexpected thermometer device mac.') from e
+    return _THERMOMETERS.get(normalize_mac(device_mac))
+  except ValueError:
+    return None
+
+
+def get_thermometer(device_mac: str) -> Thermometer:
+  if (thermometer := find_thermometer(device_mac)) is None:
+    raise ValueError('Unexpected thermometer device mac.')
+  return thermometer
+
+
+def registered_thermometers() -> set[Thermometer]:
+  return set(_THERMOMETERS.values())
@@ -1,6 +1,13 @@
 # pip install absl-py aiomysql influxdb-client[async]
 import asyncio
+import itertools
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from decimal import Decimal
+from typing import Any, Awaitable, Callable, Sequence
 
 import aiomysql
 from absl import app, flags, logging
@@ -29,10 +36,23 @@ _SQL_DATABASE_NAME = flags.DEFINE_string(name='sql_database_name',
                                          required=True,
                                          help='Database to use.')
 
-_SQL_SCROLL = flags.DEFINE_integer(name='sql_scroll',
-                                   default=0,
-                                   required=False,
-                                   help='Fast forward to this row number to resume uploading.')
+_PARTITIONS = flags.DEFINE_integer(name='partitions',
+                                   default=16,
+                                   lower_bound=1,
+                                   help='Number of timestamp ranges to split the table into. Ignored when resuming.')
+
+_PARTITION_WORKERS = flags.DEFINE_integer(
+    name='partition_workers',
+    default=4,
+    lower_bound=1,
+    help='Number of partitions migrated concurrently, each on its own connection.')
+
+_CHECKPOINT_FILE = flags.DEFINE_string(
+    name='checkpoint_file',
+    default=None,
+    required=True,
+    help=('File recording the progress of each partition. Resumes from it if it exists, so use a new file for each '
+          'fresh migration.'))
 
 _INFLUXDB_URL = flags.DEFINE_string(name='influxdb_url',
                                     default=None,
@@ -54,12 +74,51 @@ _INFLUXDB_BUCKET = flags.DEFINE_string(name='influxdb_bucket',
                                        required=True,
                                        help='specifies the destination bucket for writes.')
 
+_SERIALIZE_WORKERS = flags.DEFINE_integer(name='serialize_workers',
+                                          default=os.cpu_count() or 1,
+                                          lower_bound=0,
+                                          help='Processes converting rows to line protocol. 0 converts inline.')
+
+_WRITES_IN_FLIGHT = flags.DEFINE_integer(name='writes_in_flight',
+                                         default=4,
+                                         lower_bound=1,
+                                         help='Maximum number of concurrent writes to InfluxDB.')
+
 # The optimal batch size is 5000 lines of line protocol.
 # https://docs.influxdata.com/influxdb/v2.5/write-data/best-practices/optimize-writes/#batch-writes
 _INFLUXDB_BATCH_SIZE = 5000
+# Each row becomes 4 lines.
+_SQL_FETCH_SIZE = _INFLUXDB_BATCH_SIZE // 4
+
+_SQL_SELECT_RANGE = '''
+  SELECT
+    MIN(timestamp_ns),
+    MAX(timestamp_ns)
+  FROM
+    ThermometerRecord;
+'''
+
+# Indexes of ThermometerRecord as (name, column) rows in the order of their columns.
+_SQL_SELECT_INDEXES = '''
+  SELECT
+    INDEX_NAME,
+    COLUMN_NAME
+  FROM
+    information_schema.STATISTICS
+  WHERE
+    TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'ThermometerRecord'
+  ORDER BY
+    INDEX_NAME,
+    SEQ_IN_INDEX;
+'''
 
-_SQL_SELECT_ALL = '''
-  SET STATEMENT max_statement_time=7200 FOR
+# Keyset pagination: each page starts right after the last row of the previous page, so the server seeks to it on the
+# index instead of reading and discarding the rows before it.
+# (timestamp_ns, device_name) is used as the key since several thermometers might report at the same nanosecond.
+# This is only a seek with an index starting with these columns, see _PAGE_INDEX. Without one every page sorts the rest
+# of the table.
+_SQL_SELECT_PAGE = '''
   SELECT
     timestamp_ns,
     device_name,
@@ -70,12 +129,32 @@ _SQL_SELECT_ALL = '''
     rssi,
     last_timestamp_ns
   FROM
-    ThermometerRecord;
+    ThermometerRecord
+  WHERE
+    timestamp_ns >= %(start_ns)s
+    AND timestamp_ns < %(end_ns)s
+    AND (timestamp_ns > %(after_ns)s OR (timestamp_ns = %(after_ns)s AND device_name > %(after_device_name)s))
+  ORDER BY
+    timestamp_ns,
+    device_name
+  LIMIT %(limit)s;
 '''
 
+_PAGE_INDEX = ('timestamp_ns', 'device_name')
+_CREATE_PAGE_INDEX = 'CREATE INDEX timestamp_ns_device_name ON ThermometerRecord (timestamp_ns, device_name);'
+
+
+# Whether one of the indexes, given as (name, column) rows in the order of their columns, starts with _PAGE_INDEX.
+def _has_page_index(index_columns: Sequence[Sequence[str]]) -> bool:
+  columns: dict[str, list[str]] = dict()
+  for index_name, column_name in index_columns:
+    columns.setdefault(index_name, []).append(column_name)
+  return any(tuple(c[:len(_PAGE_INDEX)]) == _PAGE_INDEX for c in columns.values())
 
-async def _get_mysql_connection() -> aiomysql.Connection:
-  return await aiomysql.connect(
+
+async def _get_mysql_pool() -> aiomysql.Pool:
+  return await aiomysql.create_pool(
+      maxsize=_PARTITION_WORKERS.value,
       user=_SQL_USER.value,
       password=_SQL_PASSWORD.value,
       host=_SQL_HOST.value,
@@ -84,10 +163,60 @@ async def _get_mysql_connection() -> aiomysql.Connection:
   )
 
 
-async def _get_points(mysql_cursor: aiomysql.SSCursor) -> list[Point]:
-  points: list[Point] = []
+# Rows with start_ns <= timestamp_ns < end_ns.
+# Rows up to and including the key (after_ns, after_device_name) have been written.
+@dataclass
+class _Partition:
+  start_ns: int
+  end_ns: int
+  after_ns: int
+  after_device_name: str = ''
+  done: bool = False
+
+
+# Splits [min_ns, max_ns] into partitions of about the same time span.
+def _partitions(min_ns: int, max_ns: int, n_partitions: int) -> list[_Partition]:
+  bounds = [min_ns + (max_ns + 1 - min_ns) * i // n_partitions for i in range(n_partitions + 1)]
+  return [_Partition(start_ns, end_ns, start_ns) for start_ns, end_ns in zip(bounds, bounds[1:]) if start_ns < end_ns]
+
+
+class _Checkpoint:
+  def __init__(self, path: str, partitions: list[_Partition]) -> None:
+    self._path = path
+    self.partitions = partitions
+
+  @classmethod
+  def load(cls, path: str) -> '_Checkpoint | None':
+    try:
+      with open(path) as file:
+        return cls(path, [_Partition(**p) for p in json.load(file)['partitions']])
+    except FileNotFoundError:
+      return None
+
+  # Written to a temporary file and renamed, so a crash while saving leaves the previous checkpoint intact.
+  def save(self) -> None:
+    with open(temp_path := self._path + '.tmp', 'w') as file:
+      json.dump({'partitions': [asdict(p) for p in self.partitions]}, file, indent=2)
+    os.replace(temp_path, self._path)
+
+
+# Mapping from (measurement, nick_name, device_name, field) to the line protocol up to the '=' of the field value.
+# Each worker process has its own copy.
+_LINE_PREFIXES: dict[tuple[str, str, str, str], str] = dict()
 
-  while len(points) < _INFLUXDB_BATCH_SIZE and (row := await mysql_cursor.fetchone()) is not None:
+
+def _line_prefix(measurement: str, nick_name: str, device_name: str, field: str) -> str:
+  if (prefix := _LINE_PREFIXES.get(key := (measurement, nick_name, device_name, field))) is None:
+    # Serialize a template Point so that escaping is exactly what Point would do.
+    point = Point(measurement).tag('nick_name', nick_name).tag('device_name', device_name).field(field, 0)
+    prefix = _LINE_PREFIXES[key] = point.to_line_protocol().removesuffix('=0i')
+  return prefix
+
+
+def _rows_to_lines(rows: Sequence[Sequence[Any]]) -> str:
+  lines: list[str] = []
+
+  for row in rows:
     timestamp_ns: int = row[0]
     device_name: str = row[1]
     nick_name: str = row[2]
@@ -97,46 +226,152 @@ async def _get_points(mysql_cursor: aiomysql.SSCursor) -> list[Point]:
     rssi: int = row[6]
     # last_timestamp_ns: int = row[7]
 
-    points.extend([
-        Point('temperature').tag('nick_name', nick_name).tag('device_name', device_name).field(
-            'temperature_c_10x', int(temperature_c * 10)).time(timestamp_ns),
-        Point('humidity').tag('nick_name', nick_name).tag('device_name', device_name).field(
-            'humidity_percent_10x', int(humidity_percent * 10)).time(timestamp_ns),
-        Point('battery').tag('nick_name',
-                             nick_name).tag('device_name',
-                                            device_name).field('battery_percent',
-                                                               battery_percent).time(timestamp_ns),
-        Point('signal').tag('nick_name', nick_name).tag('device_name',
-                                                        device_name).field('rssi',
-                                                                           rssi).time(timestamp_ns),
+    lines.extend([
+        f'{_line_prefix("temperature", nick_name, device_name, "temperature_c_10x")}={int(temperature_c * 10)}i '
+        f'{timestamp_ns}',
+        f'{_line_prefix("humidity", nick_name, device_name, "humidity_percent_10x")}={int(humidity_percent * 10)}i '
+        f'{timestamp_ns}',
+        f'{_line_prefix("battery", nick_name, device_name, "battery_percent")}={battery_percent}i {timestamp_ns}',
+        f'{_line_prefix("signal", nick_name, device_name, "rssi")}={rssi}i {timestamp_ns}',
+        # f'{_line_prefix("last_timestamp", nick_name, device_name, "last_timestamp_ns")}={last_timestamp_ns}i '
+        # f'{timestamp_ns}',
         # Latency will be calculated using InfluxDB Tasks.
-        # Point('last_timestamp').tag('nick_name', nick_name).tag('device_name', device_name).field(
-        #     'last_timestamp_ns', last_timestamp_ns).time(timestamp_ns),
     ])
 
-  return points
+  return '\n'.join(lines)
+
+
+# Fetches the next batch of rows while up to writes_in_flight earlier batches are being converted and written.
+# on_written is called with the last row of each batch once it and all batches fetched before it have been written.
+# Returns the number of rows written.
+async def _migrate(fetch_rows: Callable[[], Awaitable[Sequence[Sequence[Any]]]],
+                   write: Callable[[str], Awaitable[Any]],
+                   executor: Executor | None,
+                   writes_in_flight: int,
+                   on_written: Callable[[Sequence[Any]], None] = lambda row: None) -> int:
+  loop = asyncio.get_running_loop()
+  slots = asyncio.Semaphore(writes_in_flight)
+  start = time.monotonic()
+  n_rows = 0
+  # Mapping from the index of each written batch to its last row, until the batches before it are written too.
+  written: dict[int, Sequence[Any]] = dict()
+  next_index = 0
+
+  async def convert_and_write(index: int, rows: Sequence[Sequence[Any]]) -> None:
+    nonlocal n_rows, next_index
+    try:
+      if executor is None:
+        lines = _rows_to_lines(rows)
+      else:
+        lines = await loop.run_in_executor(executor, _rows_to_lines, rows)
+      await write(lines)
+    finally:
+      slots.release()
+
+    written[index] = rows[-1]
+    while next_index in written:
+      on_written(written.pop(next_index))
+      next_index += 1
+
+    n_rows += len(rows)
+    logging.info('n_rows = %s, %.0f rows/s', n_rows, n_rows / (time.monotonic() - start))
+
+  async with asyncio.TaskGroup() as task_group:
+    for index in itertools.count():
+      await slots.acquire()
+      if len(rows := await fetch_rows()) == 0:
+        slots.release()
+        break
+      task_group.create_task(convert_and_write(index, rows))
+
+  return n_rows
+
+
+async def _migrate_partition(mysql_pool: aiomysql.Pool, partition: _Partition, checkpoint: _Checkpoint,
+                             write: Callable[[str], Awaitable[Any]], executor: Executor | None) -> int:
+  # The key of the last fetched row, which is ahead of the checkpoint while its batch is being written.
+  after_ns, after_device_name = partition.after_ns, partition.after_device_name
+
+  def on_written(row: Sequence[Any]) -> None:
+    partition.after_ns, partition.after_device_name = row[0], row[1]
+    checkpoint.save()
+
+  mysql_cursor: aiomysql.Cursor
+  async with mysql_pool.acquire() as mysql_connection, mysql_connection.cursor() as mysql_cursor:
+
+    async def fetch_rows() -> Sequence[Sequence[Any]]:
+      nonlocal after_ns, after_device_name
+      await mysql_cursor.execute(
+          _SQL_SELECT_PAGE,
+          dict(start_ns=partition.start_ns,
+               end_ns=partition.end_ns,
+               after_ns=after_ns,
+               after_device_name=after_device_name,
+               limit=_SQL_FETCH_SIZE))
+      rows = await mysql_cursor.fetchall()
+      if len(rows) > 0:
+        after_ns, after_device_name = rows[-1][0], rows[-1][1]
+      return rows
+
+    n_rows = await _migrate(fetch_rows, write, executor, _WRITES_IN_FLIGHT.value, on_written)
+
+  partition.done = True
+  checkpoint.save()
+  logging.info('Migrated %s rows of partition [%s, %s).', n_rows, partition.start_ns, partition.end_ns)
+  return n_rows
 
 
 async def main(_: list[str]) -> None:
-  mysql_cursor: aiomysql.SSCursor
-  async with await _get_mysql_connection() as mysql_connection, await mysql_connection.cursor(
-      aiomysql.SSCursor
-  ) as mysql_cursor, InfluxDBClientAsync(url=_INFLUXDB_URL.value,
-                                         token=_INFLUXDB_TOKEN.value,
-                                         org=_INFLUXDB_ORG.value) as influxdb_client:
-    await influxdb_client.ping()
-    influxdb_write_api = influxdb_client.write_api()
-
-    await mysql_cursor.execute(_SQL_SELECT_ALL)
-    await mysql_cursor.scroll(_SQL_SCROLL.value)
-
-    n_rows: int = _SQL_SCROLL.value
-
-    points: list[Point]
-    while len((points := await _get_points(mysql_cursor))) > 0:
-      await influxdb_write_api.write(bucket=_INFLUXDB_BUCKET.value, record=points)
-      n_rows += len(points) // 4
-      logging.info('n_rows = %s', n_rows)
+  mysql_pool = await _get_mysql_pool()
+  try:
+    async with InfluxDBClientAsync(url=_INFLUXDB_URL.value,
+                                   token=_INFLUXDB_TOKEN.value,
+                                   org=_INFLUXDB_ORG.value,
+                                   enable_gzip=True) as influxdb_client:
+      await influxdb_client.ping()
+      influxdb_write_api = influxdb_client.write_api()
+
+      mysql_cursor: aiomysql.Cursor
+      async with mysql_pool.acquire() as mysql_connection, mysql_connection.cursor() as mysql_cursor:
+        await mysql_cursor.execute(_SQL_SELECT_INDEXES)
+        if not _has_page_index(await mysql_cursor.fetchall()):
+          raise app.UsageError(f'ThermometerRecord needs an index on {", ".join(_PAGE_INDEX)} to be paged through '
+                               f'efficiently. Create it with: {_CREATE_PAGE_INDEX}')
+
+      if (checkpoint := _Checkpoint.load(_CHECKPOINT_FILE.value)) is None:
+        async with mysql_pool.acquire() as mysql_connection, mysql_connection.cursor() as mysql_cursor:
+          await mysql_cursor.execute(_SQL_SELECT_RANGE)
+          min_ns, max_ns = await mysql_cursor.fetchone()
+        if min_ns is None:
+          logging.info('ThermometerRecord is empty.')
+          return
+        checkpoint = _Checkpoint(_CHECKPOINT_FILE.value, _partitions(min_ns, max_ns, _PARTITIONS.value))
+        checkpoint.save()
+      else:
+        logging.info('Resuming %d of %d partitions from %s.', sum(not p.done for p in checkpoint.partitions),
+                     len(checkpoint.partitions), _CHECKPOINT_FILE.value)
+
+      workers = asyncio.Semaphore(_PARTITION_WORKERS.value)
+
+      async def write(lines: str) -> None:
+        await influxdb_write_api.write(bucket=_INFLUXDB_BUCKET.value, record=lines)
+
+      async def migrate_partition(partition: _Partition) -> int:
+        async with workers:
+          return await _migrate_partition(mysql_pool, partition, checkpoint, write, executor)
+
+      executor = ProcessPoolExecutor(_SERIALIZE_WORKERS.value) if _SERIALIZE_WORKERS.value > 0 else None
+      try:
+        async with asyncio.TaskGroup() as task_group:
+          tasks = [task_group.create_task(migrate_partition(p)) for p in checkpoint.partitions if not p.done]
+      finally:
+        if executor is not None:
+          executor.shutdown()
+
+      logging.info('Migrated %s rows.', sum(task.result() for task in tasks))
+  finally:
+    mysql_pool.close()
+    await mysql_pool.wait_closed()
 
 
 def app_run_main():
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from absl.testing import absltest
+from influxdb_client import Point
+
+try:
+  import mysqltoinfluxdb
+except ModuleNotFoundError as e:
+  # The dependencies of the script, listed at its top, are not installed along with the logger.
+  raise unittest.SkipTest(f'Dependencies of mysqltoinfluxdb are not installed: {e}') from e
+
+
+class TestMysqlToInfluxdb(absltest.TestCase):
+  ROWS = [
+      (1_000, 'device 1', 'n=1', Decimal('20.1'), Decimal('55.3'), 99, -70, 900),
+      (2_000, 'device 2', 'n,2', Decimal('-5.4'), Decimal('40.0'), 50, -80, 1_900),
+  ]
+
+  def _fetcher(self, rows: list[tuple], fetch_size: int):
+    batches = [rows[i:i + fetch_size] for i in range(0, len(rows), fetch_size)]
+
+    async def fetch_rows() -> list[tuple]:
+      await asyncio.sleep(0)
+      return batches.pop(0) if batches else []
+
+    return fetch_rows
+
+  def test_rowsToLines_matchesPoints(self):
+    expected: list[str] = []
+    for timestamp_ns, device_name, nick_name, temperature_c, humidity_percent, battery_percent, rssi, _ in self.ROWS:
+      expected.extend([
+          Point('temperature').tag('nick_name', nick_name).tag('device_name', device_name).field(
+              'temperature_c_10x', int(temperature_c * 10)).time(timestamp_ns).to_line_protocol(),  # type: ignore
+          Point('humidity').tag('nick_name', nick_name).tag('device_name', device_name).field(
+              'humidity_percent_10x', int(humidity_percent * 10)).time(timestamp_ns).to_line_protocol(),  # type: ignore
+          Point('battery').tag('nick_name', nick_name).tag('device_name', device_name).field(
+              'battery_percent', battery_percent).time(timestamp_ns).to_line_protocol(),  # type: ignore
+          Point('signal').tag('nick_name', nick_name).tag('device_name', device_name).field(
+              'rssi', rssi).time(timestamp_ns).to_line_protocol(),  # type: ignore
+      ])
+
+    self.assertEqual(mysqltoinfluxdb._rows_to_lines(self.ROWS), '\n'.join(expected))
+
+  def test_migrate_writesAllRows(self):
+    rows = [(i, f'd{i % 3}', f'n{i % 3}', Decimal('21.5'), Decimal('50.0'), 80, -60, 0) for i in range(1, 1001)]
+    written: list[str] = []
+
+    async def write(lines: str) -> None:
+      await asyncio.sleep(0)
+      written.append(lines)
+
+    with ProcessPoolExecutor(2) as executor:
+      n_rows = asyncio.run(mysqltoinfluxdb._migrate(self._fetcher(rows, 64), write, executor, 4))
+
+    self.assertEqual(n_rows, 1000)
+    self.assertCountEqual('\n'.join(written).split('\n'), mysqltoinfluxdb._rows_to_lines(rows).split('\n'))
+
+  def test_migrate_limitsWritesInFlight(self):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def write(lines: str) -> None:
+      nonlocal in_flight, max_in_flight
+      in_flight += 1
+      max_in_flight = max(max_in_flight, in_flight)
+      await asyncio.sleep(0.01)
+      in_flight -= 1
+
+    rows = self.ROWS * 20
+    n_rows = asyncio.run(mysqltoinfluxdb._migrate(self._fetcher(rows, 2), write, None, 3))
+
+    self.assertEqual(n_rows, 40)
+    self.assertEqual(max_in_flight, 3)
+
+  def test_migrate_writeFails_raises(self):
+
+    async def write(lines: str) -> None:
+      raise ConnectionError('InfluxDB is down.')
+
+    with self.assertRaises(ExceptionGroup) as context:
+      asyncio.run(mysqltoinfluxdb._migrate(self._fetcher(self.ROWS, 1), write, None, 2))
+
+    self.assertIsInstance(context.exception.exceptions[0], ConnectionError)
+
+  def test_migrate_callsOnWrittenInFetchOrder(self):
+    delays = [0.03, 0.01, 0.02, 0]
+
+    async def write(lines: str) -> None:
+      await asyncio.sleep(delays.pop(0))
+
+    rows = [(i, 'd', 'n', Decimal('20.0'), Decimal('50.0'), 100, -50, 0) for i in range(8)]
+    on_written: list[int] = []
+    asyncio.run(mysqltoinfluxdb._migrate(self._fetcher(rows, 2), write, None, 4, lambda row: on_written.append(row[0])))
+
+    self.assertEqual(on_written, [1, 3, 5, 7])
+
+  def test_partitions_coverRange(self):
+    partitions = mysqltoinfluxdb._partitions(100, 199, 3)
+
+    self.assertEqual([(p.start_ns, p.end_ns) for p in partitions], [(100, 133), (133, 166), (166, 200)])
+    self.assertEqual([p.after_ns for p in partitions], [100, 133, 166])
+
+  def test_partitions_moreThanTimestamps_skipsEmpty(self):
+    partitions = mysqltoinfluxdb._partitions(100, 101, 4)
+
+    self.assertEqual([(p.start_ns, p.end_ns) for p in partitions], [(100, 101), (101, 102)])
+
+  def test_hasPageIndex(self):
+    self.assertTrue(
+        mysqltoinfluxdb._has_page_index([('PRIMARY', 'id'), ('i', 'timestamp_ns'), ('i', 'device_name'),
+                                         ('i', 'nick_name')]))
+    self.assertFalse(mysqltoinfluxdb._has_page_index([('PRIMARY', 'id'), ('i', 'timestamp_ns')]))
+    self.assertFalse(mysqltoinfluxdb._has_page_index([('i', 'device_name'), ('i', 'timestamp_ns')]))
+    self.assertFalse(mysqltoinfluxdb._has_page_index([]))
+
+  def test_checkpoint_saveAndLoad(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      path = os.path.join(temp_dir, 'checkpoint.json')
+      self.assertIsNone(mysqltoinfluxdb._Checkpoint.load(path))
+
+      partitions = mysqltoinfluxdb._partitions(100, 199, 2)
+      partitions[0].after_ns, partitions[0].after_device_name = 120, 'device 1'
+      partitions[1].done = True
+      mysqltoinfluxdb._Checkpoint(path, partitions).save()
+      checkpoint = mysqltoinfluxdb._Checkpoint.load(path)
+
+      self.assertIsNotNone(checkpoint)
+      self.assertEqual(checkpoint.partitions, partitions)  # type: ignore
+      self.assertEqual(os.listdir(temp_dir), ['checkpoint.json'])
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -12,9 +12,14 @@ setuptools.setup(
         'bleak>=0.22.2,<0.23',
         'dbus-fast>=2.24.3,<2.25',
         'influxdb-client==1.39.0',
+        'urllib3>=1.26.0,<3',
         'line_protocol_cache@git+https://github.com/XuZhen86/LineProtocolCache@c92e513',
     ],
     entry_points={
-        'console_scripts': ['govee-h5072-logger = govee_h5072_logger.main:app_run_main'],
+        'console_scripts': [
+            'govee-h5072-logger = govee_h5072_logger.main:app_run_main',
+            'govee-h5072-replay = govee_h5072_logger.replay:app_run_main',
+            'govee-h5072-export-archive = govee_h5072_logger.archiveexport:app_run_main',
+        ],
     },
 )
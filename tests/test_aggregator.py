@@ -0,0 +1,63 @@
+import time
+from unittest.mock import Mock, patch
+
+from absl.testing import absltest
+
+from govee_h5072_logger.aggregator import Aggregator
+from govee_h5072_logger.datapoint import DataPoint
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.thermometer import Thermometer
+
+
+class TestAggregator(absltest.TestCase):
+  H5072 = Thermometer('d1', '00:00:00:00:50:72', 'n1', Model.H5072)
+  H5105 = Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105)
+
+  def _add(self, aggregator: Aggregator, data_point: DataPoint, time_ns: int) -> list[str]:
+    with patch.object(time, 'time_ns', Mock(return_value=time_ns)):
+      return [p.to_line_protocol() for p in aggregator.add(data_point)]
+
+  def _flush(self, aggregator: Aggregator, time_ns: int, flush_all: bool = False) -> list[str]:
+    with patch.object(time, 'time_ns', Mock(return_value=time_ns)):
+      return [p.to_line_protocol() for p in aggregator.flush(flush_all)]
+
+  def test_sameWindow_noPoints(self):
+    aggregator = Aggregator(60)
+
+    self.assertEmpty(self._add(aggregator, DataPoint.build(self.H5072, bytes.fromhex('0103aecd39'), -75), 60 * 10**9))
+    self.assertEmpty(self._add(aggregator, DataPoint.build(self.H5072, bytes.fromhex('0103aecd39'), -75), 61 * 10**9))
+    self.assertEmpty(self._flush(aggregator, 119 * 10**9))
+
+  def test_nextWindow_flushesPreviousWindow(self):
+    aggregator = Aggregator(60)
+
+    self._add(aggregator, DataPoint.build(self.H5072, bytes.fromhex('0103aecd39'), -75), 60 * 10**9)
+    self._add(aggregator, DataPoint.build(self.H5072, bytes.fromhex('0103ddde37'), -70), 61 * 10**9)
+
+    self.assertListEqual(
+        self._add(aggregator, DataPoint.build(self.H5072, bytes.fromhex('0103aecd39'), -75), 120 * 10**9), [
+            'thermometer_aggregate,device_name=d1,model=H5072,nick_name=n1,window_seconds=60 '
+            'battery_last=55i,battery_max=57i,battery_mean=56,battery_min=55i,count=2i,'
+            'humidity_last=406i,humidity_max=406i,humidity_mean=381.5,humidity_min=357i,'
+            'rssi_last=-70i,rssi_max=-70i,rssi_mean=-72.5,rssi_min=-75i,'
+            'temperature_last=253i,temperature_max=253i,temperature_mean=247,temperature_min=241i 60000000000'
+        ])
+
+  def test_flush_endedWindowsOnly(self):
+    aggregator = Aggregator(60)
+
+    self._add(aggregator, DataPoint.build(self.H5105, bytes.fromhex('010103aecd'), -75), 60 * 10**9)
+    self._add(aggregator, DataPoint.build(self.H5072, bytes.fromhex('0103aecd39'), -75), 120 * 10**9)
+
+    self.assertListEqual(self._flush(aggregator, 121 * 10**9), [
+        'thermometer_aggregate,device_name=d2,model=H5105,nick_name=n2,window_seconds=60 count=1i,'
+        'humidity_last=357i,humidity_max=357i,humidity_mean=357,humidity_min=357i,'
+        'rssi_last=-75i,rssi_max=-75i,rssi_mean=-75,rssi_min=-75i,'
+        'temperature_last=241i,temperature_max=241i,temperature_mean=241,temperature_min=241i 60000000000'
+    ])
+    self.assertLen(self._flush(aggregator, 121 * 10**9, flush_all=True), 1)
+    self.assertEmpty(self._flush(aggregator, 121 * 10**9, flush_all=True))
+
+  @patch.object(time, 'time_ns', Mock(return_value=75 * 10**9))
+  def test_secondsUntilNextWindow(self):
+    self.assertEqual(Aggregator(60).seconds_until_next_window(), 45)
@@ -0,0 +1,162 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest.mock import patch
+
+from absl.testing import absltest, flagsaver
+
+from govee_h5072_logger.archive import ArchiveWriter, read_archive
+from govee_h5072_logger.archiveexport import export
+from govee_h5072_logger.datapoint import DataPoint
+from govee_h5072_logger.flag import RECORD_FORMAT
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.recordformat import RecordFormat
+
+# 2024-01-02T00:00:00Z.
+DAY_NS = 1_704_153_600_000_000_000
+
+
+class TestArchive(absltest.TestCase):
+  H5072 = DataPoint('d/1', 'n 1', Model.H5072, -15, 357, 57, -75)
+  H5105 = DataPoint('d2', 'n2', Model.H5105, 241, 500, None, -90)
+
+  def _writer(self, directory: str, block_size: int) -> ArchiveWriter:
+    writer = ArchiveWriter(directory, block_size)
+    writer.start()
+    self.addCleanup(writer.close)
+    return writer
+
+  def test_writeAndRead(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 2)
+      for i in range(5):
+        writer.add(self.H5072, DAY_NS + i * 1_500_000_000)
+      writer.add(self.H5105, DAY_NS + 123_456_789)
+      writer.close()
+
+      path = writer.path('d/1', DAY_NS)
+      self.assertEqual(path, os.path.join(temp_dir, 'd%2F1', '2024-01-02.gva'))
+      blocks = list(read_archive(path))
+      self.assertEqual([len(block) for block in blocks], [2, 2, 1])
+      self.assertEqual([(block.device_name, block.nick_name, block.model) for block in blocks],
+                       [('d/1', 'n 1', Model.H5072)] * 3)
+      readings = [reading for block in blocks for reading in block.data_points()]
+      self.assertEqual(readings, [(self.H5072, DAY_NS + i * 1_500_000_000) for i in range(5)])
+      self.assertEqual([r for b in read_archive(writer.path('d2', DAY_NS)) for r in b.data_points()],
+                       [(self.H5105, DAY_NS + 123_456_789)])
+
+  def test_batteryAboveSignedByte(self):
+    data_point = DataPoint('d', 'n', Model.H5072, -15, 357, 200, -75)
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 1)
+      writer.add(data_point, DAY_NS)
+      writer.close()
+
+      self.assertEqual(list(next(read_archive(writer.path('d', DAY_NS))).data_points()), [(data_point, DAY_NS)])
+
+  def test_readingsSecondsApart_twelveBytesEach(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 256)
+      for i in range(256):
+        writer.add(self.H5072, DAY_NS + i * 2_345_678_901)
+      writer.close()
+      path = writer.path('d/1', DAY_NS)
+
+      # Besides the header and the thermometer of the block.
+      self.assertBetween(os.path.getsize(path), 256 * 12, 256 * 12 + 128)
+      self.assertEqual([r[1] for b in read_archive(path) for r in b.data_points()],
+                       [DAY_NS + i * 2_345_678_901 for i in range(256)])
+
+  def test_fullBlock_writtenByWriterThread(self):
+    makedirs = os.makedirs
+    threads: list[str] = []
+
+    def record_thread(*args, **kwargs) -> None:
+      threads.append(threading.current_thread().name)
+      makedirs(*args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as temp_dir, patch.object(os, 'makedirs', record_thread):
+      writer = self._writer(temp_dir, 1)
+      writer.add(self.H5072, DAY_NS)
+      writer.close()
+
+    self.assertEqual(threads, ['ArchiveWriter'])
+
+  def test_newDay_newFile(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 100)
+      writer.add(self.H5072, DAY_NS - 1_000)
+      writer.add(self.H5072, DAY_NS)
+      writer.close()
+
+      self.assertEqual(sorted(os.listdir(os.path.join(temp_dir, 'd%2F1'))), ['2024-01-01.gva', '2024-01-02.gva'])
+
+  def test_truncatedBlock_ignored(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 1)
+      writer.add(self.H5072, DAY_NS)
+      writer.add(self.H5072, DAY_NS + 1_000)
+      writer.close()
+      path = writer.path('d/1', DAY_NS)
+      os.truncate(path, os.path.getsize(path) - 8)
+
+      with self.assertLogs(logger='absl', level='WARNING'):
+        blocks = list(read_archive(path))
+
+    self.assertLen(blocks, 1)
+
+  def test_tornBlockThenRestart_skipsTornBlock(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 2)
+      for i in range(4):
+        writer.add(self.H5072, DAY_NS + i * 1_000)
+      writer.close()
+      path = writer.path('d/1', DAY_NS)
+      os.truncate(path, os.path.getsize(path) - 8)
+
+      # A restarted logger appends after the torn block.
+      writer = self._writer(temp_dir, 1)
+      writer.add(self.H5072, DAY_NS + 5_000)
+      writer.close()
+      with self.assertLogs(logger='absl', level='WARNING'):
+        blocks = list(read_archive(path))
+
+    self.assertEqual([r[1] for b in blocks for r in b.data_points()], [DAY_NS, DAY_NS + 1_000, DAY_NS + 5_000])
+
+  @flagsaver.as_parsed((RECORD_FORMAT, RecordFormat.PER_FIELD.name))
+  def test_export_matchesToPoints(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 2)
+      for i in range(3):
+        writer.add(self.H5072, DAY_NS + i * 1_000)
+      writer.close()
+      output = io.StringIO()
+
+      n_readings = export([writer.path('d/1', DAY_NS)], output, 5)
+
+    self.assertEqual(n_readings, 3)
+    expected = [p.to_line_protocol() for i in range(3) for p in self.H5072.to_points(time_ns=DAY_NS + i * 1_000)]
+    self.assertEqual(output.getvalue(), '\n'.join(expected[:8]) + '\n' + '\n'.join(expected[8:]) + '\n')
+
+  # The exporter needs no thermometers, as each block describes its own.
+  def test_exportEntryPoint_noThermometerFlags(self):
+    with tempfile.TemporaryDirectory() as temp_dir:
+      writer = self._writer(temp_dir, 2)
+      writer.add(self.H5072, DAY_NS)
+      writer.close()
+      export_file = os.path.join(temp_dir, 'export.txt')
+
+      command = 'from govee_h5072_logger.archiveexport import app_run_main; app_run_main()'
+      args = [f'--archive_files={writer.path("d/1", DAY_NS)}', f'--export_file={export_file}']
+      subprocess.run([sys.executable, '-c', command] + args, check=True)
+
+      with open(export_file) as file:
+        self.assertEqual(file.read(),
+                         '\n'.join(p.to_line_protocol() for p in self.H5072.to_points(time_ns=DAY_NS)) + '\n')
+
+
+if __name__ == '__main__':
+  absltest.main()
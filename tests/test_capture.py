@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+from unittest.mock import Mock, patch
+
+from absl.testing import absltest
+
+from govee_h5072_logger.capture import CapturedAdvertisement, CaptureWriter, read_capture
+
+
+class TestCapture(absltest.TestCase):
+
+  def setUp(self):
+    self.tempdir = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.tempdir.name, 'capture.bin')
+    return super().setUp()
+
+  def tearDown(self) -> None:
+    self.tempdir.cleanup()
+    return super().tearDown()
+
+  @patch.object(time, 'time_ns', Mock(return_value=1_000_000))
+  def test_roundTrip(self):
+    with patch.object(time, 'monotonic_ns', Mock(return_value=100)):
+      writer = CaptureWriter(self.path)
+    with patch.object(time, 'monotonic_ns', Mock(return_value=150)):
+      writer.write('00:00:00:00:50:AB', -75, {0xec88: bytes.fromhex('0103aecd39')})
+      writer.write('00:00:00:00:51:05', -60, {1: bytes.fromhex('010103aecd'), 2: b''})
+      writer.write('00:00:00:00:51:05', -60, dict())
+    writer.close()
+
+    self.assertListEqual(list(read_capture(self.path)), [
+        CapturedAdvertisement(1_000_050, 150, '00:00:00:00:50:AB', -75, {0xec88: bytes.fromhex('0103aecd39')}),
+        CapturedAdvertisement(1_000_050, 150, '00:00:00:00:51:05', -60, {1: bytes.fromhex('010103aecd'), 2: b''}),
+        CapturedAdvertisement(1_000_050, 150, '00:00:00:00:51:05', -60, dict()),
+    ])
+
+  def test_appendSessions(self):
+    for _ in range(2):
+      writer = CaptureWriter(self.path)
+      writer.write('00:00:00:00:50:72', -75, {0xec88: bytes.fromhex('0103aecd39')})
+      writer.close()
+
+    self.assertLen(list(read_capture(self.path)), 2)
+
+  def test_notMac_notCaptured(self):
+    writer = CaptureWriter(self.path)
+    writer.write('0E5C1F31-36AD-4D1C-A3C6-9F5E8A8E4B9C', -75, {0xec88: bytes.fromhex('0103aecd39')})
+    writer.close()
+
+    self.assertEmpty(list(read_capture(self.path)))
+
+  def test_truncatedRecord_ignored(self):
+    writer = CaptureWriter(self.path)
+    writer.write('00:00:00:00:50:72', -75, {0xec88: bytes.fromhex('0103aecd39')})
+    writer.write('00:00:00:00:50:72', -75, {0xec88: bytes.fromhex('0103aecd39')})
+    writer.close()
+    os.truncate(self.path, os.path.getsize(self.path) - 1)
+
+    with self.assertLogs(logger='absl'):
+      self.assertLen(list(read_capture(self.path)), 1)
+
+  def test_tornRecordThenRestart_truncated(self):
+    writer = CaptureWriter(self.path)
+    writer.write('00:00:00:00:50:72', -75, {0xec88: bytes.fromhex('0103aecd39')})
+    writer.write('00:00:00:00:50:72', -75, {0xec88: bytes.fromhex('0103aecd39')})
+    writer.close()
+    os.truncate(self.path, os.path.getsize(self.path) - 1)
+
+    with self.assertLogs(logger='absl'):
+      writer = CaptureWriter(self.path)
+    writer.write('00:00:00:00:51:05', -60, {1: bytes.fromhex('010103aecd')})
+    writer.close()
+
+    self.assertEqual([a.device_mac for a in read_capture(self.path)], ['00:00:00:00:50:72', '00:00:00:00:51:05'])
+
+  def test_emptyFile(self):
+    open(self.path, 'wb').close()
+
+    self.assertEmpty(list(read_capture(self.path)))
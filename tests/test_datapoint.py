@@ -3,9 +3,12 @@ from decimal import Decimal
 from unittest.mock import Mock, patch
 
 from absl.testing import absltest
+from influxdb_client import Point
 
-from govee_h5072_logger.datapoint import DataPoint
+from govee_h5072_logger.datapoint import DataPoint, build_lines
+from govee_h5072_logger.decoder import InvalidEncodedDataError
 from govee_h5072_logger.model import Model
+from govee_h5072_logger.recordformat import RecordFormat
 from govee_h5072_logger.thermometer import Thermometer
 
 
@@ -18,14 +21,14 @@ class TestDataPoint(absltest.TestCase):
   def test_h5072_positiveTemperature(self):
     self.assertEqual(
         DataPoint.build(self.H5072, bytes.fromhex('0103aecd39'), self.RSSI),
-        DataPoint(self.H5072.device_name, self.H5072.nick_name, self.H5072.model, Decimal('24.1'), Decimal('35.7'),
+        DataPoint(self.H5072.device_name, self.H5072.nick_name, self.H5072.model, 241, 357,
                   self.BATTERY_PERCENT, self.RSSI),
     )
 
   def test_h5072_negativeTemperature(self):
     self.assertEqual(
         DataPoint.build(self.H5072, bytes.fromhex('0183aecd39'), self.RSSI),
-        DataPoint(self.H5072.device_name, self.H5072.nick_name, self.H5072.model, Decimal('-24.1'), Decimal('35.7'),
+        DataPoint(self.H5072.device_name, self.H5072.nick_name, self.H5072.model, -241, 357,
                   self.BATTERY_PERCENT, self.RSSI),
     )
 
@@ -40,6 +43,16 @@ class TestDataPoint(absltest.TestCase):
         'thermometer,device_name=d,model=H5072,nick_name=n,scale_factor=1,unit=dBm rssi=-75i 69420',
     ])
 
+  def test_h5072_decimalViews(self):
+    data_point = DataPoint.build(self.H5072, bytes.fromhex('0183aecd39'), self.RSSI)
+
+    self.assertEqual(data_point.temperature_c, Decimal('-24.1'))
+    self.assertEqual(data_point.humidity_percent, Decimal('35.7'))
+
+  def test_h5072_tooShort(self):
+    with self.assertRaises(ValueError):
+      DataPoint.build(self.H5072, bytes.fromhex('0103aecd'), self.RSSI)
+
   def test_h5072_100Humidity(self):
     with self.assertRaises(ValueError):
       DataPoint.build(self.H5072, bytes.fromhex('01ffffff39'), self.RSSI)
@@ -47,14 +60,14 @@ class TestDataPoint(absltest.TestCase):
   def test_h5105_positiveTemperature(self):
     self.assertEqual(
         DataPoint.build(self.H5105, bytes.fromhex('010103aecd'), self.RSSI),
-        DataPoint(self.H5105.device_name, self.H5105.nick_name, self.H5105.model, Decimal('24.1'), Decimal('35.7'),
+        DataPoint(self.H5105.device_name, self.H5105.nick_name, self.H5105.model, 241, 357,
                   None, self.RSSI),
     )
 
   def test_h5105_negativeTemperature(self):
     self.assertEqual(
         DataPoint.build(self.H5105, bytes.fromhex('010183aecd'), self.RSSI),
-        DataPoint(self.H5105.device_name, self.H5105.nick_name, self.H5105.model, Decimal('-24.1'), Decimal('35.7'),
+        DataPoint(self.H5105.device_name, self.H5105.nick_name, self.H5105.model, -241, 357,
                   None, self.RSSI),
     )
 
@@ -71,3 +84,74 @@ class TestDataPoint(absltest.TestCase):
         'thermometer,device_name=d,model=H5105,nick_name=n,scale_factor=10,unit=%RH humidity=357i 69420',
         'thermometer,device_name=d,model=H5105,nick_name=n,scale_factor=1,unit=dBm rssi=-75i 69420',
     ])
+
+  @patch.object(time, 'time_ns', Mock(return_value=69420))
+  def test_toPoints_escapesTagsLikePoint(self):
+    thermometer = Thermometer('d 1', '00:00:00:00:50:72', 'a,b=c', Model.H5072)
+    data_point = DataPoint.build(thermometer, bytes.fromhex('0103aecd39'), self.RSSI)
+
+    expected = []
+    for name, scale_factor, unit, value in data_point.fields():
+      point = Point('thermometer').tag('device_name', thermometer.device_name).tag('nick_name', thermometer.nick_name)
+      point.tag('model', thermometer.model.name).tag('scale_factor', scale_factor).tag('unit', unit)
+      expected.append(point.field(name, value).time(69420).to_line_protocol())  # type: ignore
+
+    self.assertListEqual([p.to_line_protocol() for p in data_point.to_points()], expected)
+
+  @patch.object(time, 'time_ns', Mock(return_value=69420))
+  def test_toPoints_prefixesPerThermometer(self):
+    DataPoint.build(self.H5072, bytes.fromhex('0183aecd39'), self.RSSI).to_points()
+    points = DataPoint.build(Thermometer('e', '00:00:00:00:50:73', 'm', Model.H5072), bytes.fromhex('0183aecd39'),
+                             self.RSSI).to_points()
+
+    self.assertEqual(
+        points[0].to_line_protocol(),
+        'thermometer,device_name=e,model=H5072,nick_name=m,scale_factor=10,unit=°C temperature=-241i 69420')
+
+  @patch.object(time, 'time_ns', Mock(return_value=69420))
+  def test_h5072_toPoints_multiField(self):
+    points = DataPoint.build(self.H5072, bytes.fromhex('0183aecd39'), self.RSSI).to_points(RecordFormat.MULTI_FIELD)
+
+    self.assertListEqual([p.to_line_protocol() for p in points], [
+        'thermometer,device_name=d,model=H5072,nick_name=n battery=57i,humidity=357i,rssi=-75i,temperature=-241i 69420',
+    ])
+
+  @patch.object(time, 'time_ns', Mock(return_value=69420))
+  def test_h5105_toPoints_multiField(self):
+    points = DataPoint.build(self.H5105, bytes.fromhex('010183aecd'), self.RSSI).to_points(RecordFormat.MULTI_FIELD)
+
+    self.assertListEqual([p.to_line_protocol() for p in points], [
+        'thermometer,device_name=d,model=H5105,nick_name=n humidity=357i,rssi=-75i,temperature=-241i 69420',
+    ])
+
+  @patch.object(time, 'time_ns', Mock(return_value=69420))
+  def test_toPoints_adapterTag(self):
+    points = DataPoint.build(self.H5105, bytes.fromhex('010183aecd'), self.RSSI, 'hci1').to_points()
+
+    self.assertEqual(points[0].to_line_protocol(),
+                     'thermometer,adapter=hci1,device_name=d,model=H5105,nick_name=n,scale_factor=10,unit=°C '
+                     'temperature=-241i 69420')
+
+  def test_buildLines_matchesToPoints(self):
+    for thermometer, payloads in ((self.H5072, ['0183aecd39', '01ffffff39', '0103aecd00']),
+                                  (self.H5105, ['010103aecd', '0101ffffff', '010183aecd'])):
+      for record_format in RecordFormat:
+        for adapter in (None, 'hci1'):
+          rssi, time_ns = [-75, -80, -85], [1000, 2000, 3000]
+          expected: list[str] = []
+          for payload, r, t in zip(payloads, rssi, time_ns):
+            try:
+              data_point = DataPoint.build(thermometer, bytes.fromhex(payload), r, adapter)
+            except InvalidEncodedDataError:
+              continue
+            expected.extend(p.to_line_protocol() for p in data_point.to_points(record_format, t))
+
+          lines, n_invalid = build_lines(thermometer, bytes.fromhex(''.join(payloads)), 5, rssi, time_ns,
+                                         record_format, adapter)
+
+          self.assertListEqual(lines, expected)
+          self.assertEqual(n_invalid, 1)
+
+  def test_buildLines_lengthMismatch(self):
+    with self.assertRaises(ValueError):
+      build_lines(self.H5072, bytes.fromhex('0183aecd39'), 5, [-75, -75], [1000])
@@ -0,0 +1,51 @@
+from absl.testing import absltest
+
+from govee_h5072_logger.decoder import DECODERS, InvalidEncodedDataError
+from govee_h5072_logger.model import Model
+
+
+class TestDecoder(absltest.TestCase):
+
+  def test_allModelsHaveDecoder(self):
+    self.assertCountEqual(DECODERS.keys(), list(Model))
+
+  def test_h5072(self):
+    self.assertEqual(DECODERS[Model.H5072].decode(bytes.fromhex('0183aecd39')), (-241, 357, 57))
+
+  def test_h5105(self):
+    self.assertEqual(DECODERS[Model.H5105].decode(bytes.fromhex('010103aecd')), (241, 357, None))
+
+  def test_h5105_tooShort(self):
+    with self.assertRaises(ValueError):
+      DECODERS[Model.H5105].decode(bytes.fromhex('010103ae'))
+
+  def test_h5072_invalidEncodedData(self):
+    with self.assertRaises(InvalidEncodedDataError):
+      DECODERS[Model.H5072].decode(bytes.fromhex('01ffffff39'))
+
+  def test_decodeBatch_matchesDecode(self):
+    for model, payloads in ((Model.H5072, ['0183aecd39', '01ffffff39', '0103aecd00']),
+                            (Model.H5105, ['010103aecd', '0101ffffff', '010183aecd'])):
+      decoder = DECODERS[model]
+      # Padded to 6 bytes per record.
+      buffer = b''.join(bytes.fromhex(p) + b'\xee' for p in payloads)
+      expected = []
+      for payload in payloads:
+        try:
+          expected.append(decoder.decode(bytes.fromhex(payload)))
+        except InvalidEncodedDataError:
+          expected.append(None)
+
+      self.assertEqual(decoder.decode_batch(buffer, 6), expected)
+
+  def test_decodeBatch_recordsTooShort(self):
+    with self.assertRaises(ValueError):
+      DECODERS[Model.H5072].decode_batch(bytes.fromhex('0103aecd0103aecd'), 4)
+
+  def test_decodeBatch_partialRecord(self):
+    with self.assertRaises(ValueError):
+      DECODERS[Model.H5105].decode_batch(bytes.fromhex('010103aecd0101'), 5)
+
+  def test_valueSlice(self):
+    self.assertEqual(bytes.fromhex('0103aecd39')[DECODERS[Model.H5072].value_slice], bytes.fromhex('03aecd39'))
+    self.assertEqual(bytes.fromhex('010103aecd')[DECODERS[Model.H5105].value_slice], bytes.fromhex('03aecd'))
@@ -0,0 +1,60 @@
+import time
+from unittest.mock import Mock, patch
+
+from absl.testing import absltest
+
+from govee_h5072_logger.deduplicator import Deduplicator
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.thermometer import Thermometer
+
+
+class TestDeduplicator(absltest.TestCase):
+  H5072 = Thermometer('d1', '00:00:00:00:50:72', 'n1', Model.H5072)
+  H5105 = Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105)
+  BYTE_DATA = bytes.fromhex('0103aecd39')
+
+  def test_disabled_neverDuplicate(self):
+    deduplicator = Deduplicator()
+
+    self.assertFalse(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+    self.assertFalse(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+    self.assertEqual(deduplicator.counters['accepted'], 0)
+
+  def test_window_dropsRepeats(self):
+    deduplicator = Deduplicator(window_ms=1000)
+
+    with patch.object(time, 'monotonic_ns', Mock(return_value=0)):
+      self.assertFalse(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+    with patch.object(time, 'monotonic_ns', Mock(return_value=999_999_999)):
+      self.assertTrue(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+    with patch.object(time, 'monotonic_ns', Mock(return_value=1_000_000_000)):
+      self.assertFalse(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+
+    self.assertEqual(deduplicator.counters, {'accepted': 2, 'repeated': 1})
+
+  @patch.object(time, 'monotonic_ns', Mock(return_value=0))
+  def test_window_acceptsChangedPayload(self):
+    deduplicator = Deduplicator(window_ms=1000)
+
+    self.assertFalse(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+    self.assertFalse(deduplicator.is_duplicate(self.H5072, bytes.fromhex('0103aece39')))
+
+  @patch.object(time, 'monotonic_ns', Mock(return_value=0))
+  def test_window_perDevice(self):
+    deduplicator = Deduplicator(window_ms=1000)
+
+    self.assertFalse(deduplicator.is_duplicate(self.H5072, self.BYTE_DATA))
+    self.assertFalse(deduplicator.is_duplicate(self.H5105, self.BYTE_DATA))
+
+  def test_heartbeat_dropsUnchangedValues(self):
+    deduplicator = Deduplicator(heartbeat_seconds=60)
+
+    with patch.object(time, 'monotonic_ns', Mock(return_value=0)):
+      self.assertFalse(deduplicator.is_duplicate(self.H5105, bytes.fromhex('010103aecd')))
+    with patch.object(time, 'monotonic_ns', Mock(return_value=59_000_000_000)):
+      self.assertTrue(deduplicator.is_duplicate(self.H5105, bytes.fromhex('020103aecd')))
+      self.assertFalse(deduplicator.is_duplicate(self.H5105, bytes.fromhex('010103aece')))
+    with patch.object(time, 'monotonic_ns', Mock(return_value=119_000_000_000)):
+      self.assertFalse(deduplicator.is_duplicate(self.H5105, bytes.fromhex('010103aece')))
+
+    self.assertEqual(deduplicator.counters, {'accepted': 3, 'unchanged': 1})
@@ -0,0 +1,62 @@
+import asyncio
+
+from absl.testing import absltest
+
+from govee_h5072_logger.httpserver import HttpServer
+
+
+class TestHttpServer(absltest.TestCase):
+
+  def _get(self, request: bytes) -> bytes:
+
+    def echo(query: dict[str, list[str]]) -> tuple[str, bytes]:
+      if 'fail' in query:
+        raise ValueError('Bad query.')
+      return 'text/plain', repr(sorted(query.items())).encode()
+
+    async def run() -> bytes:
+      server = HttpServer('127.0.0.1', 0, {'/echo': echo})
+      await server.start()
+      try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+        writer.write(request)
+        response = await reader.read()
+        writer.close()
+        return response
+      finally:
+        await server.close()
+
+    return asyncio.run(run())
+
+  def test_get(self):
+    response = self._get(b'GET /echo?a=1&a=2 HTTP/1.1\r\nHost: localhost\r\n\r\n')
+
+    self.assertStartsWith(response, b'HTTP/1.0 200 OK\r\n')
+    self.assertIn(b'Content-Length: 19\r\n', response)
+    self.assertEndsWith(response, b"\r\n\r\n[('a', ['1', '2'])]")
+
+  def test_unknownPath_notFound(self):
+    self.assertStartsWith(self._get(b'GET /other HTTP/1.1\r\n\r\n'), b'HTTP/1.0 404 Not Found\r\n')
+
+  def test_post_notAllowed(self):
+    self.assertStartsWith(self._get(b'POST /echo HTTP/1.1\r\n\r\n'), b'HTTP/1.0 405 Method Not Allowed\r\n')
+
+  def test_handlerValueError_badRequest(self):
+    response = self._get(b'GET /echo?fail=1 HTTP/1.1\r\n\r\n')
+
+    self.assertStartsWith(response, b'HTTP/1.0 400 Bad Request\r\n')
+    self.assertEndsWith(response, b'Bad query.\n')
+
+  def test_lineTooLong_badRequest(self):
+    response = self._get(b'GET /echo?a=' + b'1' * 100_000 + b' HTTP/1.1\r\n\r\n')
+
+    self.assertStartsWith(response, b'HTTP/1.0 400 Bad Request\r\n')
+
+  def test_headerTooLong_badRequest(self):
+    response = self._get(b'GET /echo HTTP/1.1\r\nCookie: ' + b'1' * 100_000 + b'\r\n\r\n')
+
+    self.assertStartsWith(response, b'HTTP/1.0 400 Bad Request\r\n')
+
+
+if __name__ == '__main__':
+  absltest.main()
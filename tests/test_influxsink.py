@@ -0,0 +1,189 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+from absl.testing import absltest
+from influxdb_client import Point
+from line_protocol_cache.lineprotocolcache import LineProtocolCache
+
+from govee_h5072_logger.influxsink import InfluxSink
+
+
+# Stands in for the InfluxDB v2 write endpoint, recording each request.
+class _WriteHandler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+
+  def do_POST(self) -> None:
+    server = self.server
+    assert isinstance(server, _InfluxServer)
+    body = self.rfile.read(int(self.headers['Content-Length']))
+    server.requests.append((self.path, dict(self.headers), gzip.decompress(body).decode(), self.client_address))
+
+    status = server.statuses.pop(0) if server.statuses else 204
+    self.send_response(status)
+    self.send_header('Content-Length', '0')
+    self.end_headers()
+
+  def log_message(self, *args) -> None:
+    pass
+
+
+class _InfluxServer(ThreadingHTTPServer):
+  def __init__(self) -> None:
+    super().__init__(('127.0.0.1', 0), _WriteHandler)
+    self.requests: list[tuple[str, dict[str, str], str, tuple[str, int]]] = []
+    # Statuses of the next responses, 204 once used up.
+    self.statuses: list[int] = []
+
+
+class TestInfluxSink(absltest.TestCase):
+  POINTS = [Point('m').tag('t', i).field('f', i).time(i) for i in range(4)]
+
+  def setUp(self):
+    super().setUp()
+    self.server = _InfluxServer()
+    threading.Thread(target=self.server.serve_forever).start()
+    self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.server.server_close()
+    super().tearDown()
+
+  def _sink(self, batch_size: int = 100, max_backlog: int = 100, retry_seconds: float = 0) -> InfluxSink:
+    return InfluxSink(self.url, 'org', 'bucket', 'token', batch_size, 60, max_backlog, retry_seconds)
+
+  def _lines(self, points: list[Point]) -> str:
+    return '\n'.join(point.to_line_protocol() for point in points)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_close_writesGzippedBatch(self):
+    sink = self._sink()
+    sink.start()
+    sink.put(self.POINTS[:2])
+    sink.put(self.POINTS[2:])
+    sink.close()
+
+    self.assertLen(self.server.requests, 1)
+    path, headers, lines, _ = self.server.requests[0]
+    self.assertEqual(path, '/api/v2/write?org=org&bucket=bucket&precision=ns')
+    self.assertEqual(headers['Authorization'], 'Token token')
+    self.assertEqual(headers['Content-Encoding'], 'gzip')
+    self.assertEqual(lines, self._lines(self.POINTS))
+    self.assertEqual(sink.written, 4)
+    LineProtocolCache.put.assert_not_called()
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_batchSize_splitsBatchesOnOneConnection(self):
+    sink = self._sink(batch_size=3)
+    sink.put(self.POINTS)
+    sink.start()
+    sink.close()
+
+    self.assertEqual([r[2] for r in self.server.requests], [self._lines(self.POINTS[:3]), self._lines(self.POINTS[3:])])
+    self.assertLen({r[3] for r in self.server.requests}, 1)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_writeFails_spillsToCache(self):
+    self.server.statuses = [500]
+    sink = self._sink(batch_size=2)
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl'):
+      sink.start()
+      sink.close()
+
+    LineProtocolCache.put.assert_called_once_with(self.POINTS[:2])
+    self.assertEqual(self.server.requests[-1][2], self._lines(self.POINTS[2:]))
+    self.assertEqual((sink.written, sink.spilled, sink.failed_writes), (2, 2, 1))
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_writeFails_spillsUntilRetry(self):
+    self.server.statuses = [503]
+    sink = self._sink(batch_size=2, retry_seconds=60)
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl'):
+      sink.start()
+      sink.close()
+
+    self.assertLen(self.server.requests, 1)
+    self.assertEqual([c.args[0] for c in LineProtocolCache.put.call_args_list], [self.POINTS[:2], self.POINTS[2:]])
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_writeRejected_dropsWithoutRetry(self):
+    self.server.statuses = [400]
+    sink = self._sink(batch_size=2, retry_seconds=60)
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl', level='ERROR'):
+      sink.start()
+      sink.close()
+
+    LineProtocolCache.put.assert_not_called()
+    self.assertEqual(self.server.requests[-1][2], self._lines(self.POINTS[2:]))
+    self.assertEqual((sink.written, sink.rejected, sink.failed_writes), (2, 2, 0))
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_unauthorized_spillsUntilRetry(self):
+    self.server.statuses = [401]
+    sink = self._sink(batch_size=2, retry_seconds=60)
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl'):
+      sink.start()
+      sink.close()
+
+    self.assertLen(self.server.requests, 1)
+    self.assertEqual([c.args[0] for c in LineProtocolCache.put.call_args_list], [self.POINTS[:2], self.POINTS[2:]])
+    self.assertEqual((sink.rejected, sink.spilled, sink.failed_writes), (0, 4, 1))
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_bucketNotFound_spillsToCache(self):
+    self.server.statuses = [404]
+    sink = self._sink(batch_size=2)
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl'):
+      sink.start()
+      sink.close()
+
+    LineProtocolCache.put.assert_called_once_with(self.POINTS[:2])
+    self.assertEqual((sink.written, sink.rejected, sink.spilled, sink.failed_writes), (2, 0, 2, 1))
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_tooManyRequests_spillsToCache(self):
+    self.server.statuses = [429]
+    sink = self._sink()
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl'):
+      sink.start()
+      sink.close()
+
+    LineProtocolCache.put.assert_called_once_with(self.POINTS)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_serverDown_spillsToCache(self):
+    self.server.shutdown()
+    self.server.server_close()
+    sink = self._sink()
+    sink.put(self.POINTS)
+    with self.assertLogs(logger='absl'):
+      sink.start()
+      sink.close()
+
+    LineProtocolCache.put.assert_called_once_with(self.POINTS)
+    self.assertEqual(sink.failed_writes, 1)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_maxBacklog_spillsToCache(self):
+    sink = self._sink(max_backlog=3)
+    sink.put(self.POINTS[:2])
+    sink.put(self.POINTS[2:])
+
+    self.assertEqual(sink.backlog, 2)
+    LineProtocolCache.put.assert_called_once_with(self.POINTS[2:])
+
+    sink.start()
+    sink.close()
+    self.assertEqual(self.server.requests[0][2], self._lines(self.POINTS[:2]))
+
+
+if __name__ == '__main__':
+  absltest.main()
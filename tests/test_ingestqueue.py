@@ -0,0 +1,98 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from absl.testing import absltest
+from influxdb_client import Point
+from line_protocol_cache.lineprotocolcache import LineProtocolCache
+
+from govee_h5072_logger.ingestqueue import IngestQueue
+from govee_h5072_logger.overflowpolicy import OverflowPolicy
+
+
+class TestIngestQueue(absltest.TestCase):
+  POINTS = [Point('m').tag('t', i).field('f', i) for i in range(4)]
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_close_drainsQueue(self):
+    ingest_queue = IngestQueue(100, OverflowPolicy.DROP_OLDEST, 100, 60)
+    ingest_queue.start()
+    ingest_queue.put(self.POINTS[:2])
+    ingest_queue.put(self.POINTS[2:])
+    ingest_queue.close()
+
+    LineProtocolCache.put.assert_called_once_with(self.POINTS)
+    self.assertEqual(ingest_queue.depth, 0)
+    self.assertEqual(ingest_queue.flushes, 1)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_batchSize_splitsBatches(self):
+    ingest_queue = IngestQueue(100, OverflowPolicy.DROP_OLDEST, 3, 60)
+    ingest_queue.put(self.POINTS)
+    ingest_queue.start()
+    ingest_queue.close()
+
+    self.assertListEqual([c.args[0] for c in LineProtocolCache.put.call_args_list],
+                         [self.POINTS[:3], self.POINTS[3:]])
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_dropOldest(self):
+    ingest_queue = IngestQueue(3, OverflowPolicy.DROP_OLDEST, 3, 60)
+    ingest_queue.put(self.POINTS)
+
+    self.assertEqual(ingest_queue.depth, 3)
+    self.assertEqual(ingest_queue.dropped, 1)
+
+    ingest_queue.start()
+    ingest_queue.close()
+    LineProtocolCache.put.assert_called_once_with(self.POINTS[1:])
+
+  def test_block_waitsForWriter(self):
+    put_called = threading.Event()
+    release_put = threading.Event()
+
+    def put(points: list[Point]) -> None:
+      put_called.set()
+      release_put.wait()
+
+    with patch.object(LineProtocolCache, 'put', Mock(side_effect=put)):
+      ingest_queue = IngestQueue(2, OverflowPolicy.BLOCK, 2, 60)
+      ingest_queue.put(self.POINTS[:2])
+      ingest_queue.start()
+      put_called.wait()
+
+      # The writer is holding the first batch, so this put does not need to wait.
+      ingest_queue.put(self.POINTS[2:])
+      producer = threading.Thread(target=ingest_queue.put, args=(self.POINTS[:1],))
+      producer.start()
+      producer.join(timeout=0.1)
+      self.assertTrue(producer.is_alive())
+
+      release_put.set()
+      producer.join()
+      ingest_queue.close()
+
+    self.assertEqual(ingest_queue.dropped, 0)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_emptyQueue_waitsWithoutSpinning(self):
+    ingest_queue = IngestQueue(100, OverflowPolicy.DROP_OLDEST, 100, 0)
+    take_batch = ingest_queue._take_batch = Mock(wraps=ingest_queue._take_batch)
+    ingest_queue.start()
+    time.sleep(0.05)
+
+    self.assertEqual(take_batch.call_count, 1)
+    ingest_queue.put(self.POINTS)
+    ingest_queue.close()
+    LineProtocolCache.put.assert_called_once_with(self.POINTS)
+
+  @patch.object(LineProtocolCache, 'put', Mock(side_effect=OSError('disk full')))
+  def test_putError_logsAndContinues(self):
+    ingest_queue = IngestQueue(100, OverflowPolicy.DROP_OLDEST, 2, 60)
+    ingest_queue.put(self.POINTS)
+    with self.assertLogs(logger='absl') as logs:
+      ingest_queue.start()
+      ingest_queue.close()
+
+    self.assertLen(logs.records, 2)
+    self.assertEqual(ingest_queue.flushes, 2)
@@ -0,0 +1,45 @@
+from absl.testing import absltest
+
+from govee_h5072_logger.latency import LatencyTracker
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.thermometer import Thermometer
+
+
+class TestLatencyTracker(absltest.TestCase):
+  H5072 = Thermometer('d 1', '00:00:00:00:50:72', 'n,1', Model.H5072)
+  H5105 = Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105)
+
+  def test_firstReading_noPoint(self):
+    self.assertEqual(LatencyTracker().add(self.H5072, 1_000), [])
+
+  def test_nextReading_timestampedAtPreviousReading(self):
+    tracker = LatencyTracker()
+    tracker.add(self.H5072, 1_000)
+
+    points = tracker.add(self.H5072, 3_500)
+
+    self.assertEqual([p.to_line_protocol() for p in points],
+                     ['latency,device_name=d\\ 1,nick_name=n\\,1 latency_ns=2500i 1000'])
+
+  def test_thermometers_trackedSeparately(self):
+    tracker = LatencyTracker()
+    tracker.add(self.H5072, 1_000)
+    tracker.add(self.H5105, 2_000)
+
+    self.assertEqual([p.to_line_protocol() for p in tracker.add(self.H5072, 4_000)],
+                     ['latency,device_name=d\\ 1,nick_name=n\\,1 latency_ns=3000i 1000'])
+    self.assertEqual([p.to_line_protocol() for p in tracker.add(self.H5105, 2_500)],
+                     ['latency,device_name=d2,nick_name=n2 latency_ns=500i 2000'])
+
+  def test_outOfOrderReading_ignored(self):
+    tracker = LatencyTracker()
+    tracker.add(self.H5072, 2_000)
+
+    self.assertEqual(tracker.add(self.H5072, 2_000), [])
+    self.assertEqual(tracker.add(self.H5072, 1_000), [])
+    self.assertEqual([p.to_line_protocol() for p in tracker.add(self.H5072, 3_000)],
+                     ['latency,device_name=d\\ 1,nick_name=n\\,1 latency_ns=1000i 2000'])
+
+
+if __name__ == '__main__':
+  absltest.main()
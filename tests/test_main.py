@@ -1,5 +1,8 @@
+import asyncio
+import inspect
+import json
 from types import SimpleNamespace
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 from absl import logging
 from absl.logging.converter import absl_to_standard
@@ -9,11 +12,19 @@ from bleak.backends.scanner import AdvertisementData
 from influxdb_client import Point
 from line_protocol_cache.lineprotocolcache import LineProtocolCache
 
+from govee_h5072_logger import main
 from govee_h5072_logger.datapoint import DataPoint
-from govee_h5072_logger.flag import DEVICE_MACS, DEVICE_NAMES, MODELS, NICK_NAMES
-from govee_h5072_logger.main import detection_callback
+from govee_h5072_logger.flag import (DEVICE_MACS, DEVICE_NAMES, MODELS, NICK_NAMES, SCAN_INTERVAL_SECONDS,
+                                     SCAN_WINDOW_SECONDS)
+from govee_h5072_logger.main import (ADVERTISEMENT_COUNTERS, PARSE_ERROR_COUNTERS, _metrics, _readings,
+                                     detection_callback)
 from govee_h5072_logger.model import Model
-from govee_h5072_logger.thermometer import Thermometer
+from govee_h5072_logger.recentreadings import RecentReadings
+from govee_h5072_logger.thermometer import Thermometer, register_flags_validator
+
+
+def setUpModule():
+  register_flags_validator()
 
 
 class TestMain(absltest.TestCase):
@@ -43,9 +54,12 @@ class TestMain(absltest.TestCase):
 
   @patch.object(LineProtocolCache, 'put', Mock())
   def test_unknownDeviceMac_noPoints(self):
+    rejected = ADVERTISEMENT_COUNTERS['rejected']
+
     detection_callback(self.BLE_DEVICE_UNKNOWN_MAC, self.AD_DATA)
 
     LineProtocolCache.put.assert_not_called()
+    self.assertEqual(ADVERTISEMENT_COUNTERS['rejected'], rejected + 1)
 
   @patch.object(LineProtocolCache, 'put', Mock())
   @patch.object(DataPoint, 'build', Mock(side_effect=ValueError('error-message')))
@@ -62,3 +76,66 @@ class TestMain(absltest.TestCase):
     detection_callback(self.BLE_DEVICE, self.AD_DATA)
 
     LineProtocolCache.put.assert_called_once_with(self.POINTS)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_invalidEncodedData_counted(self):
+    invalid_encoded_data = PARSE_ERROR_COUNTERS['invalid_encoded_data']
+    ad_data = AdvertisementData('local-name', {0xec88: bytes.fromhex('01ffffff39')}, dict(), [], None, self.RSSI, ())
+
+    with self.assertLogs(logger='absl', level=absl_to_standard(logging.ERROR)):
+      detection_callback(self.BLE_DEVICE, ad_data)
+
+    self.assertEqual(PARSE_ERROR_COUNTERS['invalid_encoded_data'], invalid_encoded_data + 1)
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  def test_metrics_reportsReadings(self):
+    ad_data = AdvertisementData('local-name', {0xec88: bytes.fromhex('0103aecd39')}, dict(), [], None, self.RSSI, ())
+    detection_callback(self.BLE_DEVICE, ad_data)
+
+    content_type, body = _metrics(dict())
+
+    self.assertStartsWith(content_type, 'text/plain; version=0.0.4')
+    self.assertRegex(body.decode(), r'govee_h5072_logger_readings_total\{device_name="d1",nick_name="n1"\} [1-9]')
+    self.assertIn('govee_h5072_logger_last_reading_age_seconds{device_name="d1",nick_name="n1"} ', body.decode())
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  @patch.object(main, '_RECENT_READINGS', RecentReadings(10))
+  def test_readings_servesRecentReadings(self):
+    ad_data = AdvertisementData('local-name', {0xec88: bytes.fromhex('0103aecd39')}, dict(), [], None, self.RSSI, ())
+    detection_callback(self.BLE_DEVICE, ad_data)
+
+    content_type, body = _readings({'device_name': ['d1'], 'minutes': ['1']})
+
+    self.assertEqual(content_type, 'application/json')
+    readings = json.loads(body)
+    self.assertEqual(readings['nick_name'], 'n1')
+    self.assertEqual([(r['temperature_c'], r['humidity_percent']) for r in readings['readings']], [(24.1, 35.7)])
+    with self.assertRaises(ValueError):
+      _readings(dict())
+
+  @patch.object(LineProtocolCache, 'put', Mock())
+  @patch.object(main, '_RECENT_READINGS', RecentReadings(10))
+  def test_readings_batteryAboveSignedByte(self):
+    ad_data = AdvertisementData('local-name', {0xec88: bytes.fromhex('0103aecd80')}, dict(), [], None, self.RSSI, ())
+    detection_callback(self.BLE_DEVICE, ad_data)
+
+    LineProtocolCache.put.assert_called()
+    self.assertEqual(json.loads(_readings({'device_name': ['d1']})[1])['readings'][-1]['battery_percent'], 128)
+
+  @flagsaver.as_parsed((SCAN_INTERVAL_SECONDS, '1'), (SCAN_WINDOW_SECONDS, '0.5'))
+  def test_scanScheduler_scannerFails_stopsRunning(self):
+    scanner = Mock(start=AsyncMock(side_effect=RuntimeError('Adapter busy.')), stop=AsyncMock())
+
+    async def run() -> None:
+      stop_running = asyncio.Event()
+      async with main._scan_scheduler([scanner], stop_running):
+        await asyncio.wait_for(stop_running.wait(), 1)
+
+    with self.assertLogs(logger='absl'):
+      with self.assertRaises(RuntimeError):
+        asyncio.run(run())
+    self.assertIsNone(main._SCAN_SCHEDULER)
+
+  def test_detectionCallback_twoParameters(self):
+    # BleakScanner rejects callbacks that do not take exactly 2 parameters.
+    self.assertLen(inspect.signature(detection_callback).parameters, 2)
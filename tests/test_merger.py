@@ -0,0 +1,63 @@
+import asyncio
+from unittest.mock import Mock, call
+
+from absl.testing import absltest
+
+from govee_h5072_logger.merger import AdvertisementMerger
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.thermometer import Thermometer
+
+
+class TestAdvertisementMerger(absltest.TestCase):
+  H5072 = Thermometer('d1', '00:00:00:00:50:72', 'n1', Model.H5072)
+  H5105 = Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105)
+  BYTE_DATA = bytes.fromhex('0103aecd39')
+
+  def test_sameAdvertisement_keepsBestRssi(self):
+    emit = Mock()
+
+    async def run() -> AdvertisementMerger:
+      merger = AdvertisementMerger(0.01, emit)
+      merger.add(self.H5072, self.BYTE_DATA, -80, 'hci0', None)
+      merger.add(self.H5072, self.BYTE_DATA, -60, 'hci1', None)
+      merger.add(self.H5072, self.BYTE_DATA, -70, 'hci2', None)
+      emit.assert_not_called()
+      await asyncio.sleep(0.05)
+      return merger
+
+    merger = asyncio.run(run())
+
+    emit.assert_called_once_with(self.H5072, self.BYTE_DATA, -60, 'hci1', None)
+    self.assertEqual(merger.merged, 2)
+
+  def test_newAdvertisement_releasesHeldOne(self):
+    emit = Mock()
+
+    async def run() -> None:
+      merger = AdvertisementMerger(60, emit)
+      merger.add(self.H5072, self.BYTE_DATA, -80, 'hci0', 1)
+      merger.add(self.H5072, bytes.fromhex('0103aece39'), -80, 'hci0', 2)
+      emit.assert_called_once_with(self.H5072, self.BYTE_DATA, -80, 'hci0', 1)
+      merger.flush()
+
+    asyncio.run(run())
+
+    self.assertEqual(emit.call_count, 2)
+
+  def test_flush_releasesAllDevices(self):
+    emit = Mock()
+
+    async def run() -> None:
+      merger = AdvertisementMerger(60, emit)
+      merger.add(self.H5072, self.BYTE_DATA, -80, 'hci0', None)
+      merger.add(self.H5105, self.BYTE_DATA, -70, 'hci1', None)
+      merger.flush()
+      merger.flush()
+
+    asyncio.run(run())
+
+    emit.assert_has_calls([
+        call(self.H5072, self.BYTE_DATA, -80, 'hci0', None),
+        call(self.H5105, self.BYTE_DATA, -70, 'hci1', None),
+    ])
+    self.assertEqual(emit.call_count, 2)
@@ -0,0 +1,52 @@
+from absl.testing import absltest
+
+from govee_h5072_logger.metrics import DurationHistogram, Exposition
+
+
+class TestMetrics(absltest.TestCase):
+
+  def test_histogram_observe(self):
+    histogram = DurationHistogram()
+
+    histogram.observe(1_000)
+    histogram.observe(1_001)
+    histogram.observe(10**10)
+
+    self.assertEqual(histogram.counts[:3], [1, 1, 0])
+    self.assertEqual(histogram.counts[-1], 1)
+    self.assertEqual(histogram.count, 3)
+    self.assertEqual(histogram.sum_ns, 10**10 + 2_001)
+
+  def test_exposition_counterAndGauge(self):
+    exposition = Exposition('p_')
+    exposition.counter('readings', 'Readings.', [((('device_name', 'd"1\\'),), 3)])
+    exposition.gauge('depth', 'Depth.', [((), 1.5)])
+
+    self.assertEqual(
+        exposition.render().decode(), '# HELP p_readings_total Readings.\n'
+        '# TYPE p_readings_total counter\n'
+        'p_readings_total{device_name="d\\"1\\\\"} 3\n'
+        '# HELP p_depth Depth.\n'
+        '# TYPE p_depth gauge\n'
+        'p_depth 1.5\n')
+
+  def test_exposition_histogramIsCumulative(self):
+    histogram = DurationHistogram()
+    histogram.observe(500)
+    histogram.observe(2_000)
+    histogram.observe(10**10)
+    exposition = Exposition('p_')
+    exposition.histogram('duration_seconds', 'Duration.', [((('stage', 'build'),), histogram)])
+
+    lines = exposition.render().decode().splitlines()
+
+    self.assertEqual(lines[2], 'p_duration_seconds_bucket{stage="build",le="1e-06"} 1')
+    self.assertEqual(lines[3], 'p_duration_seconds_bucket{stage="build",le="2.5e-06"} 2')
+    self.assertEqual(lines[-4], 'p_duration_seconds_bucket{stage="build",le="0.1"} 2')
+    self.assertEqual(lines[-3], 'p_duration_seconds_bucket{stage="build",le="+Inf"} 3')
+    self.assertEqual(lines[-2], 'p_duration_seconds_sum{stage="build"} 10.0000025')
+    self.assertEqual(lines[-1], 'p_duration_seconds_count{stage="build"} 3')
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import tempfile
+from unittest.mock import Mock
+
+from absl.testing import absltest
+
+from govee_h5072_logger.metrics import DurationHistogram
+from govee_h5072_logger.profiler import Profiler
+
+
+class TestProfiler(absltest.TestCase):
+
+  def test_writesProfileAndStageTimings(self):
+    histograms = {'build': DurationHistogram()}
+    histograms['build'].observe(999_000)
+    on_stop = Mock()
+
+    async def run(profiler: Profiler) -> None:
+      profiler.start(histograms, on_stop)
+      self.assertTrue(profiler.running)
+      histograms['build'].observe(2_000)
+      histograms['build'].observe(4_000)
+      await asyncio.sleep(0.1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+      profiler = Profiler(os.path.join(temp_dir, 'profiles'), 0.01)
+      asyncio.run(run(profiler))
+
+      self.assertFalse(profiler.running)
+      on_stop.assert_called_once_with()
+      files = sorted(os.listdir(os.path.join(temp_dir, 'profiles')))
+      self.assertLen(files, 2)
+      self.assertEndsWith(files[0], '.prof')
+      self.assertEndsWith(files[1], '.txt')
+      with open(os.path.join(temp_dir, 'profiles', files[1])) as file:
+        self.assertIn('build: 2 calls, 0.000006s total, 3.00us per call', file.read())
+
+  def test_alreadyRunning_ignored(self):
+    on_stop = Mock()
+
+    async def run() -> None:
+      profiler = Profiler(temp_dir, 0.01)
+      profiler.start(dict(), on_stop)
+      with self.assertLogs(logger='absl', level='WARNING'):
+        profiler.start(dict(), on_stop)
+      await asyncio.sleep(0.1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+      asyncio.run(run())
+
+    on_stop.assert_called_once_with()
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,68 @@
+from absl.testing import absltest
+
+from govee_h5072_logger.datapoint import DataPoint
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.recentreadings import RecentReadings
+from govee_h5072_logger.thermometer import Thermometer
+
+
+class TestRecentReadings(absltest.TestCase):
+  H5072 = Thermometer('d1', '00:00:00:00:50:72', 'n1', Model.H5072)
+  H5105 = Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105)
+
+  def _data_point(self, thermometer: Thermometer, temperature_c_10x: int) -> DataPoint:
+    battery_percent = 57 if thermometer.model == Model.H5072 else None
+    return DataPoint(thermometer.device_name, thermometer.nick_name, thermometer.model, temperature_c_10x, 357,
+                     battery_percent, -75)
+
+  def test_latest(self):
+    readings = RecentReadings(4)
+    readings.add(self._data_point(self.H5072, 241), 1_000)
+    readings.add(self._data_point(self.H5072, -15), 2_000)
+    readings.add(self._data_point(self.H5105, 200), 3_000)
+
+    self.assertEqual(readings.latest('d1'), [{
+        'device_name': 'd1',
+        'nick_name': 'n1',
+        'model': 'H5072',
+        'time_ns': 2_000,
+        'temperature_c': -1.5,
+        'humidity_percent': 35.7,
+        'battery_percent': 57,
+        'rssi': -75,
+    }])
+    self.assertEqual([(r['device_name'], r['battery_percent']) for r in readings.latest()], [('d1', 57), ('d2', None)])
+
+  def test_batteryAboveSignedByte(self):
+    readings = RecentReadings(4)
+    readings.add(DataPoint('d1', 'n1', Model.H5072, 241, 357, 200, -75), 1_000)
+
+    self.assertEqual(readings.latest('d1')[0]['battery_percent'], 200)
+
+  def test_since_oldestFirst(self):
+    readings = RecentReadings(4)
+    for i in range(3):
+      readings.add(self._data_point(self.H5072, i), (i + 1) * 1_000)
+
+    self.assertEqual([r['time_ns'] for r in readings.since('d1', 2_000)['readings']], [2_000, 3_000])
+    self.assertEqual([r['time_ns'] for r in readings.since('d1', 0)['readings']], [1_000, 2_000, 3_000])
+
+  def test_since_keepsLastCapacityReadings(self):
+    readings = RecentReadings(3)
+    for i in range(7):
+      readings.add(self._data_point(self.H5072, i), (i + 1) * 1_000)
+
+    self.assertEqual([r['temperature_c'] for r in readings.since('d1', 0)['readings']], [0.4, 0.5, 0.6])
+    self.assertEqual(readings.latest('d1')[0]['time_ns'], 7_000)
+
+  def test_unknownDevice_raises(self):
+    readings = RecentReadings(3)
+
+    with self.assertRaises(ValueError):
+      readings.latest('d1')
+    with self.assertRaises(ValueError):
+      readings.since('d1', 0)
+
+
+if __name__ == '__main__':
+  absltest.main()
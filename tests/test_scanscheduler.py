@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+from absl.testing import absltest
+
+from govee_h5072_logger.model import Model
+from govee_h5072_logger.scanscheduler import ScanScheduler
+from govee_h5072_logger.thermometer import Thermometer
+
+
+class TestScanScheduler(absltest.TestCase):
+  THERMOMETERS = {
+      Thermometer('d1', '00:00:00:00:50:72', 'n1', Model.H5072),
+      Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105),
+  }
+
+  # Runs the scheduler for the given seconds with a scanner that reports the heard thermometers soon after starting.
+  def _run(self, heard: set[Thermometer], interval_seconds: float, window_seconds: float,
+           seconds: float) -> tuple[ScanScheduler, Mock]:
+    scanner = Mock(start=AsyncMock(), stop=AsyncMock())
+
+    async def run() -> ScanScheduler:
+      scheduler = ScanScheduler([scanner], interval_seconds, window_seconds)
+
+      async def start() -> None:
+        for thermometer in heard:
+          asyncio.get_running_loop().call_later(0.005, scheduler.seen, thermometer)
+
+      scanner.start.side_effect = start
+      task = asyncio.create_task(scheduler.run())
+      await asyncio.sleep(seconds)
+      task.cancel()
+      with self.assertRaises(asyncio.CancelledError):
+        await task
+      return scheduler
+
+    with patch('govee_h5072_logger.scanscheduler.registered_thermometers', Mock(return_value=self.THERMOMETERS)):
+      return asyncio.run(run()), scanner
+
+  def test_allHeard_stopsScanning(self):
+    scheduler, scanner = self._run(self.THERMOMETERS, 0.1, 0.05, 0.35)
+
+    self.assertBetween(scheduler.windows, 3, 4)
+    self.assertEqual(scanner.start.await_count, scanner.stop.await_count)
+    self.assertEqual(scheduler.missed, 0)
+    self.assertEqual(scheduler.window_seconds, 0.05)
+    self.assertLess(scheduler.duty_cycle, 0.5)
+
+  def test_thermometerMissing_widensWindow(self):
+    scheduler, scanner = self._run({min(self.THERMOMETERS, key=lambda t: t.device_name)}, 0.05, 0.01, 0.25)
+
+    # Once the missing thermometer is overdue, windows of 0.02s, 0.04s and then 0.05s follow each other.
+    self.assertGreaterEqual(scheduler.missed, 4)
+    self.assertEqual(scheduler.window_seconds, 0.05)
+    self.assertGreater(scheduler.duty_cycle, 0.5)
+    self.assertEqual(scanner.start.await_count, scanner.stop.await_count)
+
+  def test_thermometerMissing_givesUp(self):
+    scheduler, _ = self._run({min(self.THERMOMETERS, key=lambda t: t.device_name)}, 0.01, 0.01, 0.3)
+
+    # Windows stop widening once the missing thermometer has not been heard for 10 intervals.
+    self.assertEqual(scheduler.window_seconds, 0.01)
+    self.assertLess(scheduler.missed, 15)
+    self.assertGreater(scheduler.windows, scheduler.missed)
+
+
+  def test_scannerFailsToStart_stopsStartedScanners(self):
+    started = Mock(start=AsyncMock(), stop=AsyncMock())
+    failing = Mock(start=AsyncMock(side_effect=RuntimeError('Adapter busy.')), stop=AsyncMock())
+    scheduler = ScanScheduler([started, failing], 1, 0.1)
+
+    with patch('govee_h5072_logger.scanscheduler.registered_thermometers', Mock(return_value=self.THERMOMETERS)):
+      with self.assertRaises(RuntimeError):
+        asyncio.run(scheduler.run())
+
+    started.stop.assert_awaited_once()
+    failing.stop.assert_not_awaited()
+    self.assertEqual(scheduler.duty_cycle, 0)
+
+if __name__ == '__main__':
+  absltest.main()
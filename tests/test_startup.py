@@ -0,0 +1,22 @@
+import time
+from unittest.mock import Mock, patch
+
+from absl.testing import absltest
+
+from govee_h5072_logger import startup
+
+
+class TestStartup(absltest.TestCase):
+
+  def test_secondsSinceProcessStart(self):
+    # The process has at least imported this test, and is not older than a day.
+    self.assertBetween(startup.seconds_since_process_start(), 0, 86400)
+
+  @patch('builtins.open', Mock(side_effect=FileNotFoundError))
+  def test_noProc_sinceImport(self):
+    with patch.object(time, 'monotonic', Mock(return_value=startup._IMPORT_MONOTONIC + 1.5)):
+      self.assertEqual(startup.seconds_since_process_start(), 1.5)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -1,9 +1,18 @@
+import json
+import os
+import tempfile
+
 from absl.flags import IllegalFlagValueError
 from absl.testing import absltest, flagsaver
 
-from govee_h5072_logger.flag import DEVICE_MACS, DEVICE_NAMES, MODELS, NICK_NAMES
+from govee_h5072_logger.flag import DEVICE_MACS, DEVICE_NAMES, MODELS, NICK_NAMES, THERMOMETERS_FILE
 from govee_h5072_logger.model import Model
-from govee_h5072_logger.thermometer import Thermometer, get_thermometer
+from govee_h5072_logger.thermometer import (Thermometer, find_thermometer, get_thermometer, normalize_mac,
+                                            register_flags_validator, reload_thermometers)
+
+
+def setUpModule():
+  register_flags_validator()
 
 
 class TestThermometer(absltest.TestCase):
@@ -12,6 +21,14 @@ class TestThermometer(absltest.TestCase):
       Thermometer('d2', '00:00:00:00:51:05', 'n2', Model.H5105),
   ]
 
+  def setUp(self):
+    self.tempdir = tempfile.TemporaryDirectory()
+    return super().setUp()
+
+  def tearDown(self) -> None:
+    self.tempdir.cleanup()
+    return super().tearDown()
+
   def test_duplicatedDeviceNames(self):
     with self.assertRaises(IllegalFlagValueError):
       with flagsaver.as_parsed((DEVICE_NAMES, [self.THERMOMETERS[0].device_name] * len(self.THERMOMETERS)),
@@ -45,3 +62,78 @@ class TestThermometer(absltest.TestCase):
   def test_flagsSameLength(self):
     for t in self.THERMOMETERS:
       self.assertEqual(get_thermometer(t.device_mac), t)
+      self.assertEqual(find_thermometer(t.device_mac), t)
+    self.assertIsNone(find_thermometer('unknown-mac'))
+
+  def _write_thermometers_file(self, thermometers: list[Thermometer]) -> str:
+    path = os.path.join(self.tempdir.name, 'thermometers.json')
+    with open(path, 'w') as file:
+      json.dump([{
+          'device_name': t.device_name,
+          'device_mac': t.device_mac,
+          'nick_name': t.nick_name,
+          'model': t.model.name,
+      } for t in thermometers], file)
+    return path
+
+  def test_thermometersFile(self):
+    with flagsaver.as_parsed((THERMOMETERS_FILE, self._write_thermometers_file(self.THERMOMETERS))):
+      for t in self.THERMOMETERS:
+        self.assertEqual(get_thermometer(t.device_mac), t)
+
+  def test_thermometersFileAndFlags(self):
+    with self.assertRaises(IllegalFlagValueError):
+      with flagsaver.as_parsed((THERMOMETERS_FILE, self._write_thermometers_file(self.THERMOMETERS)),
+                               (DEVICE_NAMES, [t.device_name for t in self.THERMOMETERS])):
+        pass
+
+  def test_thermometersFile_malformed(self):
+    path = os.path.join(self.tempdir.name, 'thermometers.json')
+    with open(path, 'w') as file:
+      file.write('[{"device_name": "d1"}]')
+
+    with self.assertRaises(IllegalFlagValueError):
+      with flagsaver.as_parsed((THERMOMETERS_FILE, path)):
+        pass
+
+  def test_thermometersFile_reload(self):
+    path = self._write_thermometers_file(self.THERMOMETERS[:1])
+    with flagsaver.as_parsed((THERMOMETERS_FILE, path)):
+      with self.assertRaises(ValueError):
+        get_thermometer(self.THERMOMETERS[1].device_mac)
+
+      self._write_thermometers_file(self.THERMOMETERS)
+      self.assertTrue(reload_thermometers())
+      self.assertEqual(get_thermometer(self.THERMOMETERS[1].device_mac), self.THERMOMETERS[1])
+
+  def test_thermometersFile_reloadInvalid_keepsThermometers(self):
+    path = self._write_thermometers_file(self.THERMOMETERS)
+    with flagsaver.as_parsed((THERMOMETERS_FILE, path)):
+      with open(path, 'w') as file:
+        file.write('not json')
+
+      with self.assertLogs(logger='absl'):
+        self.assertFalse(reload_thermometers())
+      self.assertEqual(get_thermometer(self.THERMOMETERS[0].device_mac), self.THERMOMETERS[0])
+
+  @flagsaver.as_parsed(
+      (DEVICE_NAMES, ['d3']),
+      (DEVICE_MACS, ['a4-c1-38-00-77-05']),
+      (NICK_NAMES, ['n3']),
+      (MODELS, ['H5072']),
+  )
+  def test_normalizedMacs(self):
+    thermometer = Thermometer('d3', 'A4:C1:38:00:77:05', 'n3', Model.H5072)
+    for device_mac in ('A4:C1:38:00:77:05', 'a4:c1:38:00:77:05', 'A4-C1-38-00-77-05', 'a4-c1-38-00-77-05',
+                       'a4:C1:38:00:77:05', 'a4c1.3800.7705'):
+      self.assertEqual(get_thermometer(device_mac), thermometer)
+    with self.assertRaises(ValueError):
+      get_thermometer('unknown-mac')
+
+  def test_normalizeMac(self):
+    self.assertEqual(normalize_mac('a4-c1-38-00-77-05'), 'A4:C1:38:00:77:05')
+    self.assertEqual(normalize_mac('A4C1.3800.7705'), 'A4:C1:38:00:77:05')
+    with self.assertRaises(ValueError):
+      normalize_mac('A4:C1:38:00:77')
+    with self.assertRaises(ValueError):
+      normalize_mac('G4:C1:38:00:77:05')